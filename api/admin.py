@@ -7,12 +7,12 @@ from django.utils import timezone
 from .models import (
     Dog, Photo, UserProfile, DateChangeRequest, DateChangeRequestHistory,
     GroupMedia, MediaReaction, Comment, BoardingRequest, BoardingRequestHistory,
-    DailyDogAssignment, DeviceToken, SupportQuery, SupportMessage,
+    DailyDogAssignment, DeviceToken, OutboundNotification, SupportQuery, SupportMessage,
     ClosureDay, DogNote, StaffAvailability, DayOffRequest, DogProfileChangeRequest,
     VaccinationRecord, WaitlistEntry, DaycareSettings,
     Vehicle, VehicleMaintenanceRecord, VehicleDefect, VehicleDefectImage,
     FacilityDefect, FacilityDefectImage, IntakeRequest, IntakeDog,
-    Invoice, InvoiceLine, PaymentRecord, XeroConnection, RoadworkIssue,
+    Invoice, InvoiceLine, InvoiceSendJob, PaymentRecord, XeroConnection, PostcodeCoordinate, RoadworkIssue,
     Incident, IncidentDog, IncidentMedia, IncidentComment,
 )
 
@@ -333,12 +333,27 @@ class DateChangeRequestAdmin(admin.ModelAdmin):
         # any stale "removed from this day" marker on the new date so a dog
         # added back onto a day it was removed from shows up again.
         from django.db import transaction
+        from .badges import refresh_badges
+        from .conditional import bump_owner_calendars, bump_versions
+        from .scheduling import refresh_schedule_days
+        from .sync import record_changes
         from .views import DateChangeRequestViewSet
         with transaction.atomic():
             approved_ids = list(pending.values_list('id', flat=True))
             updated = pending.update(status='APPROVED', approved_by=request.user, approved_at=timezone.now())
-            for req in DateChangeRequest.objects.filter(id__in=approved_ids):
+            approved = list(DateChangeRequest.objects.filter(id__in=approved_ids))
+            for req in approved:
                 DateChangeRequestViewSet._apply_approved_schedule_change(req)
+            # queryset.update() skips the post_save signal that keeps the
+            # schedule snapshot current, so patch it here.
+            refresh_schedule_days(
+                {day for req in approved for day in (req.original_date, req.new_date)},
+                dog_ids={req.dog_id for req in approved},
+            )
+            bump_versions('date_requests')
+            bump_owner_calendars({req.dog_id for req in approved})
+            refresh_badges('pending_date_requests')
+            record_changes(DateChangeRequest, approved_ids)
         self.message_user(request, f'{updated} request(s) approved.')
     approve_requests.short_description = 'Approve selected requests'
 
@@ -347,7 +362,19 @@ class DateChangeRequestAdmin(admin.ModelAdmin):
             self.message_user(request, "You do not have permission to deny requests.", level='ERROR')
             return
 
-        updated = queryset.filter(status='PENDING').update(status='DENIED', approved_by=None, approved_at=None)
+        pending = queryset.filter(status='PENDING')
+        denied_ids = list(pending.values_list('id', flat=True))
+        updated = pending.filter(id__in=denied_ids).update(status='DENIED', approved_by=None, approved_at=None)
+        if updated:
+            from .badges import refresh_badges
+            from .conditional import bump_owner_calendars, bump_versions
+            from .sync import record_changes
+            bump_versions('date_requests')
+            bump_owner_calendars(
+                DateChangeRequest.objects.filter(id__in=denied_ids).values_list('dog_id', flat=True)
+            )
+            refresh_badges('pending_date_requests')
+            record_changes(DateChangeRequest, denied_ids)
         self.message_user(request, f'{updated} request(s) denied.')
     deny_requests.short_description = 'Deny selected requests'
 
@@ -420,8 +447,8 @@ class SupportMessageAdmin(admin.ModelAdmin):
 
 @admin.register(Photo)
 class PhotoAdmin(admin.ModelAdmin):
-    list_display = ('dog_name', 'media_type', 'thumbnail_preview', 'taken_at', 'created_at')
-    list_filter = ('media_type', 'created_at')
+    list_display = ('dog_name', 'media_type', 'thumbnail_preview', 'processing_state', 'taken_at', 'created_at')
+    list_filter = ('media_type', 'processing_state', 'created_at')
     search_fields = ('dog__name', 'dog__owner__username')
     raw_id_fields = ('dog',)
     readonly_fields = ('created_at', 'thumbnail_preview_large')
@@ -488,6 +515,16 @@ class DeviceTokenAdmin(admin.ModelAdmin):
     token_preview.short_description = 'Token'
 
 
+@admin.register(OutboundNotification)
+class OutboundNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'status', 'attempts', 'created_at', 'sent_at', 'latency_ms')
+    list_filter = ('status', 'created_at')
+    search_fields = ('title', 'body', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'latency_ms')
+    list_per_page = 30
+    ordering = ['-created_at']
+
+
 @admin.register(DateChangeRequestHistory)
 class DateChangeRequestHistoryAdmin(admin.ModelAdmin):
     list_display = ('request', 'changed_by', 'from_status', 'to_status', 'changed_at')
@@ -511,10 +548,10 @@ class BoardingRequestHistoryAdmin(admin.ModelAdmin):
 
 @admin.register(GroupMedia)
 class GroupMediaAdmin(admin.ModelAdmin):
-    list_display = ('id', 'media_type', 'uploaded_by', 'caption_preview', 'created_at')
-    list_filter = ('media_type', 'created_at')
+    list_display = ('id', 'media_type', 'uploaded_by', 'caption_preview', 'processing_state', 'comment_count', 'created_at')
+    list_filter = ('media_type', 'processing_state', 'created_at')
     search_fields = ('caption', 'uploaded_by__username')
-    readonly_fields = ('uploaded_by', 'created_at')
+    readonly_fields = ('uploaded_by', 'comment_count', 'reaction_counts', 'created_at')
     ordering = ['-created_at']
 
     def has_add_permission(self, request):
@@ -610,11 +647,20 @@ class BoardingRequestAdmin(admin.ModelAdmin):
             return
 
         from django.utils import timezone
-        updated = queryset.filter(status='PENDING').update(
+        pending = queryset.filter(status='PENDING')
+        approved_ids = list(pending.values_list('id', flat=True))
+        updated = pending.filter(id__in=approved_ids).update(
             status='APPROVED',
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        if updated:
+            from .badges import refresh_badges
+            from .conditional import bump_versions
+            from .sync import record_changes
+            bump_versions('boarding')
+            refresh_badges('pending_boarding_requests')
+            record_changes(BoardingRequest, approved_ids)
         self.message_user(request, f'{updated} request(s) approved.')
     approve_requests.short_description = 'Approve selected requests'
 
@@ -623,11 +669,20 @@ class BoardingRequestAdmin(admin.ModelAdmin):
             self.message_user(request, "You do not have permission to deny requests.", level='ERROR')
             return
 
-        updated = queryset.filter(status='PENDING').update(
+        pending = queryset.filter(status='PENDING')
+        denied_ids = list(pending.values_list('id', flat=True))
+        updated = pending.filter(id__in=denied_ids).update(
             status='DENIED',
             approved_by=None,
             approved_at=None
         )
+        if updated:
+            from .badges import refresh_badges
+            from .conditional import bump_versions
+            from .sync import record_changes
+            bump_versions('boarding')
+            refresh_badges('pending_boarding_requests')
+            record_changes(BoardingRequest, denied_ids)
         self.message_user(request, f'{updated} request(s) denied.')
     deny_requests.short_description = 'Deny selected requests'
 
@@ -1009,8 +1064,8 @@ class VehicleAdmin(admin.ModelAdmin):
 class VehicleDefectImageInline(admin.TabularInline):
     model = VehicleDefectImage
     extra = 0
-    fields = ('image', 'thumbnail_preview', 'created_at')
-    readonly_fields = ('thumbnail_preview', 'created_at')
+    fields = ('image', 'thumbnail_preview', 'processing_state', 'created_at')
+    readonly_fields = ('thumbnail_preview', 'processing_state', 'created_at')
 
     def thumbnail_preview(self, obj):
         if obj.thumbnail:
@@ -1051,8 +1106,8 @@ class VehicleDefectAdmin(admin.ModelAdmin):
 class FacilityDefectImageInline(admin.TabularInline):
     model = FacilityDefectImage
     extra = 0
-    fields = ('image', 'thumbnail_preview', 'created_at')
-    readonly_fields = ('thumbnail_preview', 'created_at')
+    fields = ('image', 'thumbnail_preview', 'processing_state', 'created_at')
+    readonly_fields = ('thumbnail_preview', 'processing_state', 'created_at')
 
     def thumbnail_preview(self, obj):
         if obj.thumbnail:
@@ -1134,6 +1189,15 @@ class InvoiceAdmin(admin.ModelAdmin):
     inlines = [InvoiceLineInline, PaymentRecordInline]
 
 
+@admin.register(InvoiceSendJob)
+class InvoiceSendJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'period_year', 'period_month', 'status', 'processed', 'sent', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'period_year', 'period_month')
+    raw_id_fields = ('requested_by',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    list_per_page = 30
+
+
 @admin.register(XeroConnection)
 class XeroConnectionAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'is_connected_display', 'connected_by', 'connected_at', 'updated_at')
@@ -1153,6 +1217,14 @@ class XeroConnectionAdmin(admin.ModelAdmin):
     is_connected_display.short_description = 'Connected'
 
 
+@admin.register(PostcodeCoordinate)
+class PostcodeCoordinateAdmin(admin.ModelAdmin):
+    list_display = ('postcode', 'latitude', 'longitude', 'found', 'fetched_at')
+    list_filter = ('found',)
+    search_fields = ('postcode',)
+    list_per_page = 50
+
+
 @admin.register(RoadworkIssue)
 class RoadworkIssueAdmin(admin.ModelAdmin):
     list_display = ('street', 'town', 'severity', 'start_date', 'end_date', 'source', 'is_cancelled')
@@ -1174,8 +1246,8 @@ class IncidentDogInline(admin.TabularInline):
 class IncidentMediaInline(admin.TabularInline):
     model = IncidentMedia
     extra = 0
-    fields = ('media_type', 'file', 'preview', 'caption', 'created_at')
-    readonly_fields = ('preview', 'created_at')
+    fields = ('media_type', 'file', 'preview', 'processing_state', 'caption', 'created_at')
+    readonly_fields = ('preview', 'processing_state', 'created_at')
 
     def preview(self, obj):
         if obj.thumbnail:
@@ -0,0 +1,103 @@
+"""Badge counts — the numbers on the app's action-item badges.
+
+Every staff device used to poll six count endpoints (unresolved support
+queries, unread inquiries, vehicle and facility defects, open incidents,
+pending profile changes), each a COUNT over its table per poll per device.
+
+The counts now live in BadgeCount rows, one per badge, recounted by the model
+signals in api.models whenever a row that can move a badge is saved or
+deleted (and by the few bulk writers that skip them). A read is one indexed
+SELECT for all of a user's badges: ``/api/badges/`` returns the lot, and the
+old count actions and the dashboard read the same rows.
+
+A write recounts its badge rather than nudging it by one, with the badge's
+row locked first: concurrent writers then count one after the other, and the
+later count sees the earlier writer's committed rows (under READ COMMITTED an
+unlocked pair could each miss the other's and store the same stale total).
+A bulk writer that forgets to refresh still leaves a badge off until the
+next write or ``manage.py rebuild_badge_counts``. A badge nobody has read yet
+has no row; the first read counts it.
+"""
+
+
+def _support_replies_key(user_id):
+    return f'support_replies:{user_id}'
+
+
+def _badge_queryset(key):
+    """What ``key`` counts, as a queryset."""
+    from website.models import ContactInquiry
+    from .models import (
+        BoardingRequest, DateChangeRequest, DogProfileChangeRequest, FacilityDefect,
+        Incident, SupportQuery, VehicleDefect,
+    )
+
+    if key.startswith('support_replies:'):
+        return SupportQuery.objects.filter(owner_id=int(key.split(':', 1)[1]), has_unread_reply=True)
+    return {
+        'pending_date_requests': lambda: DateChangeRequest.objects.filter(status='PENDING'),
+        'pending_boarding_requests': lambda: BoardingRequest.objects.filter(status='PENDING'),
+        'pending_profile_changes': lambda: DogProfileChangeRequest.objects.filter(status='PENDING'),
+        'unresolved_queries': lambda: SupportQuery.objects.filter(status='OPEN', staff_has_unread=True),
+        'unread_inquiries': lambda: ContactInquiry.objects.filter(is_read=False),
+        'unresolved_facility_defects': lambda: FacilityDefect.objects.exclude(status='RESOLVED'),
+        'unresolved_vehicle_defects': lambda: VehicleDefect.objects.exclude(status='RESOLVED'),
+        'open_incidents': lambda: Incident.objects.exclude(status='RESOLVED'),
+    }[key]()
+
+
+STAFF_BADGES = (
+    'pending_date_requests', 'pending_boarding_requests', 'pending_profile_changes',
+    'unresolved_queries', 'unresolved_facility_defects', 'unresolved_vehicle_defects',
+    'open_incidents',
+)
+
+
+def refresh_badges(*keys):
+    """Recount ``keys`` under a lock on their rows and store the results.
+    Returns ``{key: count}``."""
+    from django.db import transaction
+    from .models import BadgeCount
+
+    keys = sorted({key for key in keys if key})
+    if not keys:
+        return {}
+    with transaction.atomic():
+        BadgeCount.objects.bulk_create([BadgeCount(key=key) for key in keys], ignore_conflicts=True)
+        # Held until the writer commits; locked in key order, so two writers
+        # refreshing overlapping badges can't deadlock.
+        rows = list(BadgeCount.objects.select_for_update().filter(key__in=keys).order_by('key'))
+        for row in rows:
+            row.count = _badge_queryset(row.key).count()
+        BadgeCount.objects.bulk_update(rows, ['count'])
+    return {row.key: row.count for row in rows}
+
+
+def refresh_support_badges(*owner_ids):
+    """The staff support badge plus the reply badges of ``owner_ids``."""
+    refresh_badges('unresolved_queries', *(_support_replies_key(pk) for pk in owner_ids if pk))
+
+
+def badge_counts(user):
+    """``{badge: count}`` for every badge ``user`` may see.
+
+    Staff see the staff badges, plus ``unread_inquiries`` with
+    can_view_inquiries; an owner sees only ``unresolved_queries``, which for
+    them counts their own queries with an unread reply — the same split as
+    the support queries' ``unresolved_count``.
+    """
+    from .models import BadgeCount
+
+    if user.is_staff:
+        names = list(STAFF_BADGES)
+        if getattr(getattr(user, 'profile', None), 'can_view_inquiries', False):
+            names.append('unread_inquiries')
+        keys = {name: name for name in names}
+    else:
+        keys = {'unresolved_queries': _support_replies_key(user.pk)}
+
+    stored = dict(BadgeCount.objects.filter(key__in=keys.values()).values_list('key', 'count'))
+    missing = [key for key in keys.values() if key not in stored]
+    if missing:
+        stored.update(refresh_badges(*missing))
+    return {name: stored[key] for name, key in keys.items()}
@@ -11,7 +11,7 @@ Approved boarding stays bill separately at a per-night rate
 (``Dog.boarding_rate`` falling back to ``ServicePricing.boarding_price_per_night``):
 a billable night is a stay date before the checkout day, clamped to the
 billing month. Boarding REPLACES the daycare charge for the days it covers —
-``attendance_for_month`` subtracts ``_boarded_dog_days``, so a boarded dog is
+``attendance_for_month`` subtracts ``_boarded_ranges``, so a boarded dog is
 never charged for both on the same date. (This paragraph previously claimed the
 opposite, which is a dangerous thing to leave lying around next to a billing
 engine: anyone "fixing the code to match the docs" would double-charge every
@@ -32,7 +32,7 @@ from django.db.models import Sum
 from django.utils import timezone
 
 from . import xero
-from .models import BoardingRequest, DailyDogAssignment, Invoice, InvoiceLine, PaymentRecord, XeroConnection
+from .models import BoardingRequest, DailyDogAssignment, Invoice, InvoiceLine, InvoiceSendJob, PaymentRecord, XeroConnection
 from .notifications import send_push_notification, send_staff_notification
 
 logger = logging.getLogger(__name__)
@@ -43,6 +43,19 @@ PAYMENT_TERMS_DAYS = 14
 # Xero caps the length of the IDs= filter; batch open invoices when syncing.
 XERO_FETCH_CHUNK = 40
 
+# Customers whose invoices are written per transaction by monthly generation.
+INVOICE_WRITE_CHUNK = 200
+
+# How long a send worker holds a job between progress saves before another
+# worker may assume it died and resume the job.
+SEND_JOB_LEASE = timedelta(minutes=10)
+
+# A SENDING claim older than this was stranded by a send worker that died
+# mid-batch: a batch takes well under it, and a job is only resumed a full
+# SEND_JOB_LEASE after its last progress save. send_invoice's claims last
+# seconds, so they are never mistaken for one.
+STRANDED_SENDING_AFTER = timedelta(minutes=5)
+
 
 class XeroSendFailed(Exception):
     """Raised by send_invoice when Xero is connected but rejected the push.
@@ -60,21 +73,29 @@ def _customer_rate(customer, field):
     return getattr(getattr(customer, 'profile', None), field, None)
 
 
-def get_day_rate(dog, customer=None):
+def _standard_pricing():
+    # Lazy import: website is a separate app and this keeps api importable
+    # without it in edge contexts (and avoids app-loading order issues).
+    from website.models import ServicePricing
+    return ServicePricing.load()
+
+
+def get_day_rate(dog, customer=None, pricing=None):
     """The per-day daycare rate: dog override, else the billed customer's
-    per-client rate (their discount), else the standard price."""
+    per-client rate (their discount), else the standard price.
+
+    Pass ``pricing`` (a loaded ServicePricing) when rating many dogs, so the
+    singleton is read once rather than per dog.
+    """
     if dog.daily_rate is not None:
         return dog.daily_rate
     client_rate = _customer_rate(customer, 'daycare_rate')
     if client_rate is not None:
         return client_rate
-    # Lazy import: website is a separate app and this keeps api importable
-    # without it in edge contexts (and avoids app-loading order issues).
-    from website.models import ServicePricing
-    return ServicePricing.load().day_care_price
+    return (pricing or _standard_pricing()).day_care_price
 
 
-def get_boarding_rate(dog, customer=None):
+def get_boarding_rate(dog, customer=None, pricing=None):
     """The per-night boarding rate: dog override, else the billed customer's
     per-client rate, else the standard boarding price (which is 0 until the
     business sets it — visible on drafts)."""
@@ -83,29 +104,29 @@ def get_boarding_rate(dog, customer=None):
     client_rate = _customer_rate(customer, 'boarding_rate')
     if client_rate is not None:
         return client_rate
-    from website.models import ServicePricing
-    return ServicePricing.load().boarding_price_per_night
+    return (pricing or _standard_pricing()).boarding_price_per_night
 
 
-def _boarded_dog_days(year, month):
-    """(dog_id, date) pairs covered by an approved boarding stay this month,
-    arrival through checkout inclusive. The boarding charge covers the whole
-    stay, so daycare attendance on these days is not billed separately."""
-    month_start = date_cls(year, month, 1)
-    month_end = date_cls(year, month, _calendar.monthrange(year, month)[1])
-    covered = set()
-    requests = (
+def _month_bounds(year, month):
+    return date_cls(year, month, 1), date_cls(year, month, _calendar.monthrange(year, month)[1])
+
+
+def _boarded_ranges(year, month):
+    """``{dog_id: [(first, last), ...]}`` — the days of each approved boarding
+    stay this month, arrival through checkout inclusive, clamped to the month.
+    The boarding charge covers the whole stay, so daycare attendance on these
+    days is not billed separately."""
+    month_start, month_end = _month_bounds(year, month)
+    ranges = {}
+    stays = (
         BoardingRequest.objects
         .filter(status='APPROVED', start_date__lte=month_end, end_date__gte=month_start)
-        .prefetch_related('dogs')
+        .values_list('dogs__id', 'start_date', 'end_date')
     )
-    for request in requests:
-        first = max(request.start_date, month_start)
-        last = min(request.end_date, month_end)
-        for dog in request.dogs.all():
-            for offset in range((last - first).days + 1):
-                covered.add((dog.id, first + timedelta(days=offset)))
-    return covered
+    for dog_id, start, end in stays:
+        if dog_id is not None:
+            ranges.setdefault(dog_id, []).append((max(start, month_start), min(end, month_end)))
+    return ranges
 
 
 def attendance_for_month(year, month):
@@ -117,7 +138,7 @@ def attendance_for_month(year, month):
     discount. Days inside an approved boarding stay are excluded (the
     boarding charge covers them).
     """
-    boarded = _boarded_dog_days(year, month)
+    boarded = _boarded_ranges(year, month)
     assignments = (
         DailyDogAssignment.objects
         .filter(date__year=year, date__month=month)
@@ -127,7 +148,7 @@ def attendance_for_month(year, month):
     )
     by_owner = {}
     for assignment in assignments:
-        if (assignment.dog_id, assignment.date) in boarded:
+        if any(first <= assignment.date <= last for first, last in boarded.get(assignment.dog_id, ())):
             continue
         owner_transport = assignment.effective_owner_brings and assignment.effective_owner_collects
         # Ownerless dogs group under None — they get per-dog invoices in the
@@ -148,30 +169,39 @@ def boarding_nights_for_month(year, month):
     the booking (staff often book on a client's behalf). Dogs with no client
     group under None and get per-dog invoices in the dog's name.
     """
-    month_start = date_cls(year, month, 1)
-    month_end = date_cls(year, month, _calendar.monthrange(year, month)[1])
-    requests = (
-        BoardingRequest.objects
-        .filter(status='APPROVED', start_date__lte=month_end, end_date__gte=month_start)
-        .prefetch_related('dogs__owner__profile')
+    month_start, month_end = _month_bounds(year, month)
+    # Walk the M2M through table so each (stay, dog) pair arrives with its
+    # dog, owner and profile in a single query.
+    stay_dogs = (
+        BoardingRequest.dogs.through.objects
+        .filter(
+            boardingrequest__status='APPROVED',
+            boardingrequest__start_date__lte=month_end,
+            boardingrequest__end_date__gte=month_start,
+        )
+        .select_related('boardingrequest', 'dog__owner__profile')
+        .order_by('boardingrequest_id', 'id')
     )
     by_owner = {}
-    for request in requests:
-        first_night = max(request.start_date, month_start)
+    dogs = {}
+    for stay_dog in stay_dogs:
+        stay = stay_dog.boardingrequest
+        first_night = max(stay.start_date, month_start)
         # Last billable night is the day before checkout, clamped to the month.
-        last_night = min(request.end_date - timedelta(days=1), month_end)
+        last_night = min(stay.end_date - timedelta(days=1), month_end)
         if first_night > last_night:
             continue
         nights = [
             first_night + timedelta(days=offset)
             for offset in range((last_night - first_night).days + 1)
         ]
-        for dog in request.dogs.all():
-            by_owner.setdefault(dog.owner, {}).setdefault(dog, []).extend(nights)
+        # One Dog instance per id, so a dog on two stays is one dict key.
+        dog = dogs.setdefault(stay_dog.dog_id, stay_dog.dog)
+        by_owner.setdefault(dog.owner, {}).setdefault(dog, []).extend(nights)
     return by_owner
 
 
-def generate_invoices_for_month(year, month, created_by=None, customer=None):
+def generate_invoices_for_month(year, month, created_by=None, customer=None, dry_run=False):
     """Create DRAFT invoices for every APP-billed customer with daycare
     attendance or boarding nights in the period (or just one customer when
     ``customer`` is given).
@@ -185,6 +215,13 @@ def generate_invoices_for_month(year, month, created_by=None, customer=None):
     Idempotent: customers who already have a non-VOID invoice for the period
     are skipped, as are customers with nothing to bill. Returns
     ``(created_invoices, skipped_count, manual_count)``.
+
+    Set-based: attendance, boarding, standard pricing and existing invoices
+    are read in a fixed number of queries however many customers there are,
+    every line is computed in memory, and invoices and lines are written with
+    bulk_create, INVOICE_WRITE_CHUNK customers per transaction. With
+    ``dry_run`` nothing is written and the invoices come back unsaved (with
+    their ``total`` set).
     """
     daycare_by_owner = attendance_for_month(year, month)
     boarding_by_owner = boarding_nights_for_month(year, month)
@@ -236,63 +273,74 @@ def generate_invoices_for_month(year, month, created_by=None, customer=None):
         if invoice.billed_dog_id is not None:
             billed_dogs.add(invoice.billed_dog_id)
 
-    created = []
+    pricing = _standard_pricing()
+    planned = []
     skipped = 0
     for entry in customers.values():
         owner, dog = entry['owner'], entry['dog']
         if (owner is not None and owner.id in billed_customers) or (dog is not None and dog.id in billed_dogs):
             skipped += 1
             continue
+        invoice = Invoice(
+            customer=owner,
+            billed_dog=dog,
+            period_year=year,
+            period_month=month,
+            status='DRAFT',
+            created_by=created_by,
+        )
+        lines = (
+            _daycare_lines(invoice, entry['daycare'], pricing)
+            + _boarding_lines(invoice, entry['boarding'], pricing)
+        )
+        invoice.total = sum((line.line_total for line in lines), Decimal('0.00'))
+        planned.append((invoice, lines))
+
+    created = [invoice for invoice, _ in planned]
+    if dry_run:
+        return created, skipped, manual
+
+    for start in range(0, len(planned), INVOICE_WRITE_CHUNK):
+        chunk = planned[start:start + INVOICE_WRITE_CHUNK]
         with transaction.atomic():
-            invoice = Invoice.objects.create(
-                customer=owner,
-                billed_dog=dog,
-                period_year=year,
-                period_month=month,
-                status='DRAFT',
-                created_by=created_by,
-            )
-            total = _build_lines(invoice, entry['daycare'])
-            total += _build_boarding_lines(invoice, entry['boarding'])
-            invoice.total = total
-            invoice.save(update_fields=['total', 'updated_at'])
-        created.append(invoice)
+            Invoice.objects.bulk_create([invoice for invoice, _ in chunk])
+            lines = []
+            for invoice, invoice_lines in chunk:
+                for line in invoice_lines:
+                    line.invoice = invoice  # picks up the pk bulk_create just set
+                    lines.append(line)
+            InvoiceLine.objects.bulk_create(lines)
     return created, skipped, manual
 
 
-def _build_lines(invoice, dogs):
-    """Create the daycare InvoiceLines for a dog map of (date, owner_transport)
-    day tuples; returns the lines' total.
+def _daycare_lines(invoice, dogs, pricing):
+    """Unsaved daycare InvoiceLines for a dog map of (date, owner_transport)
+    day tuples.
 
     Days where the owner handled both transport legs bill at the day rate
     minus the configurable owner-transport discount (as their own line, so
     the saving is visible on the invoice); other days bill at the full rate.
     """
-    from website.models import ServicePricing
-
-    discount = ServicePricing.load().owner_transport_discount
-    total = Decimal('0.00')
+    discount = pricing.owner_transport_discount
+    lines = []
     for dog, days in sorted(dogs.items(), key=lambda item: item[0].name.lower()):
-        rate = get_day_rate(dog, customer=invoice.customer)
+        rate = get_day_rate(dog, customer=invoice.customer, pricing=pricing)
         split_discount = discount > 0
         standard = [d for d, owner_transport in days if not (owner_transport and split_discount)]
         discounted = [d for d, owner_transport in days if owner_transport and split_discount]
         if standard:
-            line_total = rate * len(standard)
-            InvoiceLine.objects.create(
+            lines.append(InvoiceLine(
                 invoice=invoice,
                 dog=dog,
                 description=f"Daycare — {dog.name} ({len(standard)} day{'s' if len(standard) != 1 else ''} @ £{rate})",
                 quantity=len(standard),
                 unit_price=rate,
-                line_total=line_total,
+                line_total=rate * len(standard),
                 attendance_dates=[d.isoformat() for d in standard],
-            )
-            total += line_total
+            ))
         if discounted:
             discounted_rate = max(rate - discount, Decimal('0.00'))
-            line_total = discounted_rate * len(discounted)
-            InvoiceLine.objects.create(
+            lines.append(InvoiceLine(
                 invoice=invoice,
                 dog=dog,
                 description=(
@@ -301,30 +349,27 @@ def _build_lines(invoice, dogs):
                 ),
                 quantity=len(discounted),
                 unit_price=discounted_rate,
-                line_total=line_total,
+                line_total=discounted_rate * len(discounted),
                 attendance_dates=[d.isoformat() for d in discounted],
-            )
-            total += line_total
-    return total
+            ))
+    return lines
 
 
-def _build_boarding_lines(invoice, dogs):
-    """Create one boarding InvoiceLine per dog; returns the lines' total."""
-    total = Decimal('0.00')
+def _boarding_lines(invoice, dogs, pricing):
+    """Unsaved boarding InvoiceLines, one per dog."""
+    lines = []
     for dog, nights in sorted(dogs.items(), key=lambda item: item[0].name.lower()):
-        rate = get_boarding_rate(dog, customer=invoice.customer)
-        line_total = rate * len(nights)
-        InvoiceLine.objects.create(
+        rate = get_boarding_rate(dog, customer=invoice.customer, pricing=pricing)
+        lines.append(InvoiceLine(
             invoice=invoice,
             dog=dog,
             description=f"Boarding — {dog.name} ({len(nights)} night{'s' if len(nights) != 1 else ''} @ £{rate})",
             quantity=len(nights),
             unit_price=rate,
-            line_total=line_total,
+            line_total=rate * len(nights),
             attendance_dates=[d.isoformat() for d in nights],
-        )
-        total += line_total
-    return total
+        ))
+    return lines
 
 
 def _adjustments_total(invoice):
@@ -345,13 +390,12 @@ def regenerate_draft(invoice):
         # Dog-name invoice: only its own dog's charges belong on it.
         daycare = {dog: days for dog, days in daycare.items() if dog.id == invoice.billed_dog_id}
         boarding = {dog: nights for dog, nights in boarding.items() if dog.id == invoice.billed_dog_id}
+    pricing = _standard_pricing()
+    lines = _daycare_lines(invoice, daycare, pricing) + _boarding_lines(invoice, boarding, pricing)
     with transaction.atomic():
         invoice.lines.filter(is_adjustment=False).delete()
-        invoice.total = (
-            _build_lines(invoice, daycare)
-            + _build_boarding_lines(invoice, boarding)
-            + _adjustments_total(invoice)
-        )
+        InvoiceLine.objects.bulk_create(lines)
+        invoice.total = sum((line.line_total for line in lines), Decimal('0.00')) + _adjustments_total(invoice)
         invoice.save(update_fields=['total', 'updated_at'])
     return invoice
 
@@ -561,6 +605,247 @@ def email_invoice_from_xero(invoice):
     return True
 
 
+# ---------------------------------------------------------------------------
+# Batch sending (send_all)
+# ---------------------------------------------------------------------------
+
+def queue_send_job(year, month, user=None):
+    """Queue the period's drafts for ``run_send_job``. Returns ``(job, created)``.
+
+    A period that already has a job queued or running gets that job back, so
+    a double-tapped "send all" doesn't start a second run. Two racing calls
+    could still both create one; the per-invoice DRAFT→SENDING claim in
+    ``run_send_job`` makes the loser a no-op.
+    """
+    active = InvoiceSendJob.objects.filter(
+        period_year=year, period_month=month, status__in=('QUEUED', 'RUNNING'),
+    ).first()
+    if active is not None:
+        return active, False
+    ids = list(
+        Invoice.objects
+        .filter(status='DRAFT', period_year=year, period_month=month)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    job = InvoiceSendJob(period_year=year, period_month=month, requested_by=user, invoice_ids=ids)
+    if not ids:
+        job.status = 'DONE'
+        job.finished_at = timezone.now()
+    job.save()
+    return job, True
+
+
+def claim_send_job():
+    """Claim the oldest due send job for this worker, or None.
+
+    Due means QUEUED, or RUNNING with a lapsed lease — the worker that held it
+    died, and the job resumes from its last recorded batch.
+    """
+    from django.db.models import Q
+
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            InvoiceSendJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='QUEUED') | Q(status='RUNNING', lease_expires_at__lt=now))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = job.started_at or now
+        job.lease_expires_at = now + SEND_JOB_LEASE
+        job.save(update_fields=['status', 'started_at', 'lease_expires_at'])
+    return job
+
+
+def run_send_job(job):
+    """Send a claimed job's drafts, ``xero.INVOICE_BATCH_SIZE`` at a time.
+
+    Each batch is claimed DRAFT→SENDING under a row lock (the same guard as
+    ``send_invoice``), created in Xero with one POST, then emailed and given
+    its online URL with concurrent calls held to Xero's rate limits by
+    ``xero._limiter``. Progress is saved after every batch so the status
+    endpoint can report it and a restarted worker can resume.
+
+    A resumed job finds the batch its dead worker was in the middle of still
+    SENDING. Those invoices are claimed again too: one Xero already has is
+    marked SENT, one it doesn't goes round again like a draft.
+    """
+    from django.db.models import Q
+
+    connected = XeroConnection.load().is_connected
+    ids = job.invoice_ids
+    while job.processed < len(ids):
+        chunk = ids[job.processed:job.processed + xero.INVOICE_BATCH_SIZE]
+        with transaction.atomic():
+            stranded = Q(status='SENDING', updated_at__lt=timezone.now() - STRANDED_SENDING_AFTER)
+            claimed = list(
+                Invoice.objects.select_for_update()
+                .filter(Q(status='DRAFT') | stranded, pk__in=chunk)
+                .order_by('id')
+            )
+            Invoice.objects.filter(pk__in=[i.pk for i in claimed]).update(
+                status='SENDING', updated_at=timezone.now(),
+            )
+        claimed_ids = {invoice.pk for invoice in claimed}
+        recovered_ids = {i.pk for i in claimed if i.status == 'SENDING' and i.xero_invoice_id}
+        skipped = (
+            Invoice.objects.filter(pk__in=[pk for pk in chunk if pk not in claimed_ids])
+            .select_related('customer', 'billed_dog')
+        )
+        failed = [
+            (invoice, f'Not sent: the invoice is {invoice.get_status_display().lower()}, not a draft.')
+            for invoice in skipped
+        ]
+
+        invoices = list(
+            Invoice.objects.filter(pk__in=claimed_ids)
+            .select_related('customer__profile', 'billed_dog')
+            .prefetch_related('lines')
+            .order_by('id')
+        )
+        recovered = [invoice for invoice in invoices if invoice.pk in recovered_ids]
+        invoices = [invoice for invoice in invoices if invoice.pk not in recovered_ids]
+        if connected:
+            try:
+                sent, batch_failed = _push_batch(invoices)
+            except BaseException:
+                # As in send_invoice: only the process being killed outright may
+                # leave an invoice stranded in SENDING. The ones Xero already
+                # has stay there for the recovery above when the lease lapses.
+                logger.exception('Unexpected error sending invoices for job %s', job.pk)
+                Invoice.objects.filter(
+                    pk__in=[invoice.pk for invoice in invoices], status='SENDING', xero_invoice_id='',
+                ).update(status='DRAFT', updated_at=timezone.now())
+                raise
+            failed += batch_failed
+        else:
+            sent = invoices
+        sent = recovered + sent
+        _mark_sent(sent)
+
+        job.processed += len(chunk)
+        job.sent += len(sent)
+        job.failed += [
+            {'invoice': invoice.id, 'customer': invoice.billed_name, 'detail': detail}
+            for invoice, detail in failed
+        ]
+        job.lease_expires_at = timezone.now() + SEND_JOB_LEASE
+        job.save(update_fields=['processed', 'sent', 'failed', 'lease_expires_at'])
+
+    job.status = 'DONE'
+    job.finished_at = timezone.now()
+    job.lease_expires_at = None
+    job.save(update_fields=['status', 'finished_at', 'lease_expires_at'])
+
+    if job.requested_by is not None:
+        summary = f'{job.sent} of {job.total} invoice(s) for {_calendar.month_name[job.period_month]} {job.period_year} sent'
+        if job.failed:
+            summary += f', {len(job.failed)} failed'
+        send_push_notification(
+            job.requested_by,
+            'Invoices sent',
+            f'{summary}.',
+            data={'type': 'invoice_send_job', 'id': str(job.id), 'click_action': 'FLUTTER_NOTIFICATION_CLICK'},
+        )
+    return job
+
+
+def _push_batch(invoices):
+    """Create a batch of SENDING invoices in Xero, then email them and fetch
+    their online URLs. Returns ``(sent, failed)``: the invoices that made it,
+    and ``(invoice, detail)`` pairs for the ones returned to DRAFT.
+
+    An invoice that already has a Xero id (a send that failed after the push)
+    is emailed but not created again, as in ``push_invoice_to_xero``.
+    """
+    from django.conf import settings
+
+    failed, pairs, pushed = [], [], []
+    for invoice in invoices:
+        if invoice.xero_invoice_id:
+            pushed.append(invoice)
+            continue
+        try:
+            pairs.append((invoice, _resolve_contact_id(invoice)))
+        except xero.XeroError as exc:
+            failed.append((invoice, str(exc)))
+    try:
+        outcomes = xero.create_invoices(pairs)
+    except xero.XeroError as exc:
+        outcomes = [('', '', str(exc))] * len(pairs)
+
+    for (invoice, _), (xero_id, xero_number, error) in zip(pairs, outcomes):
+        if error:
+            failed.append((invoice, error))
+            continue
+        invoice.xero_invoice_id = xero_id
+        invoice.xero_invoice_number = xero_number
+        invoice.xero_sync_error = ''
+        invoice.updated_at = timezone.now()
+        pushed.append(invoice)
+    # Record the Xero ids straight away: if the worker dies before the batch is
+    # marked SENT, the invoices must not look un-pushed to a later retry.
+    Invoice.objects.bulk_update(pushed, ['xero_invoice_id', 'xero_invoice_number', 'xero_sync_error', 'updated_at'])
+
+    for invoice, detail in failed:
+        logger.error('Failed to push invoice #%s to Xero: %s', invoice.id, detail)
+        invoice.status = 'DRAFT'
+        invoice.xero_sync_error = detail
+        invoice.updated_at = timezone.now()
+    Invoice.objects.bulk_update([invoice for invoice, _ in failed], ['status', 'xero_sync_error', 'updated_at'])
+
+    xero_ids = [invoice.xero_invoice_id for invoice in pushed]
+    emailing = bool(xero_ids) and getattr(settings, 'XERO_EMAIL_INVOICES', False)
+    try:
+        urls = xero.get_online_invoice_urls(xero_ids) if xero_ids else {}
+    except xero.XeroError as exc:
+        logger.warning('Could not fetch Xero online invoice URLs: %s', exc)
+        urls = {}
+    email_errors = {}
+    if emailing:
+        try:
+            email_errors = xero.email_invoices(xero_ids)
+        except xero.XeroError as exc:
+            email_errors = dict.fromkeys(xero_ids, str(exc))
+    now = timezone.now()
+    for invoice in pushed:
+        invoice.xero_online_url = urls.get(invoice.xero_invoice_id, '')
+        if emailing:
+            error = email_errors.get(invoice.xero_invoice_id)
+            if error:
+                logger.error('Failed to email invoice #%s from Xero: %s', invoice.id, error)
+                invoice.xero_sync_error = f'Xero email failed: {error}'
+            else:
+                invoice.xero_emailed_at = now
+    return pushed, failed
+
+
+def _mark_sent(invoices):
+    """Flip claimed invoices to SENT and tell each customer, as send_invoice does."""
+    now = timezone.now()
+    for invoice in invoices:
+        invoice.status = 'SENT'
+        invoice.sent_at = now
+        invoice.due_date = now.date() + timezone.timedelta(days=PAYMENT_TERMS_DAYS)
+        invoice.updated_at = now
+    Invoice.objects.bulk_update(invoices, [
+        'status', 'sent_at', 'due_date', 'xero_online_url', 'xero_emailed_at', 'xero_sync_error', 'updated_at',
+    ])
+    for invoice in invoices:
+        if invoice.customer is not None:
+            send_push_notification(
+                invoice.customer,
+                'New invoice',
+                f'Your daycare invoice for {invoice.period_label} is ready: £{invoice.total}.',
+                data={'type': 'invoice', 'id': str(invoice.id), 'click_action': 'FLUTTER_NOTIFICATION_CLICK'},
+            )
+
+
 def refresh_payment_state(invoice):
     """Recompute ``amount_paid`` and the paid/part-paid status from the
     payments ledger. DRAFT and VOID invoices are left alone."""
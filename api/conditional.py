@@ -0,0 +1,108 @@
+"""Conditional GET (``ETag`` / ``If-None-Match`` → 304) for the polled endpoints.
+
+The staff app re-polls the day's roster, the unassigned list, the feed and
+the dog list every few seconds, and owners reopen their calendar; almost every
+poll used to re-run materialization checks, the listing queries and the full
+serialization to return exactly what the client already had.
+
+Each of those responses is now tagged with an ETag built from a handful of
+*change versions*: ChangeVersion rows (``dogs``, ``feed``, ``roster``,
+``roster:<date>``, ``boarding``, ``date_requests``, ``waitlist``,
+``calendar:<user id>``) that the model signals — and the few bulk writers
+that skip signals — replace on every write to the data behind them, plus the
+ScheduleDay rows for the dates shown.
+A poll whose ``If-None-Match`` still matches is answered 304 after those
+lookups, before any listing query or serializer runs.
+
+The tag also covers the user, the full query string and today's date (several
+responses, e.g. ``cancelled_dates``, are relative to today), so it never
+matches across people, pages or days. A version is a random token rather than
+a counter: a row that is lost and recreated can't reissue an old tag.
+"""
+import hashlib
+import uuid
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+# Keys every roster response depends on. ``roster`` is bumped by the bulk
+# writers that move rows across many dates at once (e.g. a forever swap of
+# drivers); everything else bumps just ``roster:<date>``.
+ROSTER_KEYS = ('roster', 'boarding', 'dogs')
+
+
+def roster_key(day):
+    return f'roster:{day.isoformat()}'
+
+
+def bump_versions(*keys):
+    """Mark the data behind ``keys`` as changed (one upsert for all of them)."""
+    from .models import ChangeVersion
+
+    keys = sorted({key for key in keys if key})
+    if not keys:
+        return
+    token = uuid.uuid4().hex
+    ChangeVersion.objects.bulk_create(
+        [ChangeVersion(key=key, version=token) for key in keys],
+        update_conflicts=True, unique_fields=['key'], update_fields=['version'],
+    )
+
+
+def owner_calendar_key(user_id):
+    # Everything in one owner's calendar besides the shared schedule: their
+    # dogs, their pending requests and their waitlist entries.
+    return f'calendar:{user_id}'
+
+
+def bump_owner_calendars(dog_ids):
+    """Mark the calendars of everyone who owns or co-owns ``dog_ids`` as changed."""
+    from .models import Dog
+
+    owners = set()
+    for owner_id, co_owner_id in (
+        Dog.objects.filter(id__in=dog_ids).values_list('owner_id', 'additional_owners__id')
+    ):
+        owners.update((owner_id, co_owner_id))
+    bump_versions(*(owner_calendar_key(pk) for pk in owners if pk))
+
+
+def schedule_stamp(start, end):
+    """The state of the ScheduleDay rows for [start, end] — built first if
+    missing, so the first poll's tag already holds on the second. See
+    scheduling.schedule_version."""
+    from .scheduling import schedule_version
+    return schedule_version(start, end)
+
+
+def etag_for(request, keys, *extra):
+    from .models import ChangeVersion
+
+    versions = dict(ChangeVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    parts = [
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        str(request.user.pk),
+        timezone.localdate().isoformat(),
+        *(f'{key}={versions.get(key, "")}' for key in sorted(keys)),
+        *(str(part) for part in extra),
+    ]
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def conditional_get(request, keys, render, *extra):
+    """Answer 304 if the client's ``If-None-Match`` matches the current tag;
+    otherwise ``render()`` the response and tag it.
+
+    The tag is computed before rendering, so a write that lands mid-render
+    leaves the client with a tag that no longer matches — it refetches on the
+    next poll rather than keeping stale data.
+    """
+    etag = etag_for(request, keys, *extra)
+    if get_conditional_response(request, etag=etag) is not None:
+        return Response(status=304, headers={'ETag': etag})
+    response = render()
+    if response.status_code == 200:
+        response['ETag'] = etag
+    return response
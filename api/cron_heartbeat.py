@@ -13,7 +13,8 @@ raises, so it can't fail the command it's reporting on.
 """
 import logging
 import os
-import urllib.request
+
+from . import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,6 @@ def ping_heartbeat(suffix=''):
         return
     url = base.rstrip('/') + (f'/{suffix}' if suffix else '')
     try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'p4td-cron'})
-        urllib.request.urlopen(req, timeout=5).close()
+        http_client.request('GET', url, headers={'User-Agent': 'p4td-cron'}, timeout=5)
     except Exception as exc:  # best-effort — monitoring must never break the job
         logger.warning('Heartbeat ping failed for %s: %s', suffix or 'cron', exc)
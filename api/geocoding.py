@@ -6,17 +6,18 @@ Two independent helpers:
 - ``geocode_address`` resolves a dog's address to coordinates for the staff
   pickup map via postcodes.io — free, no API key, postcode-centroid accuracy.
 
-Uses the Python standard library only (``urllib``) so no extra pip dependency is
-introduced — adding one to a single requirements file breaks the prod Docker
-build.
+HTTP goes through the shared :mod:`api.http_client` (standard library only, so
+no extra pip dependency — adding one to a single requirements file breaks the
+prod Docker build).
 """
-import json as _json
 import re
-import urllib.error
 import urllib.parse
-import urllib.request
+from datetime import timedelta
 
 from django.conf import settings
+from django.utils import timezone
+
+from . import http_client
 
 
 # Loose UK postcode matcher — good enough to pull a postcode out of a free-text
@@ -25,6 +26,19 @@ _UK_POSTCODE_RE = re.compile(
     r'\b([A-Za-z]{1,2}\d[A-Za-z\d]?)\s*(\d[A-Za-z]{2})\b'
 )
 
+# The shape of a normalised postcode; only keys like this are cached, so free
+# text typed into a postcode field can't overflow PostcodeCoordinate.postcode.
+_CACHEABLE_POSTCODE_RE = re.compile(r'[A-Z]{1,2}\d[A-Z\d]? \d[A-Z]{2}')
+
+
+# postcodes.io accepts at most this many postcodes per bulk lookup.
+BULK_LOOKUP_LIMIT = 100
+
+# How long a cached postcode centroid (PostcodeCoordinate) is trusted, and how
+# long a miss is remembered before the provider is asked again.
+POSTCODE_CACHE_TTL = timedelta(days=90)
+POSTCODE_MISS_TTL = timedelta(days=7)
+
 
 class PostcodeLookupError(Exception):
     """A provider error we should surface to the client."""
@@ -60,21 +74,19 @@ def _fetch_getaddress(postcode, api_key):
         f'https://api.getAddress.io/find/{pc}'
         f'?api-key={urllib.parse.quote(api_key)}&expand=true&sort=true'
     )
-    req = urllib.request.Request(url, headers={'User-Agent': 'p4td-backend'})
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return _json.loads(resp.read().decode('utf-8'))
-    except urllib.error.HTTPError as exc:
-        if exc.code == 404:
+        return http_client.request('GET', url, timeout=10, retries=1).json()
+    except http_client.HTTPError as exc:
+        if exc.status == 404:
             raise PostcodeNotFound()
-        if exc.code == 400:
+        if exc.status == 400:
             raise PostcodeLookupError('That does not look like a valid postcode.')
-        if exc.code in (401, 403):
+        if exc.status in (401, 403):
             raise PostcodeLookupError('Postcode lookup is misconfigured (auth failed).')
-        if exc.code == 429:
+        if exc.status == 429:
             raise PostcodeLookupError('Postcode lookup limit reached. Please try again later.')
         raise PostcodeLookupError('Address lookup service error.')
-    except (urllib.error.URLError, TimeoutError, ValueError):
+    except (http_client.TransportError, ValueError):
         raise PostcodeLookupError('Could not reach the address lookup service.')
 
 
@@ -142,18 +154,90 @@ def _fetch_postcodes_io(postcode):
     """
     pc = urllib.parse.quote(postcode.replace(' ', ''))
     url = f'https://api.postcodes.io/postcodes/{pc}'
-    req = urllib.request.Request(url, headers={'User-Agent': 'p4td-backend'})
     try:
-        # Short timeout: this runs inline on the dog-save path, so a slow
-        # provider must not hold a worker for long (B32).
-        with urllib.request.urlopen(req, timeout=4) as resp:
-            return _json.loads(resp.read().decode('utf-8'))
-    except urllib.error.HTTPError as exc:
-        if exc.code == 404:
+        # Short timeout and a single retry: this runs inline on the dog-save
+        # path, so a slow provider must not hold a worker for long (B32).
+        return http_client.request('GET', url, timeout=4, retries=1).json()
+    except http_client.HTTPError as exc:
+        if exc.status == 404:
             raise PostcodeNotFound()
         raise PostcodeLookupError('Geocoding service error.')
-    except (urllib.error.URLError, TimeoutError, ValueError):
+    except (http_client.TransportError, ValueError):
+        raise PostcodeLookupError('Could not reach the geocoding service.')
+
+
+def _fetch_postcodes_io_bulk(postcodes):
+    """Look up to :data:`BULK_LOOKUP_LIMIT` postcodes in one POST to postcodes.io.
+
+    Returns ``{query: result-or-None}``; ``None`` means postcodes.io doesn't
+    know the postcode. Raises :class:`PostcodeLookupError`.
+    """
+    try:
+        payload = http_client.request(
+            'POST', 'https://api.postcodes.io/postcodes',
+            json={'postcodes': list(postcodes)}, timeout=10,
+        ).json()
+    except http_client.HTTPError:
+        raise PostcodeLookupError('Geocoding service error.')
+    except (http_client.TransportError, ValueError):
         raise PostcodeLookupError('Could not reach the geocoding service.')
+    return {
+        entry.get('query'): entry.get('result')
+        for entry in (payload.get('result') or [])
+        if isinstance(entry, dict)
+    }
+
+
+def normalise_postcode(postcode):
+    """Upper-case a postcode with a single space before the inward code — the
+    PostcodeCoordinate key (``'sl72he'`` and ``'SL7  2HE'`` → ``'SL7 2HE'``)."""
+    compact = ''.join((postcode or '').split()).upper()
+    if len(compact) > 3:
+        return f'{compact[:-3]} {compact[-3:]}'
+    return compact
+
+
+def _cached(postcodes):
+    """Fresh PostcodeCoordinate rows for ``postcodes``, keyed by postcode."""
+    from .models import PostcodeCoordinate
+
+    now = timezone.now()
+    fresh = {}
+    for row in PostcodeCoordinate.objects.filter(postcode__in=postcodes):
+        ttl = POSTCODE_CACHE_TTL if row.found else POSTCODE_MISS_TTL
+        if row.fetched_at >= now - ttl:
+            fresh[row.postcode] = row
+    return fresh
+
+
+def _store(results):
+    """Upsert ``{postcode: (lat, lng) or None}`` into the postcode cache.
+    Keys that aren't shaped like a UK postcode are left out."""
+    from .models import PostcodeCoordinate
+
+    results = {pc: coord for pc, coord in results.items() if _CACHEABLE_POSTCODE_RE.fullmatch(pc)}
+    if not results:
+        return
+    now = timezone.now()
+    PostcodeCoordinate.objects.bulk_create(
+        [
+            PostcodeCoordinate(
+                postcode=postcode,
+                latitude=coord[0] if coord else None,
+                longitude=coord[1] if coord else None,
+                found=coord is not None,
+                fetched_at=now,
+            )
+            for postcode, coord in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['postcode'],
+        update_fields=['latitude', 'longitude', 'found', 'fetched_at'],
+    )
+
+
+def _as_result(coord):
+    return (coord[0], coord[1], 'postcode') if coord else (None, None, 'failed')
 
 
 def geocode_postcode(postcode):
@@ -162,19 +246,53 @@ def geocode_postcode(postcode):
     ``source`` is ``'postcode'`` on success or ``'failed'`` when the postcode is
     blank, unknown, or has no coordinates. Never raises — returns
     ``(None, None, 'failed')`` on any error so callers degrade gracefully and the
-    dog simply pins at base.
+    dog simply pins at base. Answers from the postcode cache when it can;
+    provider errors are not cached, so the next call tries again.
     """
     if not postcode:
         return (None, None, 'failed')
+    key = normalise_postcode(postcode)
+    row = _cached([key]).get(key)
+    if row is not None:
+        return _as_result((row.latitude, row.longitude) if row.found else None)
     try:
         payload = _fetch_postcodes_io(postcode)
+    except PostcodeNotFound:
+        coord = None
     except PostcodeLookupError:
         return (None, None, 'failed')
-    result = payload.get('result') if isinstance(payload, dict) else None
-    coord = _coord(result)
-    if coord:
-        return (coord[0], coord[1], 'postcode')
-    return (None, None, 'failed')
+    else:
+        coord = _coord(payload.get('result') if isinstance(payload, dict) else None)
+    _store({key: coord})
+    return _as_result(coord)
+
+
+def geocode_postcodes(postcodes):
+    """Geocode many postcodes at once: ``{postcode: (lat, lng, source)}``.
+
+    Cached postcodes cost nothing; the rest go to postcodes.io in bulk lookups
+    of :data:`BULK_LOOKUP_LIMIT`, so a whole kennel takes a request or two.
+    Keys are the normalised postcodes. Never raises — postcodes in a failed
+    bulk request come back ``'failed'`` and are left uncached.
+    """
+    wanted = sorted({normalise_postcode(pc) for pc in postcodes if pc})
+    cached = _cached(wanted)
+    results = {
+        pc: _as_result((row.latitude, row.longitude) if row.found else None)
+        for pc, row in cached.items()
+    }
+    missing = [pc for pc in wanted if pc not in cached]
+    for start in range(0, len(missing), BULK_LOOKUP_LIMIT):
+        chunk = missing[start:start + BULK_LOOKUP_LIMIT]
+        try:
+            found = _fetch_postcodes_io_bulk(chunk)
+        except PostcodeLookupError:
+            results.update(dict.fromkeys(chunk, (None, None, 'failed')))
+            continue
+        coords = {pc: _coord(found.get(pc)) for pc in chunk}
+        _store(coords)
+        results.update({pc: _as_result(coord) for pc, coord in coords.items()})
+    return results
 
 
 def geocode_address(address):
@@ -197,6 +315,26 @@ def effective_postcode(dog):
     return extract_postcode(dog.address) or ''
 
 
+def _apply(dog, postcode, result):
+    """Write a geocode ``result`` for ``postcode`` onto the dog (unsaved)."""
+    dog.latitude, dog.longitude, dog.geocode_source = result
+    dog.geocoded_address = postcode
+    dog.geocoded_at = timezone.now()
+
+
+def _clear_if_stale(dog):
+    """No usable postcode → pin at base; clear any stale coordinates. Returns
+    whether anything changed (unsaved)."""
+    already_clear = (
+        dog.latitude is None and dog.longitude is None
+        and not dog.geocode_source and not dog.geocoded_address
+    )
+    if already_clear:
+        return False
+    _apply(dog, '', (None, None, ''))
+    return True
+
+
 def geocode_dog(dog, force=False, save=True):
     """Refresh a Dog's cached pickup coordinates from its effective postcode.
 
@@ -206,37 +344,46 @@ def geocode_dog(dog, force=False, save=True):
     is no usable postcode. Returns ``True`` if any geocode field was modified.
     Uses :func:`geocode_postcode`, which never raises.
     """
-    from django.utils import timezone
-
     postcode = effective_postcode(dog)
 
     if not postcode:
-        # No usable postcode → pin at base; clear any stale coordinates.
-        already_clear = (
-            dog.latitude is None and dog.longitude is None
-            and not dog.geocode_source and not dog.geocoded_address
-        )
-        if already_clear:
-            return False
-        dog.latitude = None
-        dog.longitude = None
-        dog.geocode_source = ''
-        dog.geocoded_address = ''
-        dog.geocoded_at = timezone.now()
-        if save:
+        changed = _clear_if_stale(dog)
+        if changed and save:
             dog.save(update_fields=GEOCODE_FIELDS)
-        return True
+        return changed
 
     # Already processed this exact postcode (success or failure) → leave it.
     if not force and dog.geocoded_address == postcode:
         return False
 
-    lat, lng, source = geocode_postcode(postcode)
-    dog.latitude = lat
-    dog.longitude = lng
-    dog.geocode_source = source
-    dog.geocoded_address = postcode
-    dog.geocoded_at = timezone.now()
+    _apply(dog, postcode, geocode_postcode(postcode))
     if save:
         dog.save(update_fields=GEOCODE_FIELDS)
     return True
+
+
+def geocode_dogs(dogs, force=False):
+    """:func:`geocode_dog` for many dogs, with one bulk lookup for all their
+    postcodes and one ``bulk_update``. Returns the dogs that changed."""
+    from .models import Dog
+
+    changed, pending = [], []
+    for dog in dogs:
+        postcode = effective_postcode(dog)
+        if not postcode:
+            if _clear_if_stale(dog):
+                changed.append(dog)
+        elif force or dog.geocoded_address != postcode:
+            pending.append((dog, postcode))
+
+    results = geocode_postcodes(postcode for _, postcode in pending)
+    for dog, postcode in pending:
+        _apply(dog, postcode, results[normalise_postcode(postcode)])
+        changed.append(dog)
+    Dog.objects.bulk_update(changed, GEOCODE_FIELDS)
+    if changed:
+        from .conditional import bump_versions
+        from .sync import record_changes
+        bump_versions('dogs')
+        record_changes(Dog, [dog.pk for dog in changed])
+    return changed
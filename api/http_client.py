@@ -0,0 +1,312 @@
+"""Shared outbound HTTP client.
+
+Every third-party call the backend makes — Xero, postcodes.io and
+getAddress.io, the SNS signing-certificate fetch, cron heartbeats — goes
+through :func:`request`. It keeps a few keep-alive connections per host so
+repeat calls skip the TCP + TLS handshake, retries 429 and 5xx responses with
+jittered backoff (honouring ``Retry-After``), and keeps per-host latency and
+error counters, readable with :func:`host_stats`.
+
+Retries are conservative: a 429 is always safe to retry (the server refused
+the request), but a 5xx or a dropped connection is only retried for
+idempotent methods — repeating a POST that the server may already have acted
+on could, say, raise a second invoice in Xero.
+
+Uses the Python standard library only (``http.client``), like the modules it
+serves — adding a pip dependency to a single requirements file breaks the prod
+Docker build. Callers keep their own thin wrapper around :func:`request`
+(``api.xero._api_request`` and friends) as the seam tests patch.
+"""
+import http.client
+import json as _json
+import logging
+import random
+import select
+import ssl
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Idle keep-alive connections kept open per host.
+POOL_SIZE = 4
+
+# Longest Retry-After we are prepared to wait out; beyond it the 429/503 is
+# raised to the caller instead.
+MAX_RETRY_AFTER = 30
+
+# Statuses worth retrying, and the methods a 5xx may be retried for.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+
+class HTTPError(Exception):
+    """The server answered with a 4xx/5xx status (after any retries)."""
+
+    def __init__(self, status, body=b'', headers=None):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+
+class TransportError(Exception):
+    """No response at all: DNS, connect, TLS or timeout failure."""
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self):
+        return self.body.decode('utf-8')
+
+    def json(self):
+        """The body parsed as JSON ({} for an empty body). Raises ValueError."""
+        return _json.loads(self.body.decode('utf-8')) if self.body else {}
+
+
+class HTTPClient:
+    """A thread-safe client with a keep-alive connection pool per host.
+
+    ``timeout`` and ``retries`` default to the ``OUTBOUND_HTTP_TIMEOUT`` and
+    ``OUTBOUND_HTTP_RETRIES`` settings and can be overridden per request.
+    """
+
+    def __init__(self, timeout=None, retries=None, backoff=0.5, max_backoff=8.0,
+                 pool_size=POOL_SIZE, sleep=time.sleep):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._stats = {}
+        self._ssl_context = ssl.create_default_context()
+
+    # -- public API ---------------------------------------------------------
+
+    def request(self, method, url, params=None, headers=None, body=None, json=None, form=None,
+                timeout=None, retries=None):
+        """Send a request and return a :class:`Response`.
+
+        ``json`` / ``form`` encode a body with the matching Content-Type.
+        Raises :class:`HTTPError` for a 4xx/5xx response and
+        :class:`TransportError` when no response arrived.
+        """
+        method = method.upper()
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'Unsupported URL: {url!r}')
+        key = (parts.scheme, parts.hostname, parts.port)
+        target = parts.path or '/'
+        query = '&'.join(q for q in (parts.query, urlencode(params) if params else '') if q)
+        if query:
+            target = f'{target}?{query}'
+
+        headers = {'User-Agent': 'p4td-backend', **(headers or {})}
+        if json is not None:
+            body = _json.dumps(json).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/json')
+        elif form is not None:
+            body = urlencode(form).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+        if timeout is None:
+            timeout = self.timeout if self.timeout is not None else getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 10)
+        if retries is None:
+            retries = self.retries if self.retries is not None else getattr(settings, 'OUTBOUND_HTTP_RETRIES', 2)
+
+        host = parts.netloc
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            started = time.monotonic()
+            try:
+                status, resp_headers, data = self._send(key, method, target, headers, body, timeout)
+            except TransportError:
+                self._record(host, started, error=True)
+                if last or method not in IDEMPOTENT_METHODS:
+                    raise
+                self._retry(host, self._backoff_delay(attempt))
+                continue
+
+            self._record(host, started, error=status >= 400)
+            if status in RETRY_STATUSES and not last and (status == 429 or method in IDEMPOTENT_METHODS):
+                delay = self._retry_delay(attempt, resp_headers.get('retry-after'))
+                if delay is not None:
+                    self._retry(host, delay)
+                    continue
+            if status >= 400:
+                raise HTTPError(status, data, resp_headers)
+            return Response(status, resp_headers, data)
+
+    def host_stats(self):
+        """``{host: {requests, errors, retries, avg_ms, max_ms}}`` since start (or reset)."""
+        with self._lock:
+            return {
+                host: {
+                    'requests': s['requests'],
+                    'errors': s['errors'],
+                    'retries': s['retries'],
+                    'avg_ms': round(s['total_ms'] / s['requests'], 1) if s['requests'] else 0.0,
+                    'max_ms': round(s['max_ms'], 1),
+                }
+                for host, s in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def close(self):
+        """Close every pooled connection."""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+    # -- internals ----------------------------------------------------------
+
+    def _send(self, key, method, target, headers, body, timeout):
+        """One round-trip; returns ``(status, headers, body)``.
+
+        A pooled connection the server has since closed can still fail on
+        first use (it hung up after ``_checkout`` looked), so a failure on a
+        *reused* connection is retried once on a fresh one. Only while sending,
+        though, for a non-idempotent method: once the request is out, the
+        server may have acted on it before the connection died.
+        """
+        conn, reused = self._checkout(key, timeout)
+        sent = False
+        try:
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                sent = True
+                return self._read_response(key, conn)
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError):
+                if not reused or (sent and method not in IDEMPOTENT_METHODS):
+                    raise
+                conn.close()
+                conn = self._new_connection(key, timeout)
+                conn.request(method, target, body=body, headers=headers)
+                return self._read_response(key, conn)
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise TransportError(f'{type(exc).__name__}: {exc}') from exc
+
+    def _read_response(self, key, conn):
+        resp = conn.getresponse()
+        data = resp.read()
+        resp_headers = {name.lower(): value for name, value in resp.getheaders()}
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+        return resp.status, resp_headers, data
+
+    def _new_connection(self, key, timeout):
+        scheme, hostname, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(hostname, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(hostname, port, timeout=timeout)
+
+    def _checkout(self, key, timeout):
+        while True:
+            with self._lock:
+                pool = self._idle.get(key)
+                conn = pool.pop() if pool else None
+            if conn is None:
+                return self._new_connection(key, timeout), False
+            if not self._is_dropped(conn):
+                break
+            conn.close()
+        conn.timeout = timeout
+        conn.sock.settimeout(timeout)
+        return conn, True
+
+    @staticmethod
+    def _is_dropped(conn):
+        # An idle keep-alive connection has nothing to read: readable means the
+        # server hung up (or sent something unasked), so it can't be reused.
+        if conn.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            pool = self._idle.setdefault(key, deque())
+            if len(pool) < self.pool_size:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def _backoff_delay(self, attempt):
+        # "Full jitter": spreads retries from many workers instead of having
+        # them all hit a recovering server at the same instant.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _retry_delay(self, attempt, retry_after):
+        """Seconds to wait before retrying, or None to give up now."""
+        if retry_after is None:
+            return self._backoff_delay(attempt)
+        try:
+            wait = float(retry_after)
+        except ValueError:
+            try:
+                wait = (parsedate_to_datetime(retry_after) - timezone.now()).total_seconds()
+            except (TypeError, ValueError):
+                return self._backoff_delay(attempt)
+        if wait > MAX_RETRY_AFTER:
+            return None
+        return max(wait, 0) + random.uniform(0, self.backoff)
+
+    def _retry(self, host, delay):
+        with self._lock:
+            self._host(host)['retries'] += 1
+        self._sleep(delay)
+
+    def _record(self, host, started, error):
+        elapsed = (time.monotonic() - started) * 1000
+        with self._lock:
+            stats = self._host(host)
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed
+            stats['max_ms'] = max(stats['max_ms'], elapsed)
+
+    def _host(self, host):
+        return self._stats.setdefault(host, {
+            'requests': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+        })
+
+
+_client = HTTPClient()
+
+
+def request(method, url, **kwargs):
+    """:meth:`HTTPClient.request` on the shared process-wide client."""
+    return _client.request(method, url, **kwargs)
+
+
+def host_stats():
+    """Per-host counters for the shared client."""
+    return _client.host_stats()
@@ -0,0 +1,167 @@
+"""Live day-board events, streamed to staff over Server-Sent Events.
+
+Staff watched each other's pickups by polling ``daily-assignments/today``, so
+a dog marked picked up, a reassignment, a swap or a reorder only showed on the
+next poll — and every open day board polled all morning, whether or not
+anything had changed.
+
+Every write to a day's DailyDogAssignment rows now publishes a small event —
+``{"event": "status" | "assignment" | "reorder" | "removed", "date": ...,
+"ids": [...]}`` — from the model signals in api.models and from the bulk
+writers that skip them. ``/api/live/day-board/?date=`` (see
+``day_board_events`` in api.views) holds a stream open per subscribed board
+and writes each event for its date; the app reloads the day when one arrives
+instead of polling.
+
+Fan-out across processes is Postgres LISTEN/NOTIFY: a write runs
+``pg_notify`` inside its transaction, so the event goes out on commit and
+never for a rolled-back write, and each process serving streams keeps one
+LISTEN connection (:class:`_Listener`) that hands notifications to its local
+subscribers. Elsewhere (SQLite in development) events are handed straight to
+this process's subscribers on commit, which is enough for a single
+``uvicorn p4td_backend.asgi:application``.
+
+The stream is an async view and is served from the ASGI entry point
+(``p4td_backend/asgi.py``, the ``live`` service in docker-compose.prod.yml) —
+under gunicorn's sync workers each open stream would hold a thread.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'p4td_day_board'
+
+# NOTIFY payloads are capped at 8000 bytes; past this many ids an event
+# carries ``ids: null`` — "reload the whole day".
+MAX_IDS = 500
+
+# Seconds between keep-alive comments on an idle stream, so proxies and the
+# app's HTTP stack don't time it out.
+KEEPALIVE = 25
+
+
+def publish_assignments(event, rows):
+    """Publish ``event`` for the assignment ``rows`` — ``(id, date)`` pairs —
+    one message per date, once the current transaction commits."""
+    from .models import _as_date
+
+    by_date = defaultdict(set)
+    for pk, day in rows:
+        if day:
+            by_date[_as_date(day).isoformat()].add(pk)
+    for day, ids in sorted(by_date.items()):
+        ids = sorted(pk for pk in ids if pk is not None)
+        _publish({'event': event, 'date': day, 'ids': ids if len(ids) <= MAX_IDS else None})
+
+
+def _publish(message):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(message)])
+    else:
+        transaction.on_commit(lambda: broker.dispatch(message))
+
+
+class _Broker:
+    """This process's subscribers, by date. ``dispatch`` may be called from
+    any thread; each subscriber's queue is fed on its own event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, day):
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[day].add((asyncio.get_running_loop(), queue))
+            if connection.vendor == 'postgresql' and self._listener is None:
+                self._listener = _Listener(self)
+                self._listener.start()
+        return queue
+
+    def unsubscribe(self, day, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(day, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(day, None)
+
+    def dispatch(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(message.get('date'), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:  # the subscriber's loop has closed
+                pass
+
+
+class _Listener(threading.Thread):
+    """One LISTEN connection per process, feeding notifications to the broker.
+    Reconnects after a dropped connection; events sent while it was down are
+    lost, so clients reload the day when their stream reconnects."""
+
+    def __init__(self, broker):
+        super().__init__(name='day-board-listener', daemon=True)
+        self.broker = broker
+
+    def run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Day-board listener lost its connection; reconnecting')
+                time.sleep(5)
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        conn = psycopg2.connect(**connection.get_connection_params())
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    with conn.cursor() as cursor:
+                        cursor.execute('SELECT 1')  # notice a dead connection
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        self.broker.dispatch(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning('Ignoring malformed day-board event: %r', notify.payload)
+        finally:
+            conn.close()
+
+
+broker = _Broker()
+
+
+async def event_stream(day):
+    """The SSE body for ``day`` (an ISO date): an opening ``ready`` event,
+    then every published event for that date, with keep-alives between."""
+    queue = broker.subscribe(day)
+    try:
+        yield 'retry: 5000\n\nevent: ready\ndata: {"date": "%s"}\n\n' % day
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+    finally:
+        broker.unsubscribe(day, queue)
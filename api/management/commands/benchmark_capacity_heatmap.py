@@ -0,0 +1,86 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.scheduling import AttendanceBitmap, ScheduleIndex, daterange
+
+
+def _index_heatmap(start, end):
+    """The heatmap as ScheduleIndex would build it: a set of dog ids per day,
+    every boarding stay expanded day by day, counted per day."""
+    index = ScheduleIndex(start, end)
+    results = []
+    for day in daterange(start, end):
+        attending = index.attending_dog_ids(day)
+        closure = index.closure(day)
+        results.append({
+            'date': day.isoformat(),
+            **index.capacity_info(day),
+            'boarding': len(index.boarding_dog_ids(day) & attending),
+            'closure_type': closure.closure_type if closure else '',
+        })
+    return results
+
+
+def _bitmap_heatmap(start, end):
+    return AttendanceBitmap(start, end).heatmap()
+
+
+IMPLEMENTATIONS = {
+    'index': _index_heatmap,
+    'bitmap': _bitmap_heatmap,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the capacity heatmap from ScheduleIndex against AttendanceBitmap "
+        "over this database's dogs, for ranges starting today (default 30, 90 "
+        "and 365 days): median ms and peak traced memory per range. Read-only; "
+        "fails if the two disagree on any day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, nargs='+', default=[30, 90, 365],
+            help='Range lengths to time (default 30 90 365).',
+        )
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help='Runs per range per implementation (default 5).',
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+        if any(days < 1 for days in options['days']):
+            raise CommandError('--days must be at least 1.')
+
+        start = timezone.localdate()
+        self.stdout.write(f"{'days':<8}{'index':>12}{'bitmap':>12}{'index mem':>12}{'bitmap mem':>12}")
+        for days in options['days']:
+            end = start + timedelta(days=days - 1)
+            medians, peaks, outputs = {}, {}, {}
+            for name, build in IMPLEMENTATIONS.items():
+                timings = []
+                for _ in range(options['runs']):
+                    started = time.perf_counter()
+                    outputs[name] = build(start, end)
+                    timings.append(time.perf_counter() - started)
+                medians[name] = sorted(timings)[len(timings) // 2]
+
+                tracemalloc.start()
+                build(start, end)
+                peaks[name] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            if outputs['bitmap'] != outputs['index']:
+                raise CommandError(f'The implementations disagree over {days} days.')
+            self.stdout.write(
+                f"{days:<8}{medians['index'] * 1000:>10.1f}ms{medians['bitmap'] * 1000:>10.1f}ms"
+                f"{peaks['index'] / 1024:>10.0f}KB{peaks['bitmap'] / 1024:>10.0f}KB"
+            )
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,151 @@
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+
+from api.views import IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_WIDTHS, process_image_variants
+
+# Built when no --corpus is given: the shapes phones actually upload.
+FIXTURES = [
+    ('12mp.jpg', (4000, 3000), 'JPEG', 1),
+    ('12mp-portrait-exif.jpg', (4000, 3000), 'JPEG', 6),
+    ('48mp.jpg', (8000, 6000), 'JPEG', 1),
+    ('12mp.png', (4000, 3000), 'PNG', 1),
+]
+
+
+def _previous_variants(image_file, main_size=(1280, 1280), thumb_size=(400, 400)):
+    """The pipeline process_image_variants replaced: a full-resolution decode,
+    a transposed full-size copy, and a further full-size copy per output,
+    every output resized from the original."""
+    image_file.seek(0)
+    img = ImageOps.exif_transpose(Image.open(image_file))
+    if img.mode not in ('RGB', 'L', 'CMYK'):
+        img = img.convert('RGB')
+
+    def encode(size, quality, image_format='JPEG'):
+        im = img.copy()
+        if im.width > size[0] or im.height > size[1]:
+            im.thumbnail(size, Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        if image_format == 'WEBP':
+            im.save(out, format='WEBP', quality=quality, method=4)
+        else:
+            im.save(out, format='JPEG', quality=quality, optimize=True)
+        return im.size
+
+    main_width, _ = encode(main_size, 85)
+    encode(thumb_size, 70)
+    for width in sorted({min(w, main_width) for w in IMAGE_VARIANT_WIDTHS} | {main_width}):
+        for image_format, _, quality in IMAGE_VARIANT_FORMATS:
+            if not (image_format == 'JPEG' and width == main_width):
+                encode((width, img.height), quality, image_format)
+
+
+IMPLEMENTATIONS = {
+    'previous': _previous_variants,
+    'current': process_image_variants,
+}
+
+
+def _measure(name, paths, runs, results):
+    """Runs in a fresh process so each implementation's peak RSS is its own."""
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    per_image = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            IMPLEMENTATIONS[name](io.BytesIO(data))
+            timings.append(time.perf_counter() - started)
+        per_image[os.path.basename(path)] = sorted(timings)[len(timings) // 2]
+    results[name] = {
+        'per_image': per_image,
+        'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the upload image pipeline (main image, thumbnail and responsive "
+        "variants) against the implementation it replaced: median ms per "
+        "image and peak memory, each implementation in its own process. Runs "
+        "over --corpus, or over generated 12/48 MP fixtures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', help='Directory of images to run over.')
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Runs per image per implementation (default 3).',
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+
+        workdir = None
+        if options['corpus']:
+            corpus = options['corpus']
+            if not os.path.isdir(corpus):
+                raise CommandError(f'No such directory: {corpus}')
+            paths = sorted(
+                os.path.join(corpus, name) for name in os.listdir(corpus)
+                if os.path.isfile(os.path.join(corpus, name))
+            )
+        else:
+            workdir = tempfile.mkdtemp()
+            paths = [self._fixture(workdir, *spec) for spec in FIXTURES]
+        if not paths:
+            raise CommandError('The corpus is empty.')
+
+        try:
+            ctx = multiprocessing.get_context('fork')
+            results = ctx.Manager().dict()
+            for name in IMPLEMENTATIONS:
+                proc = ctx.Process(target=_measure, args=(name, paths, options['runs'], results))
+                proc.start()
+                proc.join()
+        finally:
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        missing = [name for name in IMPLEMENTATIONS if name not in results]
+        if missing:
+            raise CommandError(f"The {', '.join(missing)} run crashed.")
+
+        previous, current = results['previous'], results['current']
+        self.stdout.write(f"{'image':<28}{'previous':>12}{'current':>12}")
+        for image, before in previous['per_image'].items():
+            after = current['per_image'][image]
+            self.stdout.write(f"{image:<28}{before * 1000:>10.0f}ms{after * 1000:>10.0f}ms")
+        mean_before = sum(previous['per_image'].values()) / len(paths) * 1000
+        mean_after = sum(current['per_image'].values()) / len(paths) * 1000
+        self.stdout.write(f"{'mean ms/image':<28}{mean_before:>10.0f}ms{mean_after:>10.0f}ms")
+        self.stdout.write(
+            f"{'peak RSS':<28}{previous['peak_kb'] / 1024:>10.0f}MB{current['peak_kb'] / 1024:>10.0f}MB"
+        )
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    @staticmethod
+    def _fixture(workdir, name, size, image_format, orientation):
+        # Noise over a gradient, so the encoder has real detail to chew on.
+        img = Image.merge('RGB', [
+            Image.linear_gradient('L').resize(size),
+            Image.effect_noise(size, 48),
+            Image.linear_gradient('L').rotate(90).resize(size),
+        ])
+        exif = img.getexif()
+        if orientation != 1:
+            exif[0x0112] = orientation
+        path = os.path.join(workdir, name)
+        img.save(path, format=image_format, **({'exif': exif.tobytes(), 'quality': 90} if image_format == 'JPEG' else {}))
+        return path
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from api.views import generate_video_thumbnail
+
+
+class _UploadedVideo(File):
+    """Stands in for the TemporaryUploadedFile Django hands the view for any
+    upload over FILE_UPLOAD_MAX_MEMORY_SIZE: an open file with a path."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _previous_thumbnail(file_obj):
+    """The implementation generate_video_thumbnail replaced: the whole upload
+    read into memory, written to a second temp file, decoded from the start
+    and written to a third (the JPEG) before being read back."""
+    file_obj.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp_video:
+        tmp_video.write(file_obj.read())
+        tmp_video_path = tmp_video.name
+    file_obj.seek(0)
+    thumb_path = tempfile.mktemp(suffix='.jpg')
+    try:
+        subprocess.run([
+            'ffmpeg', '-i', tmp_video_path, '-vframes', '1', '-vf', 'scale=400:-2', '-y', thumb_path,
+        ], capture_output=True, timeout=30, text=True)
+        if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 0:
+            with open(thumb_path, 'rb') as f:
+                return f.read()
+        return None
+    finally:
+        for p in (tmp_video_path, thumb_path):
+            if os.path.exists(p):
+                os.unlink(p)
+
+
+IMPLEMENTATIONS = {
+    'previous': _previous_thumbnail,
+    'current': lambda f: generate_video_thumbnail(f),
+}
+
+
+def _measure(name, path, runs, results):
+    """Runs in a fresh process so each implementation's peak RSS is its own."""
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    ok = True
+    with _UploadedVideo(open(path, 'rb'), name=os.path.basename(path)) as video:
+        for _ in range(runs):
+            started = time.perf_counter()
+            ok = bool(IMPLEMENTATIONS[name](video)) and ok
+            timings.append(time.perf_counter() - started)
+    results[name] = {
+        'ok': ok,
+        'timings': timings,
+        'python_peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb,
+        'ffmpeg_peak_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare generate_video_thumbnail against the implementation it "
+        "replaced on a real video file: wall time per thumbnail, and the peak "
+        "memory of the Python process and of ffmpeg. Each implementation runs "
+        "in its own process so the peaks don't mask each other."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('video', help='Path to a video file, e.g. a phone MP4.')
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help='Thumbnails per implementation (default 5).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['video']
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        if shutil.which('ffmpeg') is None:
+            raise CommandError('ffmpeg is not installed.')
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        self.stdout.write(f"{os.path.basename(path)}: {size_mb:.1f} MB, {options['runs']} run(s) each")
+
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Manager().dict()
+        for name in IMPLEMENTATIONS:
+            proc = ctx.Process(target=_measure, args=(name, path, options['runs'], results))
+            proc.start()
+            proc.join()
+
+        for name in IMPLEMENTATIONS:
+            r = results.get(name)
+            if r is None:
+                raise CommandError(f'The {name} run crashed.')
+            timings = sorted(r['timings'])
+            self.stdout.write(
+                f"{name:>8}: median {timings[len(timings) // 2] * 1000:.0f}ms, "
+                f"best {timings[0] * 1000:.0f}ms; peak RSS python +{r['python_peak_kb'] / 1024:.1f} MB, "
+                f"ffmpeg {r['ffmpeg_peak_kb'] / 1024:.1f} MB"
+                + ('' if r['ok'] else ' (no thumbnail produced)')
+            )
+        self.stdout.write(self.style.SUCCESS('Done.'))
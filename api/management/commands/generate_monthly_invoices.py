@@ -4,8 +4,14 @@ Designed to run from cron on the 1st of each month, billing the previous
 calendar month in arrears. Idempotent: customers who already have a non-VOID
 invoice for the period are skipped, so reruns create nothing new. Staff with
 can_manage_payments get a push prompting them to review and send the drafts.
+
+``--dry-run --profile`` works the month out without writing anything and
+reports the query count and wall time it took.
 """
+import time
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.utils import timezone
 
 from api import billing
@@ -19,6 +25,10 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--year', type=int, help='Billing year (defaults to the previous calendar month).')
         parser.add_argument('--month', type=int, help='Billing month 1-12 (defaults to the previous calendar month).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Work out the invoices and report them without writing anything.')
+        parser.add_argument('--profile', action='store_true',
+                            help='Report the number of database queries and wall time taken.')
 
     def handle(self, *args, **options):
         year, month = options.get('year'), options.get('month')
@@ -30,12 +40,34 @@ class Command(BaseCommand):
         if not 1 <= month <= 12:
             raise CommandError('Month must be 1-12.')
 
-        created, skipped, manual = billing.generate_invoices_for_month(year, month)
+        dry_run = options['dry_run']
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            created, skipped, manual = billing.generate_invoices_for_month(year, month, dry_run=dry_run)
+        elapsed = time.perf_counter() - started
+
         label = created[0].period_label if created else f'{month}/{year}'
-        self.stdout.write(
-            f'Created {len(created)} draft invoice(s) for {label}; '
-            f'skipped {skipped} already billed, {manual} on manual Xero billing.'
-        )
+        if dry_run:
+            total = sum((invoice.total for invoice in created), 0)
+            self.stdout.write(
+                f'[dry-run] Would create {len(created)} draft invoice(s) for {label} totalling £{total}; '
+                f'skipped {skipped} already billed, {manual} on manual Xero billing.'
+            )
+        else:
+            self.stdout.write(
+                f'Created {len(created)} draft invoice(s) for {label}; '
+                f'skipped {skipped} already billed, {manual} on manual Xero billing.'
+            )
+        if options['profile']:
+            self.stdout.write(f'Profile: {len(queries)} queries in {elapsed * 1000:.0f}ms.')
+        if dry_run:
+            return
 
         if created:
             send_staff_notification(
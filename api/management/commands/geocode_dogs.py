@@ -3,7 +3,7 @@ import time
 from django.core.management.base import BaseCommand
 
 from api.models import Dog
-from api.geocoding import geocode_dog, effective_postcode
+from api.geocoding import BULK_LOOKUP_LIMIT, effective_postcode, geocode_dogs
 
 
 def _needs_geocode(dog, force):
@@ -27,7 +27,9 @@ class Command(BaseCommand):
     help = (
         'Geocode dog pickup addresses (via postcodes.io, keyless) and cache the '
         'coordinates on each Dog for the staff pickup map. Idempotent: only '
-        'touches dogs whose address is new, changed, or not yet geocoded.'
+        'touches dogs whose address is new, changed, or not yet geocoded. '
+        'Postcodes are looked up in bulk and shared through the postcode cache, '
+        'so dogs at the same postcode cost one lookup.'
     )
 
     def add_arguments(self, parser):
@@ -51,7 +53,7 @@ class Command(BaseCommand):
             '--sleep',
             type=float,
             default=0.2,
-            help='Seconds to pause between provider calls (default: 0.2).',
+            help='Seconds to pause between bulk provider requests (default: 0.2).',
         )
 
     def handle(self, *args, **options):
@@ -79,21 +81,22 @@ class Command(BaseCommand):
             return
 
         counts = {'house': 0, 'postcode': 0, 'failed': 0, 'cleared': 0}
-        for i, dog in enumerate(candidates):
-            had_address = bool((dog.address or '').strip())
-            geocode_dog(dog, force=force)
-            if not had_address:
-                counts['cleared'] += 1
-            else:
+        for start in range(0, len(candidates), BULK_LOOKUP_LIMIT):
+            if start and sleep:
+                # Be polite to the provider between bulk requests.
+                time.sleep(sleep)
+            batch = candidates[start:start + BULK_LOOKUP_LIMIT]
+            geocode_dogs(batch, force=force)
+            for dog in batch:
+                if not dog.geocoded_address:
+                    counts['cleared'] += 1
+                    continue
                 counts[dog.geocode_source if dog.geocode_source in counts else 'failed'] += 1
                 coord = (
                     f'{dog.latitude:.5f},{dog.longitude:.5f}'
                     if dog.latitude is not None else 'no match'
                 )
                 self.stdout.write(f'  {dog.name}: {dog.geocode_source or "—"} ({coord})')
-                # Be polite to the provider between network calls.
-                if sleep and i < len(candidates) - 1:
-                    time.sleep(sleep)
 
         self.stdout.write(self.style.SUCCESS(
             'Done. '
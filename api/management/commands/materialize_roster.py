@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.cron_heartbeat import ping_heartbeat
+from api.scheduling import materialize_roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialize the daily roster (DailyDogAssignment rows from the weekday "
+        "roster and boarding stays) for today and the next N-1 days in one "
+        "pass, and mark each day materialized so the roster endpoints skip the "
+        "work on load. Run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=14,
+            help='Number of days from today to materialize (default 14).',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days < 1:
+            raise CommandError('--days must be at least 1.')
+        start = timezone.localdate()
+        end = start + timedelta(days=days - 1)
+        created = materialize_roster(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized roster for {start} to {end}: {created} assignment(s) created."
+        ))
+        ping_heartbeat('materialize-roster')
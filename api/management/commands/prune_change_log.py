@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync change-log entries older than N days (default 30). A phone "
+        "whose last sync token is older than what is left gets reset: true from "
+        "/api/sync/ and refetches its lists. The newest entry is always kept, "
+        "so the log never loses track of the current token. Run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help='Delete entries created more than this many days ago (default 30).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be deleted without deleting anything.',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        cutoff = timezone.now() - timedelta(days=days)
+        newest = ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first()
+        qs = ChangeLogEntry.objects.filter(created_at__lt=cutoff).exclude(id=newest)
+        count = qs.count()
+        if options['dry_run']:
+            self.stdout.write(f"[dry-run] Would delete {count} change-log entries older than {days} days.")
+            return
+        qs.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {count} change-log entries older than {days} days."
+        ))
@@ -7,6 +7,7 @@ from datetime import timedelta
 
 from api.models import GroupMedia
 from api.cron_heartbeat import ping_heartbeat
+from api.media_processing import delete_variant_files
 
 
 class Command(BaseCommand):
@@ -49,8 +50,11 @@ class Command(BaseCommand):
                     file_count += 1
                 if item.thumbnail:
                     file_count += 1
+                file_count += sum(1 for v in item.variants if v['name'] != item.file.name)
         else:
             for item in old_items.iterator():
+                file_count += sum(1 for v in item.variants if v['name'] != item.file.name)
+                delete_variant_files(item)
                 if item.file:
                     item.file.delete(save=False)
                     file_count += 1
@@ -94,11 +98,13 @@ class Command(BaseCommand):
                 referenced.add(item.file.name.replace('\\', '/'))
             if item.thumbnail:
                 referenced.add(item.thumbnail.name.replace('\\', '/'))
+            referenced.update(v['name'].replace('\\', '/') for v in item.variants)
         for photo in Photo.objects.all().iterator():
             if photo.file:
                 referenced.add(photo.file.name.replace('\\', '/'))
             if photo.thumbnail:
                 referenced.add(photo.thumbnail.name.replace('\\', '/'))
+            referenced.update(v['name'].replace('\\', '/') for v in photo.variants)
 
         orphan_count = 0
         dirs_to_scan = [
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.badges import STAFF_BADGES, refresh_badges
+from api.models import BadgeCount
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount every stored action-item badge (and the staff badges, stored "
+        "or not) from the tables behind them. The badges are kept current as "
+        "rows change; run this after a data fix or import that bypassed the "
+        "model signals."
+    )
+
+    def handle(self, *args, **options):
+        keys = {*STAFF_BADGES, 'unread_inquiries', *BadgeCount.objects.values_list('key', flat=True)}
+        refresh_badges(*keys)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt badge counts: {len(keys)} badge(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.models import refresh_feed_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount every feed post's comment_count and reaction_counts from its "
+        "comments and reactions. The counters are kept current as people "
+        "comment and react; run this after a data fix or import that bypassed "
+        "the model signals."
+    )
+
+    def handle(self, *args, **options):
+        posts = refresh_feed_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt feed counters: {posts} post(s)."))
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import date as date_cls, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Dog, DogScheduleDay, ScheduleDay
+from api.scheduling import (
+    SNAPSHOT_FIELDS, ScheduleIndex, daterange, sync_dog_schedule_days, weekday_numbers,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the persisted ScheduleDay snapshot for a window of dates "
+        "from the source tables and repair any row that has drifted (e.g. "
+        "after a bulk write that bypassed the model signals). Missing rows "
+        "in the window are created. Each dog's DogScheduleDay weekdays are "
+        "checked against its daycare_days first. Run nightly, or after data fixes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', type=str, default=None,
+            help='First date to rebuild, YYYY-MM-DD (default today).',
+        )
+        parser.add_argument(
+            '--days', type=int, default=92,
+            help='Number of days to rebuild from --start (default 92).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted and missing rows without writing anything.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = (
+                date_cls.fromisoformat(options['start'])
+                if options['start'] else timezone.localdate()
+            )
+        except ValueError:
+            raise CommandError('--start must be YYYY-MM-DD.')
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+        end = start + timedelta(days=options['days'] - 1)
+
+        with transaction.atomic():
+            # The weekday mirror first: ScheduleIndex reads it.
+            stored_weekdays = defaultdict(set)
+            for dog_id, weekday in DogScheduleDay.objects.values_list('dog_id', 'weekday'):
+                stored_weekdays[dog_id].add(weekday)
+            drifted_dogs = [
+                (dog_id, days) for dog_id, days in Dog.objects.values_list('id', 'daycare_days')
+                if set(weekday_numbers(days)) != stored_weekdays.get(dog_id, set())
+            ]
+            if options['dry_run']:
+                for dog_id, _ in drifted_dogs:
+                    self.stdout.write(f"[dry-run] Dog {dog_id}'s schedule weekdays have drifted.")
+            else:
+                for dog_id, days in drifted_dogs:
+                    sync_dog_schedule_days(dog_id, days)
+
+            index = ScheduleIndex(start, end)
+            stored = {
+                row.date: row
+                for row in ScheduleDay.objects.select_for_update().filter(date__range=(start, end))
+            }
+            to_create, drifted = [], []
+            for day in daterange(start, end):
+                fields = index.snapshot_fields(day)
+                row = stored.get(day)
+                if row is None:
+                    to_create.append(ScheduleDay(date=day, **fields))
+                    continue
+                if all(getattr(row, name) == fields[name] for name in SNAPSHOT_FIELDS):
+                    continue
+                for name, value in fields.items():
+                    setattr(row, name, value)
+                row.version += 1
+                row.updated_at = timezone.now()
+                drifted.append(row)
+
+            if options['dry_run']:
+                for row in drifted:
+                    self.stdout.write(f"[dry-run] {row.date} has drifted.")
+                self.stdout.write(
+                    f"[dry-run] Would create {len(to_create)} and repair {len(drifted)} "
+                    f"schedule day(s) between {start} and {end}."
+                )
+                return
+
+            ScheduleDay.objects.bulk_create(to_create, ignore_conflicts=True)
+            if drifted:
+                ScheduleDay.objects.bulk_update(drifted, [*SNAPSHOT_FIELDS, 'version', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(to_create)} and repaired {len(drifted)} schedule day(s) "
+            f"between {start} and {end}; resynced {len(drifted_dogs)} dog(s)' weekdays."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.scheduling import refresh_staff_affinity
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the DogStaffAffinity table (who has had each dog on each "
+        "weekday, how often and how recently) from DailyDogAssignment. The "
+        "table is kept current as assignments change; run this after a data "
+        "fix or import that bypassed the model signals."
+    )
+
+    def handle(self, *args, **options):
+        rows = refresh_staff_affinity()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt staff affinity: {rows} row(s)."))
@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.billing import claim_send_job, run_send_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued invoice batches (InvoiceSendJob rows created by the "
+        "send-all action) to Xero, within Xero's rate limits. Runs until "
+        "stopped, polling for queued jobs; a job abandoned by a dead worker is "
+        "resumed once its lease lapses. Use --once to run what is queued and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval', type=float, default=5.0,
+            help='Seconds to sleep when no job is queued (default 5).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run every queued job, then exit.',
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        finished = 0
+        while not self._stopping:
+            close_old_connections()
+            job = claim_send_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            run_send_job(job)
+            finished += 1
+            self.stdout.write(
+                f"Send job #{job.id} ({job.period_month}/{job.period_year}): "
+                f"sent {job.sent} of {job.total}, {len(job.failed)} failed."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Invoice send worker stopped: {finished} job(s) run."))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
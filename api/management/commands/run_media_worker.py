@@ -0,0 +1,75 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.media_processing import make_executor, process_pending_media, requeue_interrupted
+
+
+class Command(BaseCommand):
+    help = (
+        "Resize and thumbnail uploaded photos and videos (rows with "
+        "processing_state PENDING) in a pool of worker processes, and swap the "
+        "results in. Runs until stopped, polling for new uploads; run a single "
+        "instance — uploads a previous worker left half-done are requeued at "
+        "start. Use --once to process what is pending and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Processes in the pool (default: one per CPU).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=20,
+            help='Uploads to claim per pass (default 20).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to sleep when nothing is pending (default 2).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process everything currently pending, then exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        self._stopping = False
+        if not options['once']:
+            # Finish the batch in hand on SIGTERM rather than stranding it.
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        requeued = requeue_interrupted()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} upload(s) left mid-processing.")
+
+        ready = failed = 0
+        with make_executor(options['workers']) as executor:
+            while not self._stopping:
+                close_old_connections()
+                stats = process_pending_media(executor, limit=options['batch_size'])
+                ready += stats['ready']
+                failed += stats['failed']
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"Processed {stats['claimed']}: {stats['ready']} ready, {stats['failed']} failed."
+                    )
+                if stats['claimed'] == options['batch_size']:
+                    continue  # more may be pending — go straight back for them
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Media worker stopped: {ready} ready, {failed} failed."
+        ))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
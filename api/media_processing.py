@@ -0,0 +1,329 @@
+"""Background processing for uploaded photos and videos.
+
+Dog photos, feed items, incident media and defect photos used to be resized
+and thumbnailed inside the upload request: a full decode, two LANCZOS resizes
+and two ``optimize=True`` JPEG encodes per photo, or an ffmpeg run (up to 30s)
+per video, each holding one of gunicorn's few threads. A staff member posting
+ten photos from the field stalled the API for everyone else.
+
+The views now only run the cheap checks (extension, size, Pillow ``verify()``)
+and store the upload under a generated name (a photo stripped of its
+metadata first) with ``processing_state='PENDING'``. The ``run_media_worker``
+command calls :func:`process_pending_media`, which renders the derivatives in a
+process pool — the work is CPU-bound, so threads would serialise on the GIL —
+and swaps them in: the resized JPEG replaces the raw file, the thumbnail is
+filled in and the row becomes READY. A photo that can't be decoded after all
+is marked FAILED and keeps its (stripped) raw file for a look in the admin.
+
+Claims are a conditional PENDING→PROCESSING update, so two workers never
+render the same row. A row left PROCESSING by a worker that died is put back
+by :func:`requeue_interrupted` when the worker starts, which is why the
+deployment runs a single worker (its pool provides the parallelism).
+"""
+import io
+import logging
+import os
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# (model, file field, longest edge of the resized photo, builds responsive
+# variants). Every model also has a ``thumbnail`` ImageField; only those with a
+# ``media_type`` can hold video, and only those with ``variants`` get them.
+MEDIA_TARGETS = [
+    ('Photo', 'file', (1280, 1280), True),
+    ('GroupMedia', 'file', (1280, 1280), True),
+    ('IncidentMedia', 'file', (1600, 1600), True),
+    ('VehicleDefectImage', 'image', (1280, 1280), False),
+    ('FacilityDefectImage', 'image', (1280, 1280), False),
+]
+
+
+def store_raw(upload, media_type='PHOTO'):
+    """Give an upload a random name, and strip a photo's metadata, before it
+    is saved unprocessed. Returns the file to save.
+
+    The processed copy always got a random name (stored media URLs must not be
+    guessable from the original filename); the raw file now sits on disk until
+    the worker replaces it, so it needs one too. The extension is kept — it
+    passed the allow-list in ``validate_media_upload`` — unless the photo had
+    to be re-encoded.
+
+    The raw photo is also served until then (and for good if it FAILED), so
+    the EXIF a phone writes — GPS position, device serials — can't wait for
+    the resize to drop it.
+    """
+    ext = os.path.splitext(getattr(upload, 'name', '') or '')[1].lower()
+    if media_type == 'PHOTO':
+        data, new_ext = _strip_metadata(upload)
+        if data is not None:
+            upload, ext = ContentFile(data), new_ext or ext
+    upload.name = f'{uuid.uuid4().hex}{ext}'
+    return upload
+
+
+# EXIF Orientation: the one tag a raw photo keeps, so the worker still turns
+# it the right way up.
+_ORIENTATION = 0x0112
+
+# JPEG markers dropped from a raw photo: APP1 (EXIF, XMP), APP13 (IPTC) and
+# comments. APP2 is kept for ICC profiles, but not as the MPO index.
+_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+
+
+def _strip_metadata(upload):
+    """A validated photo's bytes without its metadata, and the extension to
+    store them under (None to keep the upload's). ``(None, None)`` if there
+    was nothing to strip.
+
+    JPEGs — nearly every camera upload — are rewritten segment by segment
+    without a decode, keeping only the orientation and cutting anything after
+    the first image (MPO frames, vendor trailers). Any other format carrying
+    EXIF or XMP is decoded and re-encoded as JPEG, as the worker would.
+    """
+    from PIL import Image, ImageOps
+
+    upload.seek(0)
+    data = upload.read()
+    upload.seek(0)
+    with Image.open(io.BytesIO(data)) as img:
+        exif = img.getexif()
+        if img.format in ('JPEG', 'MPO'):
+            return _strip_jpeg(data, exif.get(_ORIENTATION)), None
+        if not (exif or img.info.keys() & {'exif', 'xmp', 'XML:com.adobe.xmp'}):
+            return None, None
+        upright = ImageOps.exif_transpose(img)
+    buf = io.BytesIO()
+    upright.convert('RGB').save(buf, format='JPEG', quality=95)
+    return buf.getvalue(), '.jpg'
+
+
+def _strip_jpeg(data, orientation):
+    out = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos + 1] == 0xFF:  # fill byte before a marker
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker == 0xDA:
+            # Start of scan: entropy-coded data can't contain FFD9, so the
+            # first one is this image's end.
+            end = data.find(b'\xff\xd9', pos)
+            out.append(data[pos:] if end < 0 else data[pos:end + 2])
+            break
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        segment = data[pos:pos + 2 + length]
+        if marker not in _METADATA_MARKERS and not (marker == 0xE2 and segment[4:8] == b'MPF\x00'):
+            out.append(segment)
+        pos += 2 + length
+
+    if orientation not in (None, 1):
+        from PIL import Image
+        exif = Image.Exif()
+        exif[_ORIENTATION] = orientation
+        payload = exif.tobytes()
+        # After a JFIF header, which has to come first.
+        at = 2 if len(out) > 1 and out[1][:2] == b'\xff\xe0' else 1
+        out.insert(at, b'\xff\xe1' + (len(payload) + 2).to_bytes(2, 'big') + payload)
+    return b''.join(out)
+
+
+def requeue_interrupted():
+    """Return rows stranded in PROCESSING (their worker died) to PENDING."""
+    requeued = 0
+    for model_name, *_ in MEDIA_TARGETS:
+        model = apps.get_model('api', model_name)
+        moved = model.objects.filter(processing_state='PROCESSING').update(processing_state='PENDING')
+        if moved:
+            _changed(model)
+        requeued += moved
+    return requeued
+
+
+def process_pending_media(executor, limit=20):
+    """Claim up to ``limit`` PENDING uploads, render them on ``executor`` and
+    swap the results in. Returns ``{'claimed', 'ready', 'failed'}``."""
+    claimed = []
+    for model_name, field_name, main_size, with_variants in MEDIA_TARGETS:
+        model = apps.get_model('api', model_name)
+        remaining = limit - len(claimed)
+        if remaining <= 0:
+            break
+        candidates = (
+            model.objects.filter(processing_state='PENDING')
+            .order_by('id')
+            .values_list('id', flat=True)[:remaining]
+        )
+        for pk in list(candidates):
+            if model.objects.filter(pk=pk, processing_state='PENDING').update(processing_state='PROCESSING'):
+                claimed.append((model.objects.get(pk=pk), field_name, main_size, with_variants))
+        if any(type(obj) is model for obj, *_ in claimed):
+            _changed(model)
+
+    stats = {'claimed': len(claimed), 'ready': 0, 'failed': 0}
+    futures = {}
+    for obj, field_name, main_size, with_variants in claimed:
+        fieldfile = getattr(obj, field_name)
+        media_type = getattr(obj, 'media_type', 'PHOTO')
+        future = executor.submit(render_derivatives, _source(fieldfile), media_type, main_size, with_variants)
+        futures[future] = (obj, field_name)
+
+    for future in as_completed(futures):
+        obj, field_name = futures[future]
+        try:
+            result = future.result()
+        except Exception as exc:  # a crashed pool process, not a bad image
+            logger.exception('Media processing crashed for %s #%s', type(obj).__name__, obj.pk)
+            result = {'error': f'{type(exc).__name__}: {exc}'}
+        if _swap_in(obj, field_name, result):
+            stats['ready'] += 1
+        else:
+            stats['failed'] += 1
+    return stats
+
+
+def make_executor(workers=None):
+    """The process pool ``process_pending_media`` renders on.
+
+    A daemonic process (e.g. a ``manage.py test --parallel`` worker) may not
+    start children, so there the renders run on threads in this process.
+    """
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+
+
+def _init_process():
+    # Pool processes import api.views for the image helpers, which needs the
+    # app registry — already populated under fork, not under spawn.
+    import django
+    django.setup()
+
+
+def _source(fieldfile):
+    """A filesystem path the pool process can open itself, or the file's bytes
+    for a storage without local paths."""
+    try:
+        return fieldfile.path
+    except NotImplementedError:
+        with fieldfile.open('rb') as f:
+            return f.read()
+
+
+def render_derivatives(source, media_type, main_size, with_variants=False):
+    """Runs in a pool process: build the resized photo, the thumbnail and,
+    with ``with_variants``, the responsive renditions.
+
+    Returns a dict of plain bytes so nothing Django-specific crosses the
+    process boundary: ``main``/``main_name`` (photos only), ``thumb``/
+    ``thumb_name`` (may be missing for a video ffmpeg couldn't read),
+    ``variants`` (a list of dicts, ``data`` None for the one that is the main
+    image), or ``error`` when a photo can't be decoded.
+    """
+    from .views import ImageProcessingError, generate_video_thumbnail, process_image_variants
+
+    if media_type == 'VIDEO':
+        # A path goes straight to ffmpeg; the video is never read in here.
+        thumb = generate_video_thumbnail(source if isinstance(source, str) else io.BytesIO(source))
+        return {'thumb': thumb.read(), 'thumb_name': f'{uuid.uuid4().hex}_thumb.jpg'} if thumb else {}
+
+    handle = open(source, 'rb') if isinstance(source, str) else io.BytesIO(source)
+    with handle:
+        try:
+            main, thumb, variants = process_image_variants(
+                handle, main_size=main_size, **({} if with_variants else {'widths': ()}),
+            )
+        except ImageProcessingError as exc:
+            return {'error': str(exc.__cause__ or exc)}
+    return {
+        'main': main.read(), 'main_name': main.name,
+        'thumb': thumb.read(), 'thumb_name': thumb.name,
+        'variants': [
+            {
+                'format': image_format,
+                'width': (f or main).width,
+                'height': (f or main).height,
+                'name': f.name if f else None,
+                'data': f.read() if f else None,
+            }
+            for image_format, f in variants
+        ],
+    }
+
+
+def _swap_in(obj, field_name, result):
+    """Store a render result and flip the row to READY (or FAILED).
+
+    Returns True if the row is now READY. The update is conditional on the
+    row still being ours, so an upload deleted mid-render doesn't leave the
+    new files behind.
+    """
+    model = type(obj)
+    if result.get('error'):
+        logger.warning('Could not process %s #%s: %s', model.__name__, obj.pk, result['error'])
+        if model.objects.filter(pk=obj.pk, processing_state='PROCESSING').update(processing_state='FAILED'):
+            _changed(model)
+        return False
+
+    raw_name = getattr(obj, field_name).name
+    written = []
+    changes = {'processing_state': 'READY'}
+    for key, name_field in (('main', field_name), ('thumb', 'thumbnail')):
+        if key not in result:
+            continue
+        field = model._meta.get_field(name_field)
+        name = field.storage.save(
+            field.generate_filename(obj, result[f'{key}_name']), ContentFile(result[key]),
+        )
+        written.append((field.storage, name))
+        changes[name_field] = name
+
+    field = model._meta.get_field(field_name)
+    if result.get('variants'):
+        changes['variants'] = []
+        for variant in result['variants']:
+            if variant['data'] is None:
+                name, size = changes[field_name], len(result['main'])
+            else:
+                name = field.storage.save(
+                    field.generate_filename(obj, variant['name']), ContentFile(variant['data']),
+                )
+                size = len(variant['data'])
+                written.append((field.storage, name))
+            changes['variants'].append({
+                'width': variant['width'], 'height': variant['height'],
+                'format': variant['format'], 'bytes': size, 'name': name,
+            })
+
+    storage = field.storage
+    if model.objects.filter(pk=obj.pk, processing_state='PROCESSING').update(**changes):
+        _changed(model)
+        if field_name in changes:
+            storage.delete(raw_name)
+        return True
+    for file_storage, name in written:
+        file_storage.delete(name)
+    return False
+
+
+def _changed(model):
+    # These updates skip post_save; the feed shows processing_state and the
+    # processed files, so its ETag has to move with them (api.conditional).
+    if model._meta.model_name == 'groupmedia':
+        from .conditional import bump_versions
+        bump_versions('feed')
+
+
+def delete_variant_files(obj):
+    """Delete the files behind ``obj.variants`` (not the main image, which
+    the caller deletes with the row's own files)."""
+    storage = obj._meta.get_field('file').storage
+    for variant in getattr(obj, 'variants', None) or []:
+        if variant['name'] != obj.file.name:
+            storage.delete(variant['name'])
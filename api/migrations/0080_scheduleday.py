@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0079_dailydogassignment_from_boarding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('dog_ids', models.JSONField(default=list, help_text='Ids of every dog attending (daycare + boarding).')),
+                ('boarding_dog_ids', models.JSONField(default=list, help_text='The subset of dog_ids here on an approved boarding stay.')),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(blank=True, help_text='Effective capacity. Empty = unlimited.', null=True)),
+                ('closure_type', models.CharField(blank=True, default='', max_length=10)),
+                ('closure_reason', models.CharField(blank=True, default='', max_length=255)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0080_scheduleday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('materialized_at', models.DateTimeField(blank=True, null=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
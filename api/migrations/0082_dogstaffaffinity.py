@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import ExtractIsoWeekDay
+
+
+def backfill_staff_affinity(apps, schema_editor):
+    # Seed the table from existing history so suggestions work straight
+    # after deploy; from here on the assignment signals keep it current.
+    DailyDogAssignment = apps.get_model('api', 'DailyDogAssignment')
+    DogStaffAffinity = apps.get_model('api', 'DogStaffAffinity')
+    history = (
+        DailyDogAssignment.objects
+        .filter(status__in=('ASSIGNED', 'PICKED_UP', 'DROPPED_OFF'), staff_member__isnull=False)
+        .annotate(weekday=ExtractIsoWeekDay('date'))
+        .values('dog_id', 'weekday', 'staff_member_id')
+        .annotate(times=Count('id'), last_date=Max('date'))
+        .order_by()
+    )
+    DogStaffAffinity.objects.bulk_create(
+        [DogStaffAffinity(**entry) for entry in history], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0081_rosterday'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DogStaffAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(help_text='ISO weekday: 1=Monday … 7=Sunday.')),
+                ('times', models.PositiveIntegerField(default=0, help_text='Number of days this staff member had the dog on this weekday.')),
+                ('last_date', models.DateField(help_text='Most recent of those days.')),
+                ('dog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staff_affinities', to='api.dog')),
+                ('staff_member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dog_affinities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Dog staff affinities',
+                'unique_together': {('dog', 'weekday', 'staff_member')},
+            },
+        ),
+        migrations.RunPython(backfill_staff_affinity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0082_dogstaffaffinity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_ids', models.JSONField(default=list, help_text='Recipients, already filtered by preference and rota.')),
+                ('tokens', models.JSONField(blank=True, help_text='When set, retry only these device tokens (left over from a partly failed send).', null=True)),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, help_text='Time from enqueue to delivery, in milliseconds.', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='api_outboun_status_7a8dc7_idx')],
+            },
+        ),
+    ]
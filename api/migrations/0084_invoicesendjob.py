@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0083_outboundnotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSendJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_year', models.PositiveSmallIntegerField()),
+                ('period_month', models.PositiveSmallIntegerField(help_text='1-12')),
+                ('invoice_ids', models.JSONField(default=list, help_text='The drafts to send, captured when the job was queued.')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done')], default='QUEUED', max_length=10)),
+                ('processed', models.PositiveIntegerField(default=0, help_text='How many of invoice_ids have been worked through.')),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.JSONField(blank=True, default=list)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='api_invoice_status_e3f525_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0084_invoicesendjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostcodeCoordinate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('postcode', models.CharField(help_text='Normalised, upper-case, single space (e.g. "SL7 2HE").', max_length=10, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('found', models.BooleanField(default=True)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0085_postcodecoordinate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facilitydefectimage',
+            name='processing_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='groupmedia',
+            name='processing_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='incidentmedia',
+            name='processing_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='processing_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vehicledefectimage',
+            name='processing_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+    ]
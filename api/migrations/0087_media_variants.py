@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0086_media_processing_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='incidentmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0087_media_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmedia',
+            index=models.Index(fields=['-created_at', '-id'], name='api_groupme_created_47dd3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['dog', '-created_at', '-id'], name='api_photo_dog_id_3fed81_idx'),
+        ),
+    ]
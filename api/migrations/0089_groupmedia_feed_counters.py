@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:53
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_feed_counters(apps, schema_editor):
+    # Count what is already there; from here on the Comment and MediaReaction
+    # signals keep the counters current.
+    GroupMedia = apps.get_model('api', 'GroupMedia')
+    Comment = apps.get_model('api', 'Comment')
+    MediaReaction = apps.get_model('api', 'MediaReaction')
+    posts = {pk: GroupMedia(pk=pk, comment_count=0, reaction_counts={}) for pk in GroupMedia.objects.values_list('pk', flat=True)}
+    for media_id, n in (
+        Comment.objects.filter(group_media__isnull=False)
+        .values('group_media_id').annotate(n=Count('id')).values_list('group_media_id', 'n').order_by()
+    ):
+        posts[media_id].comment_count = n
+    for media_id, emoji, n in (
+        MediaReaction.objects.values('media_id', 'emoji').annotate(n=Count('id'))
+        .values_list('media_id', 'emoji', 'n').order_by('media_id', 'emoji')
+    ):
+        posts[media_id].reaction_counts[emoji] = n
+    GroupMedia.objects.bulk_update(list(posts.values()), ['comment_count', 'reaction_counts'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0088_media_newest_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupmedia',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='groupmedia',
+            name='reaction_counts',
+            field=models.JSONField(blank=True, default=dict, help_text='{emoji: count}'),
+        ),
+        migrations.RunPython(backfill_feed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-17 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0090_changeversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BadgeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_schedule_days(apps, schema_editor):
+    # From here on the Dog post_save signal keeps the rows current.
+    Dog = apps.get_model('api', 'Dog')
+    DogScheduleDay = apps.get_model('api', 'DogScheduleDay')
+    rows = []
+    for dog_id, days in Dog.objects.values_list('id', 'daycare_days'):
+        for weekday in sorted({day for day in (days or []) if isinstance(day, int) and 1 <= day <= 7}):
+            rows.append(DogScheduleDay(dog_id=dog_id, weekday=weekday))
+    DogScheduleDay.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0092_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DogScheduleDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(help_text='ISO weekday: 1=Monday … 7=Sunday.')),
+                ('dog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_days', to='api.dog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['weekday', 'dog'], name='api_dogsche_weekday_113ea9_idx')],
+                'unique_together': {('dog', 'weekday')},
+            },
+        ),
+        migrations.RunPython(backfill_schedule_days, migrations.RunPython.noop),
+    ]
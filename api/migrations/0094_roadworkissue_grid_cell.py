@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:41
+
+import math
+
+from django.db import migrations, models
+
+
+def backfill_grid_cells(apps, schema_editor):
+    # Same formula as api.roadworks.grid_cell; RoadworkIssue.save sets it from
+    # here on.
+    RoadworkIssue = apps.get_model('api', 'RoadworkIssue')
+    issues = list(
+        RoadworkIssue.objects.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+        .only('id', 'latitude', 'longitude')
+    )
+    for issue in issues:
+        issue.grid_cell = math.floor(issue.latitude / 0.01) * 100_000 + math.floor(issue.longitude / 0.01)
+    RoadworkIssue.objects.bulk_update(issues, ['grid_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0093_dogscheduleday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadworkissue',
+            name='grid_cell',
+            field=models.IntegerField(blank=True, editable=False, help_text='Grid bucket of the location (see api.roadworks.grid_cell); set on save.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='roadworkissue',
+            index=models.Index(fields=['grid_cell', 'end_date'], name='api_roadwor_grid_ce_01e124_idx'),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
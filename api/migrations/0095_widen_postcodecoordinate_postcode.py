@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0094_roadworkissue_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postcodecoordinate',
+            name='postcode',
+            field=models.CharField(help_text='Normalised, upper-case, single space (e.g. "SL7 2HE").', max_length=11, unique=True),
+        ),
+    ]
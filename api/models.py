@@ -3,7 +3,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
 class UserProfile(models.Model):
@@ -176,6 +176,18 @@ def create_user_profile(sender, instance, created, **kwargs):
     # that edits the profile saves it explicitly; an implicit save on each User
     # write was a wasted query and could clobber concurrent edits (B21).
 
+# Uploaded photos and videos are stored raw and acknowledged straight away;
+# the run_media_worker command then builds the resized copy and thumbnail
+# (api.media_processing). Rows created any other way (admin, imports) have
+# nothing to wait for, hence the READY default.
+MEDIA_PROCESSING_STATES = [
+    ('PENDING', 'Pending'),
+    ('PROCESSING', 'Processing'),
+    ('READY', 'Ready'),
+    ('FAILED', 'Failed'),
+]
+
+
 class Photo(models.Model):
     MEDIA_TYPE_CHOICES = [
         ('PHOTO', 'Photo'),
@@ -186,9 +198,18 @@ class Photo(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES, default='PHOTO')
     file = models.FileField(upload_to='dog_photos/', max_length=150)
     thumbnail = models.ImageField(upload_to='dog_photos/thumbnails/', max_length=150, null=True, blank=True)
+    processing_state = models.CharField(max_length=10, choices=MEDIA_PROCESSING_STATES, default='READY', db_index=True)
+    # Responsive renditions built by the media worker: [{width, height, format, bytes, name}].
+    variants = models.JSONField(default=list, blank=True)
     taken_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # The gallery's keyset pagination (GalleryCursorPagination).
+            models.Index(fields=['dog', '-created_at', '-id']),
+        ]
+
     def __str__(self):
         return f"{self.get_media_type_display()} of {self.dog.name} at {self.taken_at}"
 
@@ -253,13 +274,24 @@ class GroupMedia(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES)
     file = models.FileField(upload_to='group_media/', max_length=150)
     thumbnail = models.ImageField(upload_to='group_media/thumbnails/', max_length=150, null=True, blank=True)
+    processing_state = models.CharField(max_length=10, choices=MEDIA_PROCESSING_STATES, default='READY', db_index=True)
+    # Responsive renditions built by the media worker: [{width, height, format, bytes, name}].
+    variants = models.JSONField(default=list, blank=True)
     caption = models.TextField(blank=True, null=True)
     tagged_dogs = models.ManyToManyField('Dog', related_name='media_appearances', blank=True)
+    # Denormalised so a feed page needn't load every comment and reaction:
+    # kept current by the Comment/MediaReaction signals (refresh_feed_counters).
+    comment_count = models.PositiveIntegerField(default=0)
+    reaction_counts = models.JSONField(default=dict, blank=True, help_text='{emoji: count}')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at', '-id']
         verbose_name_plural = 'Group media'
+        indexes = [
+            # The feed's keyset pagination (FeedCursorPagination).
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.media_type} by {self.uploaded_by.username} at {self.created_at}"
@@ -452,6 +484,26 @@ class DailyDogAssignment(models.Model):
         return not self.is_boarding_day or self.boarding_last_day
 
 
+class DogScheduleDay(models.Model):
+    """One row per weekday in a dog's daycare_days.
+
+    A derived table — daycare_days is still the source of truth. It exists
+    so "which dogs come on weekday N?" is an index range scan on weekday
+    instead of reading every dog's JSON list. Kept current by the Dog
+    post_save signal (see sync_dog_schedule_days); ``manage.py
+    rebuild_schedule_index`` repairs any drift.
+    """
+    dog = models.ForeignKey(Dog, on_delete=models.CASCADE, related_name='schedule_days')
+    weekday = models.PositiveSmallIntegerField(help_text='ISO weekday: 1=Monday … 7=Sunday.')
+
+    class Meta:
+        unique_together = ('dog', 'weekday')
+        indexes = [models.Index(fields=['weekday', 'dog'])]
+
+    def __str__(self):
+        return f"{self.dog_id} on weekday {self.weekday}"
+
+
 class DogWeekdayPickup(models.Model):
     """Persistent default: who picks up <dog> every <weekday>.
 
@@ -475,6 +527,31 @@ class DogWeekdayPickup(models.Model):
         return f"{self.dog.name} → {self.staff_member.username} on weekday {self.weekday}"
 
 
+class DogStaffAffinity(models.Model):
+    """How often, and how recently, a staff member has had a dog on a given
+    weekday — the history behind suggested_assignments and auto_assign.
+
+    A derived table: one row per (dog, weekday, staff member) summarising
+    that dog's ASSIGNED / PICKED_UP / DROPPED_OFF DailyDogAssignment rows.
+    UNASSIGNED and REMOVED rows are not evidence the staff member had the
+    dog, so they don't count. Kept current by the assignment signals and the
+    bulk writers (see api.scheduling.refresh_staff_affinity); rebuild with
+    ``manage.py rebuild_staff_affinity``.
+    """
+    dog = models.ForeignKey(Dog, on_delete=models.CASCADE, related_name='staff_affinities')
+    weekday = models.PositiveSmallIntegerField(help_text='ISO weekday: 1=Monday … 7=Sunday.')
+    staff_member = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dog_affinities')
+    times = models.PositiveIntegerField(default=0, help_text='Number of days this staff member had the dog on this weekday.')
+    last_date = models.DateField(help_text='Most recent of those days.')
+
+    class Meta:
+        unique_together = ('dog', 'weekday', 'staff_member')
+        verbose_name_plural = 'Dog staff affinities'
+
+    def __str__(self):
+        return f"{self.dog.name} → {self.staff_member.username} on weekday {self.weekday} ({self.times}x)"
+
+
 class ClosureDay(models.Model):
     CLOSURE_TYPE_CHOICES = [
         ('CLOSED', 'Closed'),
@@ -626,6 +703,49 @@ class DeviceToken(models.Model):
         return f"Token for {self.user.username} ({self.device_type})"
 
 
+class OutboundNotification(models.Model):
+    """A push notification waiting for (or done with) delivery.
+
+    send_push_bulk writes one row per message inside the caller's transaction,
+    so a push commits or rolls back with the change it announces and survives
+    a web worker being recycled. ``manage.py run_notification_worker`` claims
+    due rows, sends them through FCM and retries failures with backoff.
+
+    A row is due when it is PENDING and ``next_attempt_at`` has passed. The
+    worker pushes ``next_attempt_at`` forward as a lease when it claims a row,
+    so a worker that dies mid-send leaves the row to be picked up again.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    user_ids = models.JSONField(default=list, help_text='Recipients, already filtered by preference and rota.')
+    tokens = models.JSONField(
+        null=True, blank=True,
+        help_text='When set, retry only these device tokens (left over from a partly failed send).',
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Time from enqueue to delivery, in milliseconds.',
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.title} → {len(self.user_ids)} user(s) ({self.get_status_display()})"
+
+
 class SupportQuery(models.Model):
     STATUS_CHOICES = [
         ('OPEN', 'Open'),
@@ -716,10 +836,14 @@ def notify_staff_boarding_request(sender, instance, created, **kwargs):
 
 @receiver(pre_save, sender=DateChangeRequest)
 def store_old_date_request_status(sender, instance, **kwargs):
+    instance._old_schedule = None
     if instance.pk:
         try:
             old_instance = DateChangeRequest.objects.get(pk=instance.pk)
             instance._old_status = old_instance.status
+            # What the request did to attendance before this save, so the
+            # schedule snapshot can be patched for the dates it used to touch.
+            instance._old_schedule = _date_request_schedule_key(old_instance)
         except DateChangeRequest.DoesNotExist:
             instance._old_status = None
     else:
@@ -817,6 +941,8 @@ def store_old_assignment_status(sender, instance, **kwargs):
         try:
             old_instance = DailyDogAssignment.objects.get(pk=instance.pk)
             instance._old_status = old_instance.status
+            instance._old_affinity = _affinity_key(old_instance)
+            instance._old_date = old_instance.date
         except DailyDogAssignment.DoesNotExist:
             instance._old_status = None
     else:
@@ -860,12 +986,18 @@ def store_old_care_instructions(sender, instance, **kwargs):
             old_instance = Dog.objects.get(pk=instance.pk)
             instance._old_food_instructions = old_instance.food_instructions
             instance._old_medical_notes = old_instance.medical_notes
+            instance._old_daycare_days = old_instance.daycare_days
+            instance._old_schedule_type = old_instance.schedule_type
         except Dog.DoesNotExist:
             instance._old_food_instructions = None
             instance._old_medical_notes = None
+            instance._old_daycare_days = []
+            instance._old_schedule_type = None
     else:
         instance._old_food_instructions = None
         instance._old_medical_notes = None
+        instance._old_daycare_days = []
+        instance._old_schedule_type = None
 
 @receiver(post_save, sender=Dog)
 def notify_staff_care_instructions_changed(sender, instance, created, **kwargs):
@@ -1073,6 +1205,554 @@ class WaitlistEntry(models.Model):
         return f"{self.dog.name} waitlisted for {self.date} ({self.status})"
 
 
+class ScheduleDay(models.Model):
+    """Persisted attendance and capacity for one date.
+
+    A derived table — the source of truth is still daycare_days, change
+    requests, assignments, boarding and closures. Rows are built on first
+    read and kept current by the signals below; see the "persisted schedule
+    snapshot" section of api.scheduling. Safe to truncate at any time.
+    """
+    date = models.DateField(unique=True)
+    dog_ids = models.JSONField(default=list, help_text='Ids of every dog attending (daycare + boarding).')
+    boarding_dog_ids = models.JSONField(default=list, help_text='The subset of dog_ids here on an approved boarding stay.')
+    booked = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Effective capacity. Empty = unlimited.')
+    closure_type = models.CharField(max_length=10, blank=True, default='')
+    closure_reason = models.CharField(max_length=255, blank=True, default='')
+    # Bumped on every change to the row, so clients and caches can tell
+    # whether a day moved without diffing it.
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.booked} booked (v{self.version})"
+
+
+class RosterDay(models.Model):
+    """Marks a date whose DailyDogAssignment rows have been materialized
+    from the weekday roster and boarding stays.
+
+    While ``materialized_at`` is set the read endpoints skip materialization
+    for the date entirely. Anything that could add rows to a materialized day
+    (a roster, schedule, closure or boarding change, or a row being deleted)
+    clears it and bumps ``version``; the next read or the nightly
+    ``materialize_roster`` run fills the day in again.
+    """
+    date = models.DateField(unique=True)
+    materialized_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        state = 'materialized' if self.materialized_at else 'stale'
+        return f"Roster {self.date} v{self.version} ({state})"
+
+
+class ChangeVersion(models.Model):
+    """The current version of a slice of data a polled endpoint serves —
+    ``dogs``, ``feed``, ``roster:2026-10-17`` … — replaced with a fresh token
+    on every write to it. See api.conditional."""
+    key = models.CharField(max_length=64, unique=True)
+    version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.key} @ {self.version}"
+
+
+class BadgeCount(models.Model):
+    """The current value of one action-item badge — ``open_incidents``,
+    ``support_replies:<user id>`` … — recounted on every write that can move
+    it. See api.badges."""
+    key = models.CharField(max_length=64, unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.count}"
+
+
+class ChangeLogEntry(models.Model):
+    """One write to a synced row, logged in the writer's transaction —
+    appended, never edited. The id is the sync token. See api.sync."""
+    OP_CHOICES = [
+        ('upsert', 'Upsert'),
+        ('delete', 'Delete'),
+    ]
+
+    model = models.CharField(max_length=64)
+    object_id = models.PositiveBigIntegerField()
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.op} {self.model}:{self.object_id}"
+
+
+# --- Schedule snapshot maintenance ---
+#
+# Each receiver works out which (dates, dogs) a write can have moved and
+# patches only those ScheduleDay rows. Rows that don't exist yet are skipped,
+# so none of this costs more than an EXISTS-sized query until a date has been
+# read. The same receivers clear the RosterDay marker for those dates so the
+# roster is re-materialized on next load.
+
+def _as_date(value):
+    # Rows created with ISO strings keep them on the instance after save.
+    if isinstance(value, str):
+        from datetime import date
+        return date.fromisoformat(value)
+    return value
+
+
+def _date_request_schedule_key(request):
+    # approved_at is part of the key because the latest approval wins a
+    # (dog, date) — re-dating an approval can flip attendance on its own.
+    if request.status != 'APPROVED':
+        return None
+    return (
+        request.dog_id, _as_date(request.original_date), _as_date(request.new_date),
+        request.approved_at,
+    )
+
+
+def _refresh_for_date_request_keys(*keys):
+    from .scheduling import invalidate_roster_days, refresh_schedule_days
+    keys = [key for key in keys if key]
+    if not keys:
+        return
+    dates = {day for _, original, new, _ in keys for day in (original, new)}
+    refresh_schedule_days(dates, dog_ids={key[0] for key in keys})
+    invalidate_roster_days(dates=dates)
+
+
+@receiver(post_save, sender=DailyDogAssignment)
+def refresh_schedule_for_assignment(sender, instance, created, **kwargs):
+    # Only the REMOVED / not-REMOVED distinction affects attendance; status
+    # moves between ASSIGNED, PICKED_UP and DROPPED_OFF don't.
+    old_status = getattr(instance, '_old_status', None)
+    if not created and (old_status == 'REMOVED') == (instance.status == 'REMOVED'):
+        return
+    from .scheduling import refresh_schedule_days
+    refresh_schedule_days([instance.date], dog_ids=[instance.dog_id])
+
+
+def _affinity_key(assignment):
+    from .scheduling import AFFINITY_STATUSES
+    if assignment.staff_member_id is None or assignment.status not in AFFINITY_STATUSES:
+        return None
+    return (assignment.staff_member_id, _as_date(assignment.date))
+
+
+def _refresh_affinity_for(dog_id, *keys):
+    from .scheduling import refresh_staff_affinity
+    keys = [key for key in keys if key]
+    if keys:
+        refresh_staff_affinity(
+            dog_ids=[dog_id], weekdays={day.isoweekday() for _, day in keys},
+        )
+
+
+@receiver(post_save, sender=DailyDogAssignment)
+def refresh_staff_affinity_for_assignment(sender, instance, created, **kwargs):
+    # Status moves within ASSIGNED → PICKED_UP → DROPPED_OFF keep the key,
+    # so the day's pickup/dropoff taps cost nothing here.
+    old_key = getattr(instance, '_old_affinity', None)
+    new_key = _affinity_key(instance)
+    if old_key != new_key:
+        _refresh_affinity_for(instance.dog_id, old_key, new_key)
+
+
+@receiver(post_delete, sender=DailyDogAssignment)
+def refresh_schedule_for_deleted_assignment(sender, instance, **kwargs):
+    from .scheduling import invalidate_roster_days, refresh_schedule_days
+    refresh_schedule_days([instance.date], dog_ids=[instance.dog_id])
+    # The roster may need to fill the gap (e.g. a cleared boarding row on
+    # the dog's normal daycare day).
+    invalidate_roster_days(dates=[instance.date])
+    _refresh_affinity_for(instance.dog_id, _affinity_key(instance))
+
+
+@receiver(post_save, sender=DateChangeRequest)
+def refresh_schedule_for_date_request(sender, instance, created, **kwargs):
+    old_key = getattr(instance, '_old_schedule', None)
+    new_key = _date_request_schedule_key(instance)
+    if old_key != new_key:
+        _refresh_for_date_request_keys(old_key, new_key)
+
+
+@receiver(post_delete, sender=DateChangeRequest)
+def refresh_schedule_for_deleted_date_request(sender, instance, **kwargs):
+    _refresh_for_date_request_keys(_date_request_schedule_key(instance))
+
+
+@receiver(pre_save, sender=BoardingRequest)
+def store_old_boarding_schedule(sender, instance, **kwargs):
+    instance._old_schedule = None
+    if instance.pk:
+        instance._old_schedule = (
+            BoardingRequest.objects
+            .filter(pk=instance.pk)
+            .values_list('status', 'start_date', 'end_date')
+            .first()
+        )
+
+
+def _refresh_for_boarding(dog_ids, *ranges):
+    from .scheduling import daterange, invalidate_roster_days, refresh_schedule_days
+    dates = set()
+    for start, end in ranges:
+        dates.update(daterange(start, end))
+    refresh_schedule_days(dates, dog_ids=dog_ids)
+    invalidate_roster_days(dates=dates)
+
+
+@receiver(post_save, sender=BoardingRequest)
+def refresh_schedule_for_boarding(sender, instance, created, **kwargs):
+    old = getattr(instance, '_old_schedule', None)
+    new = (instance.status, _as_date(instance.start_date), _as_date(instance.end_date))
+    if old == new or 'APPROVED' not in (new[0], old[0] if old else None):
+        return
+    ranges = [new[1:]]
+    if old:
+        ranges.append((old[1], old[2]))
+    _refresh_for_boarding(list(instance.dogs.values_list('id', flat=True)), *ranges)
+
+
+@receiver(pre_delete, sender=BoardingRequest)
+def store_deleted_boarding_dogs(sender, instance, **kwargs):
+    # The dogs M2M rows are gone by post_delete.
+    instance._schedule_dog_ids = (
+        list(instance.dogs.values_list('id', flat=True))
+        if instance.status == 'APPROVED' else []
+    )
+
+
+@receiver(post_delete, sender=BoardingRequest)
+def refresh_schedule_for_deleted_boarding(sender, instance, **kwargs):
+    dog_ids = getattr(instance, '_schedule_dog_ids', [])
+    if dog_ids:
+        _refresh_for_boarding(dog_ids, (_as_date(instance.start_date), _as_date(instance.end_date)))
+
+
+@receiver(m2m_changed, sender=BoardingRequest.dogs.through)
+def refresh_schedule_for_boarding_dogs(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # pk_set is None for clears; remember who is about to be dropped.
+        if reverse:
+            instance._schedule_boardings = list(
+                instance.boarding_requests.filter(status='APPROVED')
+                .values_list('start_date', 'end_date')
+            )
+        elif instance.status == 'APPROVED':
+            instance._schedule_dog_ids = list(instance.dogs.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # dog.boarding_requests.add(...) — instance is the Dog.
+        if action == 'post_clear':
+            ranges = getattr(instance, '_schedule_boardings', [])
+        else:
+            ranges = list(
+                BoardingRequest.objects.filter(pk__in=pk_set, status='APPROVED')
+                .values_list('start_date', 'end_date')
+            )
+        if ranges:
+            _refresh_for_boarding([instance.pk], *ranges)
+        return
+    if instance.status != 'APPROVED':
+        return
+    dog_ids = getattr(instance, '_schedule_dog_ids', []) if action == 'post_clear' else pk_set
+    if dog_ids:
+        _refresh_for_boarding(dog_ids, (_as_date(instance.start_date), _as_date(instance.end_date)))
+
+
+@receiver(pre_save, sender=ClosureDay)
+def store_old_closure_date(sender, instance, **kwargs):
+    instance._old_date = None
+    if instance.pk:
+        instance._old_date = (
+            ClosureDay.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ClosureDay)
+@receiver(post_delete, sender=ClosureDay)
+def refresh_schedule_for_closure(sender, instance, **kwargs):
+    # A closure changes every dog's attendance and the capacity, so rebuild
+    # the whole day rather than patching dogs.
+    from .scheduling import invalidate_roster_days, refresh_schedule_days
+    dates = [instance.date, getattr(instance, '_old_date', None)]
+    refresh_schedule_days(dates)
+    invalidate_roster_days(dates=[day for day in dates if day])
+
+
+@receiver(post_save, sender=Dog)
+def sync_schedule_weekdays(sender, instance, created, **kwargs):
+    # Ahead of refresh_schedule_for_daycare_days, which reads these rows.
+    from .scheduling import sync_dog_schedule_days
+    old_days = set(getattr(instance, '_old_daycare_days', None) or [])
+    if created or old_days != set(instance.daycare_days or []):
+        sync_dog_schedule_days(instance.pk, instance.daycare_days)
+
+
+@receiver(post_save, sender=Dog)
+def refresh_schedule_for_daycare_days(sender, instance, created, **kwargs):
+    from .scheduling import invalidate_roster_days, refresh_schedule_days_for_weekdays
+    old_days = set(getattr(instance, '_old_daycare_days', None) or [])
+    changed = old_days ^ set(instance.daycare_days or [])
+    if changed:
+        refresh_schedule_days_for_weekdays(changed, [instance.pk])
+    # An ad-hoc dog is never materialized from the roster, so switching
+    # schedule type moves every one of its weekdays.
+    old_type = getattr(instance, '_old_schedule_type', None)
+    if not created and old_type != instance.schedule_type:
+        changed |= set(instance.daycare_days or [])
+    if changed:
+        invalidate_roster_days(weekdays=changed)
+
+
+@receiver(post_save, sender=DogWeekdayPickup)
+@receiver(post_delete, sender=DogWeekdayPickup)
+def invalidate_roster_for_weekday_pickup(sender, instance, **kwargs):
+    from .scheduling import invalidate_roster_days
+    invalidate_roster_days(weekdays=[instance.weekday])
+
+
+@receiver(post_delete, sender=Dog)
+def refresh_schedule_for_deleted_dog(sender, instance, **kwargs):
+    from .scheduling import purge_dog_from_schedule_days
+    purge_dog_from_schedule_days(instance.pk)
+
+
+@receiver(post_save, sender=DaycareSettings)
+def refresh_schedule_for_capacity(sender, instance, **kwargs):
+    from .scheduling import refresh_schedule_capacity
+    refresh_schedule_capacity(instance.default_daily_capacity or None)
+
+
+def refresh_feed_counters(media_ids=None):
+    """Recount GroupMedia.comment_count and reaction_counts from the comment
+    and reaction rows, for ``media_ids`` or every post. Returns the number of
+    posts updated.
+
+    The signals below call it for the one post a write touched — a COUNT and
+    a GROUP BY over that post's rows, so concurrent writers can't leave the
+    counts drifting the way read-modify-write increments would. Run
+    ``manage.py rebuild_feed_counters`` after a data fix that bypassed them.
+    """
+    from django.db.models import Count
+    posts = GroupMedia.objects.all() if media_ids is None else GroupMedia.objects.filter(pk__in=media_ids)
+    updated = 0
+    ids = list(posts.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        comments = dict(
+            Comment.objects.filter(group_media_id__in=chunk)
+            .values('group_media_id').annotate(n=Count('id'))
+            .values_list('group_media_id', 'n').order_by()
+        )
+        reactions = {pk: {} for pk in chunk}
+        for media_id, emoji, n in (
+            MediaReaction.objects.filter(media_id__in=chunk)
+            .values('media_id', 'emoji').annotate(n=Count('id'))
+            .values_list('media_id', 'emoji', 'n').order_by('media_id', 'emoji')
+        ):
+            reactions[media_id][emoji] = n
+        updated += GroupMedia.objects.bulk_update(
+            [
+                GroupMedia(pk=pk, comment_count=comments.get(pk, 0), reaction_counts=reactions[pk])
+                for pk in chunk
+            ],
+            ['comment_count', 'reaction_counts'],
+        )
+    if updated:
+        _bump_versions('feed')
+    return updated
+
+
+def _needs_recount(sender, media_id, origin):
+    """Whether a comment or reaction write should recount its post.
+
+    ``origin`` is what ``delete()`` was called on (None for a save). Nothing
+    to recount when it is the post itself. Otherwise a delete — say of an
+    account — can take many rows on one post with it, but Django sends
+    post_delete only once each model's rows are all gone, so the first signal
+    per post and model recounts and the rest are skipped.
+    """
+    if origin is None:
+        return True
+    if isinstance(origin, GroupMedia) or getattr(origin, 'model', None) is GroupMedia:
+        return False
+    recounted = getattr(origin, '_feed_recounted', None)
+    if recounted is None:
+        recounted = origin._feed_recounted = set()
+    if (sender, media_id) in recounted:
+        return False
+    recounted.add((sender, media_id))
+    return True
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_feed_counters_for_comment(sender, instance, created=True, origin=None, **kwargs):
+    # Edits don't change the count, only the preview; dog photo comments
+    # aren't counted.
+    if not instance.group_media_id:
+        return
+    if not created:
+        _bump_versions('feed')
+    elif _needs_recount(sender, instance.group_media_id, origin):
+        refresh_feed_counters([instance.group_media_id])
+
+
+@receiver(post_save, sender=MediaReaction)
+@receiver(post_delete, sender=MediaReaction)
+def refresh_feed_counters_for_reaction(sender, instance, origin=None, **kwargs):
+    if _needs_recount(sender, instance.media_id, origin):
+        refresh_feed_counters([instance.media_id])
+
+
+# --- Change versions ---
+#
+# Writes to the data behind the polled endpoints replace its ChangeVersion,
+# so the next poll's ETag stops matching (see api.conditional). Bulk writers
+# that skip these signals bump the versions themselves.
+
+def _bump_versions(*keys):
+    from .conditional import bump_versions
+    bump_versions(*keys)
+
+
+# Fields nothing under ``dogs`` renders. A save limited to these (a login
+# stamp, a password change, Xero pinning, privacy acceptance) keeps the ETag.
+_UNRENDERED_FIELDS = {
+    User: {'last_login', 'password'},
+    UserProfile: {'xero_contact_id', 'accepted_privacy_at', 'accepted_privacy_version'},
+}
+
+
+@receiver(post_save, sender=Dog)
+@receiver(post_delete, sender=Dog)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=VaccinationRecord)
+@receiver(post_delete, sender=VaccinationRecord)
+def bump_dogs_version(sender, update_fields=None, **kwargs):
+    # ``dogs`` covers the people rendered with them (owners, staff, uploaders).
+    if update_fields and update_fields <= _UNRENDERED_FIELDS.get(sender, set()):
+        return
+    _bump_versions('dogs')
+
+
+@receiver(m2m_changed, sender=Dog.additional_owners.through)
+def bump_dogs_version_for_co_owners(sender, action, **kwargs):
+    if action.startswith('post_'):
+        _bump_versions('dogs')
+
+
+@receiver(post_save, sender=GroupMedia)
+@receiver(post_delete, sender=GroupMedia)
+def bump_feed_version(sender, **kwargs):
+    _bump_versions('feed')
+
+
+@receiver(m2m_changed, sender=GroupMedia.tagged_dogs.through)
+def bump_feed_version_for_tags(sender, action, **kwargs):
+    if action.startswith('post_'):
+        _bump_versions('feed')
+
+
+@receiver(post_save, sender=DailyDogAssignment)
+@receiver(post_delete, sender=DailyDogAssignment)
+def bump_roster_version(sender, instance, **kwargs):
+    from .conditional import roster_key
+    dates = {_as_date(instance.date), getattr(instance, '_old_date', None)}
+    keys = [roster_key(day) for day in dates if day]
+    # Dogs list their upcoming REMOVED days (cancelled_dates).
+    if 'REMOVED' in (instance.status, getattr(instance, '_old_status', None)):
+        keys.append('dogs')
+    _bump_versions(*keys)
+
+
+@receiver(post_save, sender=BoardingRequest)
+@receiver(post_delete, sender=BoardingRequest)
+def bump_boarding_version(sender, **kwargs):
+    _bump_versions('boarding')
+
+
+@receiver(m2m_changed, sender=BoardingRequest.dogs.through)
+def bump_boarding_version_for_dogs(sender, action, **kwargs):
+    if action.startswith('post_'):
+        _bump_versions('boarding')
+
+
+@receiver(post_save, sender=DateChangeRequest)
+@receiver(post_delete, sender=DateChangeRequest)
+def bump_date_requests_version(sender, **kwargs):
+    _bump_versions('date_requests')
+
+
+@receiver(post_save, sender=WaitlistEntry)
+@receiver(post_delete, sender=WaitlistEntry)
+def bump_waitlist_version(sender, **kwargs):
+    _bump_versions('waitlist')
+
+
+# Each owner's calendar overlay (their dogs, pending requests and waitlist
+# entries) has its own version, so one owner's change doesn't throw away
+# everyone else's cached calendar.
+
+def _bump_owner_calendars(dog_ids):
+    from .conditional import bump_owner_calendars
+    bump_owner_calendars(dog_ids)
+
+
+def _bump_calendars_of_users(*user_ids):
+    from .conditional import owner_calendar_key
+    _bump_versions(*(owner_calendar_key(pk) for pk in user_ids if pk))
+
+
+@receiver(post_save, sender=DateChangeRequest)
+@receiver(post_delete, sender=DateChangeRequest)
+@receiver(post_save, sender=WaitlistEntry)
+@receiver(post_delete, sender=WaitlistEntry)
+def bump_owner_calendar_for_request(sender, instance, **kwargs):
+    _bump_owner_calendars([instance.dog_id])
+
+
+@receiver(post_save, sender=Dog)
+def bump_owner_calendar_for_dog(sender, instance, **kwargs):
+    _bump_owner_calendars([instance.pk])
+
+
+@receiver(pre_delete, sender=Dog)
+def bump_owner_calendar_for_deleted_dog(sender, instance, **kwargs):
+    # Before the delete, while the co-owner links still exist.
+    _bump_owner_calendars([instance.pk])
+
+
+@receiver(m2m_changed, sender=Dog.additional_owners.through)
+def bump_owner_calendar_for_co_owners(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'pre_clear'):
+            _bump_calendars_of_users(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        _bump_calendars_of_users(*(pk_set or ()))
+    elif action == 'pre_clear':
+        _bump_calendars_of_users(*instance.additional_owners.values_list('id', flat=True))
+
+
 class Vehicle(models.Model):
     """A work vehicle in the fleet.
 
@@ -1219,6 +1899,7 @@ class VehicleDefectImage(models.Model):
     defect = models.ForeignKey(VehicleDefect, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='vehicle_defects/', max_length=150)
     thumbnail = models.ImageField(upload_to='vehicle_defects/thumbnails/', max_length=150, null=True, blank=True)
+    processing_state = models.CharField(max_length=10, choices=MEDIA_PROCESSING_STATES, default='READY', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -1281,6 +1962,7 @@ class FacilityDefectImage(models.Model):
     defect = models.ForeignKey(FacilityDefect, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='facility_defects/', max_length=150)
     thumbnail = models.ImageField(upload_to='facility_defects/thumbnails/', max_length=150, null=True, blank=True)
+    processing_state = models.CharField(max_length=10, choices=MEDIA_PROCESSING_STATES, default='READY', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -1525,6 +2207,51 @@ class PaymentRecord(models.Model):
         return f"£{self.amount} {self.get_method_display()} on invoice #{self.invoice_id}"
 
 
+class InvoiceSendJob(models.Model):
+    """A batch send of one period's draft invoices, worked through by
+    ``manage.py run_invoice_send_jobs``.
+
+    send_all used to push every draft to Xero inside the request — four Xero
+    round-trips per invoice, one invoice after another — and a month's batch
+    outran the gunicorn timeout. It now snapshots the drafts into a job and
+    returns at once; the worker sends them in batches within Xero's rate
+    limits and records progress here for the app to poll.
+
+    A job is due when QUEUED, or RUNNING with a lapsed lease (its worker died
+    part-way through). Re-running a job only picks up invoices still in DRAFT.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+    ]
+
+    period_year = models.PositiveSmallIntegerField()
+    period_month = models.PositiveSmallIntegerField(help_text='1-12')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    invoice_ids = models.JSONField(default=list, help_text='The drafts to send, captured when the job was queued.')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    processed = models.PositiveIntegerField(default=0, help_text='How many of invoice_ids have been worked through.')
+    sent = models.PositiveIntegerField(default=0)
+    # [{'invoice': id, 'customer': name, 'detail': message}, ...]
+    failed = models.JSONField(default=list, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status'])]
+
+    @property
+    def total(self):
+        return len(self.invoice_ids)
+
+    def __str__(self):
+        return f"Send {self.period_month}/{self.period_year}: {self.processed}/{self.total} ({self.get_status_display()})"
+
+
 class XeroConnection(models.Model):
     """Xero OAuth2 connection singleton (always pk=1), per the DaycareSettings
     pattern. Holds the rotating refresh token and tenant captured by the
@@ -1563,6 +2290,25 @@ class XeroConnection(models.Model):
         return f"Xero: {self.tenant_name or 'not connected'}"
 
 
+class PostcodeCoordinate(models.Model):
+    """Cached postcodes.io centroid for a UK postcode, shared by every dog at it.
+
+    Many dogs in the same village share a postcode; api.geocoding consults this
+    table before going to the provider. Misses (404s and postcodes without
+    coordinates) are cached too, with ``found=False``, so an unknown postcode
+    isn't looked up again on every run. Freshness is judged by ``fetched_at``
+    against the TTLs in api.geocoding.
+    """
+    postcode = models.CharField(max_length=11, unique=True, help_text='Normalised, upper-case, single space (e.g. "SL7 2HE").')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    found = models.BooleanField(default=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.postcode} ({self.latitude}, {self.longitude})" if self.found else f"{self.postcode} (not found)"
+
+
 class RoadworkIssue(models.Model):
     """A street works or road closure that may disrupt a pickup/drop-off route.
 
@@ -1603,6 +2349,9 @@ class RoadworkIssue(models.Model):
 
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    grid_cell = models.IntegerField(
+        null=True, blank=True, editable=False,
+        help_text='Grid bucket of the location (see api.roadworks.grid_cell); set on save.')
 
     start_date = models.DateField()
     end_date = models.DateField()
@@ -1636,8 +2385,18 @@ class RoadworkIssue(models.Model):
         indexes = [
             models.Index(fields=['start_date', 'end_date']),
             models.Index(fields=['is_cancelled', 'start_date', 'end_date']),
+            models.Index(fields=['grid_cell', 'end_date']),
         ]
 
+    def save(self, *args, **kwargs):
+        # Bucketed here so no write path (ingest, admin) can leave it stale.
+        from .roadworks import grid_cell
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'grid_cell'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         where = self.street or f'{self.latitude},{self.longitude}'
         return f'{self.get_severity_display()} at {where} ({self.start_date} to {self.end_date})'
@@ -1794,6 +2553,9 @@ class IncidentMedia(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES, default='PHOTO')
     file = models.FileField(upload_to='incidents/', max_length=150)
     thumbnail = models.ImageField(upload_to='incidents/thumbnails/', max_length=150, null=True, blank=True)
+    processing_state = models.CharField(max_length=10, choices=MEDIA_PROCESSING_STATES, default='READY', db_index=True)
+    # Responsive renditions built by the media worker: [{width, height, format, bytes, name}].
+    variants = models.JSONField(default=list, blank=True)
     caption = models.CharField(max_length=200, blank=True, default='')
     uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='incident_media')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1820,3 +2582,159 @@ class IncidentComment(models.Model):
 
     def __str__(self):
         return f"Comment on incident #{self.incident_id} by {self.user_id}"
+
+
+# --- Badge counts ---
+#
+# Each receiver recounts the badges its model feeds (see api.badges). Bulk
+# writers that skip these signals call refresh_badges themselves.
+
+@receiver(post_save, sender=SupportQuery)
+@receiver(post_delete, sender=SupportQuery)
+def refresh_support_query_badges(sender, instance, **kwargs):
+    from .badges import refresh_support_badges
+    refresh_support_badges(instance.owner_id)
+
+
+def _refresh_badges(*keys):
+    from .badges import refresh_badges
+    refresh_badges(*keys)
+
+
+@receiver(post_save, sender=DateChangeRequest)
+@receiver(post_delete, sender=DateChangeRequest)
+def refresh_date_request_badge(sender, **kwargs):
+    _refresh_badges('pending_date_requests')
+
+
+@receiver(post_save, sender=BoardingRequest)
+@receiver(post_delete, sender=BoardingRequest)
+def refresh_boarding_badge(sender, **kwargs):
+    _refresh_badges('pending_boarding_requests')
+
+
+@receiver(post_save, sender=DogProfileChangeRequest)
+@receiver(post_delete, sender=DogProfileChangeRequest)
+def refresh_profile_change_badge(sender, **kwargs):
+    _refresh_badges('pending_profile_changes')
+
+
+# The website app's model: a lazy sender, so neither app imports the other.
+@receiver(post_save, sender='website.ContactInquiry')
+@receiver(post_delete, sender='website.ContactInquiry')
+def refresh_inquiry_badge(sender, **kwargs):
+    _refresh_badges('unread_inquiries')
+
+
+@receiver(post_save, sender=FacilityDefect)
+@receiver(post_delete, sender=FacilityDefect)
+def refresh_facility_defect_badge(sender, **kwargs):
+    _refresh_badges('unresolved_facility_defects')
+
+
+@receiver(post_save, sender=VehicleDefect)
+@receiver(post_delete, sender=VehicleDefect)
+def refresh_vehicle_defect_badge(sender, **kwargs):
+    _refresh_badges('unresolved_vehicle_defects')
+
+
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=Incident)
+def refresh_incident_badge(sender, **kwargs):
+    _refresh_badges('open_incidents')
+
+
+# --- Change log ---
+#
+# Writes to the rows the app syncs append to the change log (see api.sync).
+# Bulk writers that skip these signals call record_changes themselves.
+
+def _record_changes(model, ids, op='upsert'):
+    from .sync import record_changes
+    record_changes(model, ids, op)
+
+
+@receiver(post_save, sender=Dog)
+@receiver(post_save, sender=DailyDogAssignment)
+@receiver(post_save, sender=DogNote)
+@receiver(post_save, sender=BoardingRequest)
+@receiver(post_save, sender=DateChangeRequest)
+def log_synced_save(sender, instance, **kwargs):
+    _record_changes(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Dog)
+@receiver(post_delete, sender=DailyDogAssignment)
+@receiver(post_delete, sender=DogNote)
+@receiver(post_delete, sender=BoardingRequest)
+@receiver(post_delete, sender=DateChangeRequest)
+def log_synced_delete(sender, instance, **kwargs):
+    _record_changes(sender, [instance.pk], op='delete')
+
+
+@receiver(post_save, sender=DailyDogAssignment)
+def log_dog_for_cancelled_date(sender, instance, **kwargs):
+    # Dogs list their upcoming REMOVED days (cancelled_dates).
+    if 'REMOVED' in (instance.status, getattr(instance, '_old_status', None)):
+        _record_changes(Dog, [instance.dog_id])
+
+
+@receiver(m2m_changed, sender=Dog.additional_owners.through)
+def log_co_owner_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Co-owners see the dog and its requests, so all three move with them.
+    if action not in ('post_add', 'post_remove'):
+        return
+    dog_ids = list(pk_set or ()) if reverse else [instance.pk]
+    _record_changes(Dog, dog_ids)
+    _record_changes(
+        BoardingRequest,
+        BoardingRequest.objects.filter(dogs__id__in=dog_ids).values_list('id', flat=True),
+    )
+    _record_changes(
+        DateChangeRequest,
+        DateChangeRequest.objects.filter(dog_id__in=dog_ids).values_list('id', flat=True),
+    )
+
+
+@receiver(m2m_changed, sender=BoardingRequest.dogs.through)
+def log_boarding_dogs_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _record_changes(BoardingRequest, list(pk_set or ()) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+def log_dogs_for_owner_profile(sender, instance, **kwargs):
+    # A dog renders its owners' names and contact details.
+    from django.db.models import Q
+    _record_changes(Dog, Dog.objects.filter(
+        Q(owner_id=instance.user_id) | Q(additional_owners__id=instance.user_id)
+    ).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=VaccinationRecord)
+@receiver(post_delete, sender=VaccinationRecord)
+def log_dog_for_vaccination(sender, instance, **kwargs):
+    _record_changes(Dog, [instance.dog_id])
+
+
+# --- Live day board ---
+#
+# Each write to a day's assignments is pushed to the staff watching that day
+# (see api.live). Bulk writers that skip these signals publish themselves.
+
+@receiver(post_save, sender=DailyDogAssignment)
+def publish_assignment_save(sender, instance, created, **kwargs):
+    from .live import publish_assignments
+    old_date = getattr(instance, '_old_date', None)
+    old_status = getattr(instance, '_old_status', None)
+    status_changed = not created and old_status not in (None, instance.status)
+    publish_assignments(
+        'status' if status_changed else 'assignment',
+        [(instance.pk, instance.date), (instance.pk, old_date)],
+    )
+
+
+@receiver(post_delete, sender=DailyDogAssignment)
+def publish_assignment_delete(sender, instance, **kwargs):
+    from .live import publish_assignments
+    publish_assignments('removed', [(instance.pk, instance.date)])
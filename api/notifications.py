@@ -2,38 +2,31 @@ import firebase_admin
 from firebase_admin import credentials, messaging
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from .models import DeviceToken
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DeviceToken, OutboundNotification
 
 logger = logging.getLogger(__name__)
 
 _firebase_app = None
 
-# Push dispatch used to spawn one unbounded daemon thread per recipient. A
-# traffic alert to a 30-dog route, or send_all over a month of invoices, fanned
-# out that many threads *and* that many Postgres connections at once, against a
-# 2-worker/2-thread web tier and a default max_connections of 100. A small fixed
-# pool bounds both; FCM calls are I/O-bound so four is plenty, and work queues
-# rather than being dropped.
-_push_executor = None
-_push_executor_lock = None
-
-
-def _executor():
-    """Lazily-created shared thread pool for FCM dispatch."""
-    global _push_executor, _push_executor_lock
-    import threading
-    if _push_executor_lock is None:
-        _push_executor_lock = threading.Lock()
-    if _push_executor is None:
-        from concurrent.futures import ThreadPoolExecutor
-        with _push_executor_lock:
-            if _push_executor is None:
-                _push_executor = ThreadPoolExecutor(
-                    max_workers=4, thread_name_prefix='push')
-    return _push_executor
+# Pushes used to go out on an in-process thread pool, which lost whatever was
+# queued when gunicorn recycled a worker (--max-requests) and let a slow FCM
+# endpoint back up every web worker. They are now written to the
+# OutboundNotification table and delivered by ``manage.py
+# run_notification_worker``; see deliver_outbound_notifications.
+
+# FCM accepts at most 500 tokens per multicast request.
+MULTICAST_BATCH_SIZE = 500
+# How long a claimed row stays invisible to other workers while it is sent.
+OUTBOX_LEASE = timedelta(minutes=5)
+# Give up on a notification after this many attempts.
+OUTBOX_MAX_ATTEMPTS = 6
 
 
 def initialize_firebase():
@@ -56,103 +49,118 @@ def initialize_firebase():
         return False
 
 
-def _is_staff_working_today(user):
-    """Check if a staff member is working today based on availability and day-off requests."""
+def _staff_off_today(staff_ids):
+    """Ids of the given staff members who are not working today, per their
+    weekly availability or an approved day-off request — one query.
+
+    No StaffAvailability row for the weekday means available.
+    """
     from .models import StaffAvailability, DayOffRequest
 
+    if not staff_ids:
+        return set()
     today = datetime.now(ZoneInfo('Europe/London')).date()
-    dow = today.isoweekday()  # 1=Monday ... 7=Sunday
-
-    # Check weekly availability (default to available if no record exists)
-    try:
-        avail = StaffAvailability.objects.get(staff_member=user, day_of_week=dow)
-        if not avail.is_available:
-            return False
-    except StaffAvailability.DoesNotExist:
-        pass
-
-    # Check approved day-off requests
-    if DayOffRequest.objects.filter(staff_member=user, date=today, status='APPROVED').exists():
-        return False
-
-    return True
+    unavailable = StaffAvailability.objects.filter(
+        staff_member_id__in=staff_ids, day_of_week=today.isoweekday(), is_available=False,
+    ).order_by().values_list('staff_member_id', flat=True)
+    day_off = DayOffRequest.objects.filter(
+        staff_member_id__in=staff_ids, date=today, status='APPROVED',
+    ).order_by().values_list('staff_member_id', flat=True)
+    return set(unavailable.union(day_off))
 
 
-def _user_has_preference(user, category):
-    """Check whether the user has the given notification category enabled.
+def _opted_out(user_ids, category):
+    """Ids of the given users who have switched off *category* — one query.
 
     category must be one of: 'feed', 'traffic', 'bookings', 'dog_updates'.
-    Returns True when no profile exists (default to sending).
+    Users without a profile, and unknown categories, default to sending.
     """
-    if category is None:
-        return True
-    try:
-        profile = user.profile
-        field = f'notify_{category}'
-        return getattr(profile, field, True)
-    except Exception:
-        return True
+    from django.core.exceptions import FieldDoesNotExist
+    from .models import UserProfile
 
+    if category is None or not user_ids:
+        return set()
+    field = f'notify_{category}'
+    try:
+        UserProfile._meta.get_field(field)
+    except FieldDoesNotExist:
+        return set()
+    return set(
+        UserProfile.objects
+        .filter(user_id__in=user_ids, **{field: False})
+        .values_list('user_id', flat=True)
+    )
 
-def send_push_notification(user, title, body, data=None, category=None):
-    """Sends a push notification to all devices registered for a specific user.
 
-    If *category* is supplied the user's notification preferences are checked
-    first.  When the preference is disabled the notification is silently
-    skipped.
+def send_push_bulk(users, title, body, data=None, category=None):
+    """Sends the same push notification to every device of every user in *users*.
 
+    If *category* is supplied each user's notification preferences are
+    checked first, and users who have it disabled are silently skipped.
     Staff members are skipped on days they are not working (per their weekly
     availability or approved day-off requests).
+
+    Preferences and availability are resolved for all recipients at once
+    (two queries however many users) and the message is queued as one
+    OutboundNotification row in the caller's transaction — it goes out once
+    that commits, and not at all if it rolls back. Delivery, including the
+    device-token lookup, happens in the notification worker.
     """
-    if not _user_has_preference(user, category):
+    users = list(users)
+    if not users:
         return
 
-    if user.is_staff and not _is_staff_working_today(user):
+    if not initialize_firebase():
         return
 
-    if not initialize_firebase():
+    skip = _opted_out([u.id for u in users], category)
+    skip |= _staff_off_today([u.id for u in users if u.is_staff and u.id not in skip])
+    user_ids = [u.id for u in users if u.id not in skip]
+    if not user_ids:
         return
 
-    def _dispatch():
-        # Runs on a pool thread, which gets its own DB connection. Django only
-        # closes connections at the end of a *request*, so without the finally
-        # below every notification would leak one until Postgres hits
-        # max_connections.
-        from django.db import connection as _db_connection
-        try:
-            _dispatch_inner()
-        finally:
-            _db_connection.close()
-
-    def _dispatch_inner():
-        tokens = list(DeviceToken.objects.filter(user=user).values_list('token', flat=True))
-        if not tokens:
-            return
-
-        # Send to all tokens in a single batched call using the firebase-admin
-        # batch API. send_each preserves input order, so responses line up with
-        # the messages (and therefore the tokens) by index.
-        messages = [
-            messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=data or {},
-                token=token,
-            )
-            for token in tokens
-        ]
+    OutboundNotification.objects.create(
+        user_ids=user_ids, title=title, body=body, data=data or {},
+    )
+
+
+def _dispatch_bulk(user_ids, title, body, data=None, tokens=None):
+    """Send one notification to every token registered to *user_ids* (or to
+    exactly *tokens*, when retrying part of an earlier send).
 
+    Returns ``(retry_tokens, error)``: the tokens in batches FCM could not
+    take at all, and the last such error. Per-token rejections are final;
+    tokens FCM reports as dead are pruned in one delete.
+    """
+    if tokens is None:
+        tokens = list(
+            DeviceToken.objects.filter(user_id__in=user_ids)
+            .values_list('token', flat=True)
+        )
+    if not tokens:
+        return [], ''
+
+    notification = messaging.Notification(title=title, body=body)
+    success_count = 0
+    failure_count = 0
+    stale = []
+    retry = []
+    error = ''
+    for i in range(0, len(tokens), MULTICAST_BATCH_SIZE):
+        batch = tokens[i:i + MULTICAST_BATCH_SIZE]
         try:
-            batch_response = messaging.send_each(messages)
+            batch_response = messaging.send_each_for_multicast(messaging.MulticastMessage(
+                notification=notification, data=data or {}, tokens=batch,
+            ))
         except Exception as e:
             logger.error(f"Failed to send push notifications: {e}", exc_info=True)
-            return
+            failure_count += len(batch)
+            retry.extend(batch)
+            error = str(e)
+            continue
 
-        success_count = 0
-        failure_count = 0
-        for token, response in zip(tokens, batch_response.responses):
+        # Responses line up with the batch's tokens by index.
+        for token, response in zip(batch, batch_response.responses):
             if response.success:
                 success_count += 1
                 continue
@@ -161,19 +169,104 @@ def send_push_notification(user, title, body, data=None, category=None):
             exception = response.exception
             if isinstance(exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
                 # Token is invalid or registered to a different sender - clean it up
-                DeviceToken.objects.filter(token=token).delete()
-                logger.warning(f"Removed stale token {token[:10]}...")
+                stale.append(token)
             else:
                 logger.error(f"Failed to send to token {token[:10]}...: {exception}")
 
-        logger.info(f"Successfully sent {success_count} messages; failed {failure_count} messages.")
+    if stale:
+        DeviceToken.objects.filter(token__in=stale).delete()
+        logger.warning(f"Removed {len(stale)} stale token(s).")
+
+    logger.info(f"Successfully sent {success_count} messages; failed {failure_count} messages.")
+    return retry, error
 
-    # Get the Firebase network I/O off the request/transaction path: run after
-    # the surrounding DB transaction commits AND on a background worker, so a
-    # slow FCM endpoint cannot stall the gunicorn worker. When there is no
-    # active transaction, on_commit runs the callback immediately, which is fine.
-    from django.db import transaction
-    transaction.on_commit(lambda: _executor().submit(_dispatch))
+
+def _retry_delay(attempts):
+    """Backoff before attempt ``attempts + 1``: 30s, 1m, 2m, … capped at 1h."""
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def deliver_outbound_notifications(limit=100):
+    """Claim up to *limit* due OutboundNotification rows and send them.
+
+    Rows are claimed with ``SELECT … FOR UPDATE SKIP LOCKED`` and leased for
+    OUTBOX_LEASE before anything is sent, so concurrent workers never send the
+    same row twice and a worker that dies mid-batch only delays its rows.
+    Failed sends are rescheduled with exponential backoff until
+    OUTBOX_MAX_ATTEMPTS, then marked FAILED.
+
+    Returns ``{'claimed', 'sent', 'retrying', 'failed', 'latency_ms'}`` where
+    ``latency_ms`` lists enqueue-to-delivery times for the rows sent.
+    """
+    stats = {'claimed': 0, 'sent': 0, 'retrying': 0, 'failed': 0, 'latency_ms': []}
+    if not initialize_firebase():
+        return stats
+
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundNotification.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        if not batch:
+            return stats
+        OutboundNotification.objects.filter(id__in=[n.id for n in batch]).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + OUTBOX_LEASE,
+        )
+    stats['claimed'] = len(batch)
+
+    for notification in batch:
+        notification.attempts += 1
+        try:
+            retry, error = _dispatch_bulk(
+                notification.user_ids, notification.title, notification.body,
+                notification.data, tokens=notification.tokens,
+            )
+            if retry:
+                notification.tokens = retry
+        except Exception as e:
+            # Nothing is known to have gone out; retry the row as it stands.
+            logger.error(f"Failed to deliver notification {notification.id}: {e}", exc_info=True)
+            retry, error = True, str(e)
+        finished = timezone.now()
+        if not retry:
+            notification.status = 'SENT'
+            notification.tokens = None
+            notification.sent_at = finished
+            notification.latency_ms = int((finished - notification.created_at).total_seconds() * 1000)
+            notification.last_error = ''
+            stats['sent'] += 1
+            stats['latency_ms'].append(notification.latency_ms)
+            continue
+        notification.last_error = error[:1000]
+        if notification.attempts >= OUTBOX_MAX_ATTEMPTS:
+            notification.status = 'FAILED'
+            stats['failed'] += 1
+        else:
+            notification.next_attempt_at = finished + _retry_delay(notification.attempts)
+            stats['retrying'] += 1
+
+    OutboundNotification.objects.bulk_update(batch, [
+        'status', 'tokens', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'latency_ms',
+    ])
+    return stats
+
+
+def send_push_notification(user, title, body, data=None, category=None):
+    """Sends a push notification to all devices registered for a specific user.
+
+    If *category* is supplied the user's notification preferences are checked
+    first.  When the preference is disabled the notification is silently
+    skipped.
+
+    Staff members are skipped on days they are not working (per their weekly
+    availability or approved day-off requests).
+
+    Sending the same message to several users? Use :func:`send_push_bulk`.
+    """
+    send_push_bulk([user], title, body, data, category=category)
 
 def send_traffic_alert(alert_type, date, staff_member, detail='', dog_ids=None):
     """
@@ -239,9 +332,7 @@ def send_traffic_alert(alert_type, date, staff_member, detail='', dog_ids=None):
         'click_action': 'FLUTTER_NOTIFICATION_CLICK',
     }
 
-    owners = User.objects.filter(id__in=owner_ids)
-    for owner in owners:
-        send_push_notification(owner, title, body, data, category='traffic')
+    send_push_bulk(User.objects.filter(id__in=owner_ids), title, body, data, category='traffic')
 
 
 def notify_post_comment(comment, post):
@@ -295,16 +386,20 @@ def notify_post_comment(comment, post):
         'click_action': 'FLUTTER_NOTIFICATION_CLICK',
     }
 
-    users = User.objects.filter(id__in=users_to_notify)
-    for user in users:
-        # Tailor the message depending on whether they are the post owner or a fellow commenter
-        if user.id == post.uploaded_by_id:
-            title = "New Comment on Your Post"
-            body = f"{commenter_name} commented on your {post_label}."
-        else:
-            title = "New Reply"
-            body = f"{commenter_name} also replied to a post you commented on."
-        send_push_notification(user, title, body, data, category='feed')
+    # Tailor the message depending on whether they are the post owner or a fellow commenter
+    users = list(User.objects.filter(id__in=users_to_notify))
+    uploader = [user for user in users if user.id == post.uploaded_by_id]
+    others = [user for user in users if user.id != post.uploaded_by_id]
+    if uploader:
+        send_push_bulk(
+            uploader, "New Comment on Your Post",
+            f"{commenter_name} commented on your {post_label}.", data, category='feed',
+        )
+    if others:
+        send_push_bulk(
+            others, "New Reply",
+            f"{commenter_name} also replied to a post you commented on.", data, category='feed',
+        )
 
 
 def notify_defect_comment(comment, defect, defect_type='vehicle'):
@@ -344,15 +439,14 @@ def notify_defect_comment(comment, defect, defect_type='vehicle'):
         'id': str(defect.id),
         'click_action': 'FLUTTER_NOTIFICATION_CLICK',
     }
-    for user in User.objects.filter(id__in=user_ids):
-        send_push_notification(user, title, body, data)
+    send_push_bulk(User.objects.filter(id__in=user_ids), title, body, data)
 
 
 def send_staff_notification(title, body, data=None, permission=None, exclude_user=None):
     """Sends a push notification to staff members individually.
 
-    Unlike the previous topic-based approach, this sends to each staff member
-    separately so that work-hours and working-day filters can be applied.
+    Unlike the previous topic-based approach, this resolves each staff member
+    separately so that working-day filters can be applied.
 
     If *permission* is supplied (e.g. ``'can_manage_requests'``), only staff
     whose UserProfile has that flag set to True will receive the notification.
@@ -372,5 +466,4 @@ def send_staff_notification(title, body, data=None, permission=None, exclude_use
     if exclude_user is not None:
         recipients = recipients.exclude(pk=exclude_user.pk)
 
-    for user in recipients:
-        send_push_notification(user, title, body, data)
+    send_push_bulk(recipients, title, body, data)
@@ -1,4 +1,38 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class NewestFirstCursorPagination(CursorPagination):
+    """Keyset pagination over ``(created_at, id)``, newest first.
+
+    Each page is a ``WHERE created_at < <cursor position>`` seek down the
+    index rather than an OFFSET, and no COUNT(*) runs, so the hundredth page
+    costs what the first does. Items sharing a created_at are kept in id
+    order and stepped over by DRF's in-cursor offset, so none are skipped or
+    repeated. Responses are ``{next, previous, results}``; follow ``next``.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+
+
+class FeedCursorPagination(NewestFirstCursorPagination):
+    page_size = 5
+    max_page_size = 30
+
+
+class GalleryCursorPagination(NewestFirstCursorPagination):
+    """A dog's photo gallery (/api/photos/by_dog/?cursor=)."""
+    page_size = 30
+    max_page_size = 100
+
+
+class CommentCursorPagination(CursorPagination):
+    """A feed post's comments (/api/feed/<id>/comments/), oldest first as the
+    card shows them, with the same seek-not-offset paging as the feed."""
+    ordering = ('created_at', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class FeedPagination(PageNumberPagination):
@@ -8,11 +42,28 @@ class FeedPagination(PageNumberPagination):
     lets the client request more via ``?page=N`` (or override the size with
     ``?page_size=N`` up to a sane cap). This is applied only to the feed
     endpoint, so other list endpoints keep returning plain JSON arrays.
+
+    A client that sends ``?cursor=`` (empty for the first page) gets
+    FeedCursorPagination instead — no count, no growing OFFSET. Page numbers
+    stay for clients that predate it.
     """
 
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 30
+    cursor_class = FeedCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if self.cursor_class.cursor_query_param in request.query_params:
+            self.cursor = self.cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
 
 
 class OptInPagination(PageNumberPagination):
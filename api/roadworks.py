@@ -17,6 +17,7 @@ from __future__ import annotations
 import logging
 import math
 import re
+from collections import defaultdict
 from datetime import date
 
 from django.conf import settings
@@ -52,6 +53,41 @@ def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
 
 
+# ── Grid buckets ────────────────────────────────────────────────────────────
+#
+# The national feed holds tens of thousands of in-force works, and a day's
+# pickups cover a few towns. Each issue is stamped at write time with the
+# 0.01° × 0.01° cell its point falls in (roughly 1.1km × 0.7km in England), so
+# the day's query only reads issues in the cells within the match radius of a
+# pickup — an indexed IN over a few dozen cells instead of the whole country.
+
+GRID_DEG = 0.01
+# Cell ids pack the row (latitude) and column (longitude) into one integer;
+# columns run from -18000 to 18000, well inside one row's span.
+_GRID_ROW = 100_000
+_M_PER_DEG_LAT = EARTH_RADIUS_M * math.pi / 180
+
+
+def grid_cell(lat: float | None, lon: float | None) -> int | None:
+    """The grid cell a point falls in, or None without a location."""
+    if lat is None or lon is None:
+        return None
+    return math.floor(lat / GRID_DEG) * _GRID_ROW + math.floor(lon / GRID_DEG)
+
+
+def cells_near(points, radius_m: float) -> set[int]:
+    """Every grid cell overlapping the bounding box of `radius_m` around any
+    of the (lat, lon) `points`."""
+    cells = set()
+    for lat, lon in points:
+        d_lat = radius_m / _M_PER_DEG_LAT
+        d_lon = d_lat / max(math.cos(math.radians(lat)), 0.01)
+        rows = range(math.floor((lat - d_lat) / GRID_DEG), math.floor((lat + d_lat) / GRID_DEG) + 1)
+        cols = range(math.floor((lon - d_lon) / GRID_DEG), math.floor((lon + d_lon) / GRID_DEG) + 1)
+        cells.update(row * _GRID_ROW + col for row in rows for col in cols)
+    return cells
+
+
 # ── British National Grid → WGS84 ───────────────────────────────────────────
 #
 # Street Manager publishes geometry as WKT in EPSG:27700 (OSGB36 / British
@@ -228,16 +264,23 @@ def severity_for(traffic_management: str) -> str:
 # ── Route matching ──────────────────────────────────────────────────────────
 
 
-def issues_for_date(on_date: date):
-    """Roadworks in force on `on_date`, newest-worst first."""
+def issues_for_date(on_date: date, near=None):
+    """Roadworks in force on `on_date`, newest-worst first.
+
+    With `near` — (lat, lon) points — only issues in the grid cells within the
+    match radius of one of them; the rest can't match and aren't read.
+    """
     from .models import RoadworkIssue
 
-    return (
+    issues = (
         RoadworkIssue.objects
         .filter(is_cancelled=False, start_date__lte=on_date, end_date__gte=on_date)
         .exclude(latitude__isnull=True)
         .exclude(longitude__isnull=True)
     )
+    if near is not None:
+        issues = issues.filter(grid_cell__in=cells_near(near, match_radius_m()))
+    return issues
 
 
 def match_issues_to_routes(on_date: date, assignments=None) -> dict:
@@ -248,13 +291,12 @@ def match_issues_to_routes(on_date: date, assignments=None) -> dict:
     `assignments` may be passed in when the caller has already loaded the day
     (the dashboard has), to avoid a second query. It must be an iterable of
     DailyDogAssignment with `dog` selected.
+
+    Only issues in the grid cells around the day's pickups are loaded, and
+    each is distance-checked only against the pickups in the cells around it.
     """
     from .models import DailyDogAssignment
 
-    issues = list(issues_for_date(on_date))
-    if not issues:
-        return {}
-
     if assignments is None:
         assignments = (
             DailyDogAssignment.objects
@@ -270,15 +312,23 @@ def match_issues_to_routes(on_date: date, assignments=None) -> dict:
         a for a in assignments
         if a.staff_member_id and a.dog.latitude is not None and a.dog.longitude is not None
     ]
+    if not located:
+        return {}
+
+    by_cell = defaultdict(list)
+    for a in located:
+        by_cell[grid_cell(a.dog.latitude, a.dog.longitude)].append(a)
 
     radius = match_radius_m()
     result: dict = {}
+    issues = issues_for_date(on_date, near=[(a.dog.latitude, a.dog.longitude) for a in located])
     for issue in issues:
         staff_ids, dog_ids = set(), set()
-        for a in located:
-            if haversine_m(issue.latitude, issue.longitude, a.dog.latitude, a.dog.longitude) <= radius:
-                staff_ids.add(a.staff_member_id)
-                dog_ids.add(a.dog_id)
+        for cell in cells_near([(issue.latitude, issue.longitude)], radius):
+            for a in by_cell.get(cell, ()):
+                if haversine_m(issue.latitude, issue.longitude, a.dog.latitude, a.dog.longitude) <= radius:
+                    staff_ids.add(a.staff_member_id)
+                    dog_ids.add(a.dog_id)
         if staff_ids:
             result[issue.id] = {'issue': issue, 'staff_ids': staff_ids, 'dog_ids': dog_ids}
     return result
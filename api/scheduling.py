@@ -18,6 +18,9 @@ request permanently vetoes the date. See ``effective_change_actions``.
 
 Nobody attends on a CLOSED closure day.
 
+daycare_days is read through DogScheduleDay, its (dog, weekday) mirror
+indexed on weekday, so a range only reads the dogs that come on its weekdays.
+
 Note: fortnightly dogs are intentionally treated like weekly dogs — the rest
 of the system (roster materialization, unassigned_dogs) does the same.
 """
@@ -84,13 +87,68 @@ def effective_change_actions(start, end, dog_ids=None):
     return adds_by_date, cancels_by_date
 
 
+def weekday_numbers(daycare_days):
+    """The ISO weekday numbers in a daycare_days list, ignoring anything that
+    isn't one (the serializer normalises; older rows may not be)."""
+    return sorted({day for day in (daycare_days or []) if isinstance(day, int) and 1 <= day <= 7})
+
+
+def sync_dog_schedule_days(dog_id, daycare_days):
+    """Make ``dog_id``'s DogScheduleDay rows match ``daycare_days``."""
+    from .models import DogScheduleDay
+
+    weekdays = weekday_numbers(daycare_days)
+    DogScheduleDay.objects.filter(dog_id=dog_id).exclude(weekday__in=weekdays).delete()
+    DogScheduleDay.objects.bulk_create(
+        [DogScheduleDay(dog_id=dog_id, weekday=weekday) for weekday in weekdays],
+        ignore_conflicts=True,
+    )
+
+
+def weekday_schedule(start, end, dog_ids=None):
+    """``(dog_id, weekday)`` for every dog scheduled on a weekday falling in
+    [start, end] — an index range scan on DogScheduleDay.weekday."""
+    from .models import DogScheduleDay
+
+    weekdays = {day.isoweekday() for day in daterange(start, min(end, start + timedelta(days=6)))}
+    rows = DogScheduleDay.objects.filter(weekday__in=weekdays)
+    if dog_ids is not None:
+        rows = rows.filter(dog_id__in=dog_ids)
+    return rows.values_list('dog_id', 'weekday')
+
+
+def _effective_capacity(closure, default_capacity):
+    if closure:
+        if closure.closure_type == 'CLOSED':
+            return 0
+        if closure.capacity_override:
+            return closure.capacity_override
+    return default_capacity
+
+
+def _capacity_info(booked, capacity):
+    if capacity is None:
+        return {'capacity': None, 'booked': booked, 'is_full': False, 'spots_left': None}
+    return {
+        'capacity': capacity,
+        'booked': booked,
+        'is_full': booked >= capacity,
+        'spots_left': max(0, capacity - booked),
+    }
+
+
 class ScheduleIndex:
     """Bulk-loads everything needed to answer attendance and capacity
-    questions for every day in [start, end] with a fixed number of queries."""
+    questions for every day in [start, end] with a fixed number of queries.
 
-    def __init__(self, start, end):
+    ``dog_ids`` narrows the attendance side to those dogs (closures and
+    capacity are still facility-wide) — used to patch single dogs into the
+    persisted ``ScheduleDay`` rows without re-reading every dog.
+    """
+
+    def __init__(self, start, end, dog_ids=None):
         from .models import (
-            BoardingRequest, ClosureDay, DailyDogAssignment, DaycareSettings, Dog,
+            BoardingRequest, ClosureDay, DailyDogAssignment, DaycareSettings,
         )
         self.start = start
         self.end = end
@@ -99,18 +157,25 @@ class ScheduleIndex:
             c.date: c for c in ClosureDay.objects.filter(date__range=(start, end))
         }
 
-        self.adds_by_date, self.cancels_by_date = effective_change_actions(start, end)
+        self.adds_by_date, self.cancels_by_date = effective_change_actions(
+            start, end, dog_ids=dog_ids,
+        )
+
+        assignments = DailyDogAssignment.objects.filter(date__range=(start, end))
+        boardings = BoardingRequest.objects.filter(
+            status='APPROVED', start_date__lte=end, end_date__gte=start,
+        )
+        if dog_ids is not None:
+            assignments = assignments.filter(dog_id__in=dog_ids)
+            boardings = boardings.filter(dogs__id__in=dog_ids)
 
         self.weekday_dogs = defaultdict(set)
-        for dog_id, days in Dog.objects.values_list('id', 'daycare_days'):
-            for day_number in (days or []):
-                self.weekday_dogs[day_number].add(dog_id)
+        for dog_id, weekday in weekday_schedule(start, end, dog_ids=dog_ids):
+            self.weekday_dogs[weekday].add(dog_id)
 
         self.active_assignments_by_date = defaultdict(set)
         self.removed_assignments_by_date = defaultdict(set)
-        assignment_rows = DailyDogAssignment.objects.filter(
-            date__range=(start, end),
-        ).values_list('date', 'dog_id', 'status')
+        assignment_rows = assignments.values_list('date', 'dog_id', 'status')
         for day, dog_id, status in assignment_rows:
             if status == 'REMOVED':
                 self.removed_assignments_by_date[day].add(dog_id)
@@ -118,11 +183,9 @@ class ScheduleIndex:
                 self.active_assignments_by_date[day].add(dog_id)
 
         self.boarding_by_date = defaultdict(set)
-        boarding_rows = BoardingRequest.objects.filter(
-            status='APPROVED', start_date__lte=end, end_date__gte=start,
-        ).values_list('dogs__id', 'start_date', 'end_date')
+        boarding_rows = boardings.values_list('dogs__id', 'start_date', 'end_date')
         for dog_id, b_start, b_end in boarding_rows:
-            if dog_id is None:
+            if dog_id is None or (dog_ids is not None and dog_id not in dog_ids):
                 continue
             for day in daterange(max(b_start, start), min(b_end, end)):
                 self.boarding_by_date[day].add(dog_id)
@@ -150,33 +213,503 @@ class ScheduleIndex:
 
     def capacity_for(self, day):
         """Effective capacity as an int, or None when unlimited."""
-        closure = self.closure(day)
-        if closure:
-            if closure.closure_type == 'CLOSED':
-                return 0
-            if closure.capacity_override:
-                return closure.capacity_override
-        return self.default_capacity
+        return _effective_capacity(self.closure(day), self.default_capacity)
 
     def capacity_info(self, day):
-        booked = len(self.attending_dog_ids(day))
-        capacity = self.capacity_for(day)
-        if capacity is None:
-            return {'capacity': None, 'booked': booked, 'is_full': False, 'spots_left': None}
+        return _capacity_info(len(self.attending_dog_ids(day)), self.capacity_for(day))
+
+    def snapshot_fields(self, day):
+        """The ``ScheduleDay`` column values for ``day``."""
+        closure = self.closure(day)
+        attending = self.attending_dog_ids(day)
         return {
-            'capacity': capacity,
-            'booked': booked,
-            'is_full': booked >= capacity,
-            'spots_left': max(0, capacity - booked),
+            'dog_ids': sorted(attending),
+            'boarding_dog_ids': sorted(self.boarding_dog_ids(day) & attending),
+            'booked': len(attending),
+            'capacity': self.capacity_for(day),
+            'closure_type': closure.closure_type if closure else '',
+            'closure_reason': closure.reason if closure else '',
         }
 
 
+# =============================================================================
+# LONG-RANGE ATTENDANCE BITMAP
+# =============================================================================
+#
+# ScheduleIndex keeps a set of dog ids per date and expands every boarding
+# stay day by day — right for answering "who attends on X?", but a year-ahead
+# capacity heatmap only wants the counts and would build hundreds of
+# thousands of set entries to get them. AttendanceBitmap holds the same rules
+# as one integer per dog, bit i standing for day start + i, so each rule is a
+# whole-range mask operation: a weekday pattern is a precomputed mask, a
+# boarding stay one contiguous run of bits, an add/cancel/removed row a
+# single bit. Per-day totals come from a bit-sliced counter over the rows
+# rather than from counting sets.
+
+
+class AttendanceBitmap:
+    """Attendance for every day in [start, end] as a dog × day bit matrix.
+
+    Same rules and inputs as :class:`ScheduleIndex` (and the same answers —
+    see the parity test), with the same fixed number of queries. Rows are
+    keyed by dense indexes into ``dog_ids``: the dogs some input mentions.
+    """
+
+    def __init__(self, start, end):
+        from .models import (
+            BoardingRequest, ClosureDay, DailyDogAssignment, DaycareSettings,
+        )
+        self.start = start
+        self.end = end
+        self.days = (end - start).days + 1
+        full = (1 << self.days) - 1
+
+        self.closures = {
+            c.date: c for c in ClosureDay.objects.filter(date__range=(start, end))
+        }
+        closed = 0
+        for day, closure in self.closures.items():
+            if closure.closure_type == 'CLOSED':
+                closed |= 1 << self._offset(day)
+
+        # Every 7th bit from the first day with each ISO weekday.
+        weeks = sum(1 << (7 * i) for i in range(self.days // 7 + 1))
+        weekday_masks = {
+            number: (weeks << ((number - start.isoweekday()) % 7)) & full
+            for number in range(1, 8)
+        }
+
+        adds_by_date, cancels_by_date = effective_change_actions(start, end)
+        assignment_rows = list(
+            DailyDogAssignment.objects.filter(date__range=(start, end))
+            .values_list('date', 'dog_id', 'status')
+        )
+        boarding_rows = [
+            row for row in BoardingRequest.objects.filter(
+                status='APPROVED', start_date__lte=end, end_date__gte=start,
+            ).values_list('dogs__id', 'start_date', 'end_date')
+            if row[0] is not None
+        ]
+        schedule_rows = list(weekday_schedule(start, end))
+
+        # Only dogs some input mentions get a row; any other dog's is all zeros.
+        self.dog_ids = sorted(
+            {dog_id for dog_id, _ in schedule_rows}
+            | {dog_id for ids in adds_by_date.values() for dog_id in ids}
+            | {dog_id for _, dog_id, _ in assignment_rows}
+            | {dog_id for dog_id, _, _ in boarding_rows}
+        )
+        index = {dog_id: i for i, dog_id in enumerate(self.dog_ids)}
+
+        base = [0] * len(self.dog_ids)
+        for dog_id, weekday in schedule_rows:
+            base[index[dog_id]] |= weekday_masks[weekday]
+
+        def overlay(pairs):
+            masks = [0] * len(self.dog_ids)
+            for day, dog_id in pairs:
+                if dog_id in index:
+                    masks[index[dog_id]] |= 1 << self._offset(day)
+            return masks
+
+        adds = overlay((day, dog_id) for day, ids in adds_by_date.items() for dog_id in ids)
+        cancels = overlay((day, dog_id) for day, ids in cancels_by_date.items() for dog_id in ids)
+        active = overlay((day, dog_id) for day, dog_id, status in assignment_rows if status != 'REMOVED')
+        removed = overlay((day, dog_id) for day, dog_id, status in assignment_rows if status == 'REMOVED')
+
+        boarding = [0] * len(self.dog_ids)
+        for dog_id, b_start, b_end in boarding_rows:
+            first = self._offset(max(b_start, start))
+            last = self._offset(min(b_end, end))
+            boarding[index[dog_id]] |= ((1 << (last - first + 1)) - 1) << first
+
+        open_days = full & ~closed
+        self.attending = []
+        self.boarding = []
+        for i in range(len(self.dog_ids)):
+            row = (((base[i] | adds[i]) & ~cancels[i]) | active[i]) & ~removed[i]
+            self.attending.append((row | boarding[i]) & open_days)
+            self.boarding.append(boarding[i] & open_days)
+
+        self.default_capacity = DaycareSettings.load().default_daily_capacity or None
+
+    def _offset(self, day):
+        return (day - self.start).days
+
+    def closure(self, day):
+        return self.closures.get(day)
+
+    def attending_dog_ids(self, day):
+        bit = 1 << self._offset(day)
+        return {dog_id for dog_id, row in zip(self.dog_ids, self.attending) if row & bit}
+
+    def boarding_dog_ids(self, day):
+        bit = 1 << self._offset(day)
+        return {dog_id for dog_id, row in zip(self.dog_ids, self.boarding) if row & bit}
+
+    def capacity_for(self, day):
+        """Effective capacity as an int, or None when unlimited."""
+        return _effective_capacity(self.closure(day), self.default_capacity)
+
+    @staticmethod
+    def _day_counts(rows, days):
+        """How many of ``rows`` have each of the ``days`` bits set.
+
+        Adds the rows into a bit-sliced binary counter — ``slices[k]`` holds
+        bit k of every day's running total — so each row costs a few
+        whole-range XOR/AND steps, and reads the totals back out per day.
+        """
+        slices = []
+        for row in rows:
+            carry = row
+            for k, bits in enumerate(slices):
+                if not carry:
+                    break
+                slices[k], carry = bits ^ carry, bits & carry
+            if carry:
+                slices.append(carry)
+        return [
+            sum(((bits >> i) & 1) << k for k, bits in enumerate(slices))
+            for i in range(days)
+        ]
+
+    def heatmap(self):
+        """One entry per day: how booked it is against its capacity."""
+        booked = self._day_counts(self.attending, self.days)
+        boarding = self._day_counts(self.boarding, self.days)
+        results = []
+        for i, day in enumerate(daterange(self.start, self.end)):
+            closure = self.closure(day)
+            results.append({
+                'date': day.isoformat(),
+                **_capacity_info(booked[i], self.capacity_for(day)),
+                'boarding': boarding[i],
+                'closure_type': closure.closure_type if closure else '',
+            })
+        return results
+
+
+# =============================================================================
+# PERSISTED SCHEDULE SNAPSHOT
+# =============================================================================
+#
+# Building a ScheduleIndex reads the scheduled dogs, closures, change
+# requests, assignments and boarding for the range — fine for one calendar
+# render, wasteful for the capacity check behind every approval and waitlist
+# join. ScheduleDay keeps the answer per date: rows are created the first time
+# a date is read (schedule_days) and from then on patched in place by the
+# model signals whenever something that feeds attendance changes, so reads are
+# a single indexed SELECT.
+#
+# Writers only touch rows that already exist — a date nobody has asked about
+# costs nothing to keep current. Bulk writes that skip signals (bulk_create,
+# queryset.update) must call refresh_schedule_days themselves, or rely on
+# ``manage.py rebuild_schedule_index`` to repair the drift.
+#
+# That leaves a reader building a missing row from data read just before a
+# write, inserting it just after the writer found nothing to patch. So a
+# writer that finds a date missing bumps that date's build key
+# (schedule_build_key) first, holding its ChangeVersion row locked until it
+# commits; writers that can't tell which dates they touch — weekday, capacity
+# and dog-deletion refreshes, all rare — bump SCHEDULE_BUILD_KEY instead. The
+# reader notes the versions of the global key and of each date it builds
+# before reading, and locks the same rows after inserting; if any moved, the
+# rows it built are refreshed from the now-committed data. Readers take a
+# share lock on Postgres, so cold reads wait for writers but not for each
+# other, and warm reads and writes to built dates take no lock at all.
+
+SNAPSHOT_FIELDS = (
+    'dog_ids', 'boarding_dog_ids', 'booked', 'capacity', 'closure_type', 'closure_reason',
+)
+
+SCHEDULE_BUILD_KEY = 'schedule_build'
+
+
+def schedule_build_key(day):
+    return f'{SCHEDULE_BUILD_KEY}:{day.isoformat()}'
+
+
+def _schedule_build_versions(days, lock=False):
+    """The build-key versions a build of ``days`` depends on, in key order.
+    With ``lock``, waits for any writer holding one of them and keeps the
+    rows share-locked until the transaction ends."""
+    from django.db import connection
+    from .models import ChangeVersion
+
+    keys = sorted([SCHEDULE_BUILD_KEY, *(schedule_build_key(day) for day in days)])
+    if lock:
+        # Every key needs a row to wait on: a writer's first bump would
+        # otherwise be an insert this couldn't see.
+        ChangeVersion.objects.bulk_create(
+            [ChangeVersion(key=key, version='') for key in keys], ignore_conflicts=True,
+        )
+    if lock and connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(ChangeVersion._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT "key", "version" FROM {table} WHERE "key" = ANY(%s) ORDER BY "key" FOR SHARE',
+                [keys],
+            )
+            versions = dict(cursor.fetchall())
+    else:
+        # SQLite runs one writer at a time, so there is nothing to wait on.
+        versions = dict(ChangeVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return [versions.get(key, '') for key in keys]
+
+
+def _bump_schedule_build(days=None):
+    """Bump the build keys of ``days``, or the global one without them."""
+    from .conditional import bump_versions
+    if days is None:
+        bump_versions(SCHEDULE_BUILD_KEY)
+    else:
+        bump_versions(*(schedule_build_key(day) for day in days))
+
+
+def schedule_days(start, end):
+    """``{date: ScheduleDay}`` for every day in [start, end], building any
+    missing rows from one ScheduleIndex over the gap."""
+    from .models import ScheduleDay
+
+    rows = {row.date: row for row in ScheduleDay.objects.filter(date__range=(start, end))}
+    missing = [day for day in daterange(start, end) if day not in rows]
+    if missing:
+        built_from = _schedule_build_versions(missing)
+        index = ScheduleIndex(min(missing), max(missing))
+        built = [ScheduleDay(date=day, **index.snapshot_fields(day)) for day in missing]
+        # ignore_conflicts: a concurrent reader may have built the same date;
+        # both computed it from the same data.
+        ScheduleDay.objects.bulk_create(built, ignore_conflicts=True)
+        if _schedule_build_versions(missing, lock=True) != built_from:
+            # A write landed while the index was read and may have found
+            # nothing to patch. The rows exist now, so this refresh — and any
+            # later writer's — sees them.
+            refresh_schedule_days(missing)
+            built = ScheduleDay.objects.filter(date__in=missing)
+        rows.update((row.date, row) for row in built)
+    return rows
+
+
+def refresh_schedule_days(dates, dog_ids=None):
+    """Bring the stored ``ScheduleDay`` rows for ``dates`` up to date.
+
+    With ``dog_ids`` only those dogs' membership is recomputed and patched
+    into the stored lists (the cheap path for a single dog's booking or
+    assignment changing); without it each day is rebuilt outright (closures,
+    capacity). Dates with no stored row are skipped. Returns the number of
+    rows that changed.
+    """
+    from django.db import transaction
+    from .models import ScheduleDay, _as_date
+
+    dates = {_as_date(day) for day in dates if day is not None}
+    if not dates:
+        return 0
+    if dog_ids is not None:
+        dog_ids = set(dog_ids)
+        if not dog_ids:
+            return 0
+
+    with transaction.atomic():
+        rows = list(ScheduleDay.objects.select_for_update().filter(date__in=dates))
+        if len(rows) < len(dates):
+            # A reader may be building a missing date (see schedule_days);
+            # look again once it would have to wait for us.
+            _bump_schedule_build(dates - {row.date for row in rows})
+            rows = list(ScheduleDay.objects.select_for_update().filter(date__in=dates))
+        if not rows:
+            return 0
+        index = ScheduleIndex(
+            min(row.date for row in rows), max(row.date for row in rows), dog_ids=dog_ids,
+        )
+        changed = []
+        for row in rows:
+            fields = index.snapshot_fields(row.date)
+            if dog_ids is not None and fields['closure_type'] != 'CLOSED':
+                attending = (set(row.dog_ids) - dog_ids) | set(fields['dog_ids'])
+                boarding = (set(row.boarding_dog_ids) - dog_ids) | set(fields['boarding_dog_ids'])
+                fields.update(
+                    dog_ids=sorted(attending),
+                    boarding_dog_ids=sorted(boarding),
+                    booked=len(attending),
+                )
+            if all(getattr(row, name) == fields[name] for name in SNAPSHOT_FIELDS):
+                continue
+            for name, value in fields.items():
+                setattr(row, name, value)
+            row.version += 1
+            row.updated_at = timezone.now()  # bulk_update skips auto_now
+            changed.append(row)
+        if changed:
+            ScheduleDay.objects.bulk_update(
+                changed, [*SNAPSHOT_FIELDS, 'version', 'updated_at'],
+            )
+    return len(changed)
+
+
+def refresh_schedule_capacity(default_capacity):
+    """Re-derive ``capacity`` on every stored row after the facility-wide
+    default changes. Attendance is untouched, so no ScheduleIndex needed."""
+    from .models import ClosureDay, ScheduleDay
+
+    _bump_schedule_build()
+    rows = list(ScheduleDay.objects.all())
+    if not rows:
+        return 0
+    closures = {
+        c.date: c for c in ClosureDay.objects.filter(date__in=[row.date for row in rows])
+    }
+    changed = []
+    for row in rows:
+        capacity = _effective_capacity(closures.get(row.date), default_capacity)
+        if capacity != row.capacity:
+            row.capacity = capacity
+            row.version += 1
+            row.updated_at = timezone.now()
+            changed.append(row)
+    if changed:
+        ScheduleDay.objects.bulk_update(changed, ['capacity', 'version', 'updated_at'])
+    return len(changed)
+
+
+def refresh_schedule_days_for_weekdays(weekdays, dog_ids):
+    """Patch ``dog_ids`` into every stored row falling on ``weekdays``
+    (ISO numbers) — the footprint of a change to a dog's daycare_days."""
+    from .models import ScheduleDay
+
+    if not weekdays:
+        return 0
+    _bump_schedule_build()
+    dates = ScheduleDay.objects.filter(
+        date__iso_week_day__in=weekdays,
+    ).values_list('date', flat=True)
+    return refresh_schedule_days(list(dates), dog_ids=dog_ids)
+
+
+def purge_dog_from_schedule_days(dog_id):
+    """Drop a deleted dog from every stored row it appears in."""
+    from django.db import connection
+    from .models import ScheduleDay
+
+    _bump_schedule_build()
+    if connection.features.supports_json_field_contains:
+        dates = list(
+            ScheduleDay.objects.filter(dog_ids__contains=[dog_id]).values_list('date', flat=True)
+        )
+    else:
+        # SQLite can't test JSON containment; only development runs here.
+        dates = [
+            row.date for row in ScheduleDay.objects.only('date', 'dog_ids')
+            if dog_id in row.dog_ids
+        ]
+    return refresh_schedule_days(dates, dog_ids=[dog_id])
+
+
+class ScheduleSnapshot:
+    """Read-side twin of :class:`ScheduleIndex` backed by ``ScheduleDay``.
+
+    Same questions, same answers, one query for the whole range once the
+    rows exist. ``closure()`` returns the day's ScheduleDay row (which
+    carries ``closure_type`` / ``closure_reason``) on closure days.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.days = schedule_days(start, end)
+
+    def closure(self, day):
+        row = self.days[day]
+        return row if row.closure_type else None
+
+    def boarding_dog_ids(self, day):
+        return set(self.days[day].boarding_dog_ids)
+
+    def attending_dog_ids(self, day):
+        return set(self.days[day].dog_ids)
+
+    def capacity_for(self, day):
+        return self.days[day].capacity
+
+    def capacity_info(self, day):
+        row = self.days[day]
+        return _capacity_info(row.booked, row.capacity)
+
+
+def schedule_version(start, end):
+    """A token that changes whenever any ScheduleDay row in [start, end] does.
+
+    One aggregate over the rows' version counters and timestamps, without
+    reading their dog lists; rows missing for the range are built first. A
+    patched row bumps its version and stamps updated_at, and a rebuilt one
+    gets a fresh updated_at, so no change leaves the token as it was.
+    """
+    from django.db.models import Count, Max, Sum
+    from .models import ScheduleDay
+
+    def aggregate():
+        return ScheduleDay.objects.filter(date__range=(start, end)).aggregate(
+            rows=Count('id'), versions=Sum('version'), latest=Max('updated_at'),
+        )
+
+    stamp = aggregate()
+    if stamp['rows'] < (end - start).days + 1:
+        schedule_days(start, end)
+        stamp = aggregate()
+    return f"{stamp['rows']}.{stamp['versions']}.{stamp['latest'].timestamp():.6f}"
+
+
+# How long a calendar's shared days stay cached. The key carries the schedule
+# version, so this only bounds how long superseded entries linger.
+CALENDAR_CACHE_TTL = 60 * 60 * 24
+
+
+def calendar_days(start, end):
+    """The part of the owner calendar that is the same for every owner.
+
+    ``{'days': [...], 'attendance': {dog_id: {iso date: boarding?}}}``:
+    each day's closure and capacity, plus every attending dog's days. Built
+    from the ScheduleDay rows once per schedule version and kept in the
+    cache, so owners opening the app between two schedule changes share one
+    build instead of each reading every dog's attendance for the range.
+    """
+    from django.core.cache import cache
+
+    key = f'calendar-days:{start.isoformat()}:{end.isoformat()}:{schedule_version(start, end)}'
+    shared = cache.get(key)
+    if shared is not None:
+        return shared
+
+    snapshot = ScheduleSnapshot(start, end)
+    days, attendance = [], defaultdict(dict)
+    for day in daterange(start, end):
+        iso = day.isoformat()
+        boarding = snapshot.boarding_dog_ids(day)
+        for dog_id in snapshot.attending_dog_ids(day):
+            attendance[dog_id][iso] = dog_id in boarding
+        closure = snapshot.closure(day)
+        info = snapshot.capacity_info(day)
+        days.append({
+            'date': iso,
+            'closure': (
+                {'closure_type': closure.closure_type, 'reason': closure.closure_reason}
+                if closure else None
+            ),
+            'is_full': info['is_full'],
+            'spots_left': info['spots_left'],
+            'capacity': info['capacity'],
+        })
+    shared = {'days': days, 'attendance': dict(attendance)}
+    cache.set(key, shared, CALENDAR_CACHE_TTL)
+    return shared
+
+
 def capacity_check(target_date, dog_id=None):
     """Return (fits, info): whether one more dog fits on ``target_date``.
 
     A dog already attending that day always fits (e.g. approving a CHANGE to a
     date the dog is already on)."""
-    index = ScheduleIndex(target_date, target_date)
+    index = ScheduleSnapshot(target_date, target_date)
     info = index.capacity_info(target_date)
     if dog_id is not None and dog_id in index.attending_dog_ids(target_date):
         return True, info
@@ -196,7 +729,7 @@ def process_waitlist_for_date(target_date):
     from .models import WaitlistEntry
     from .notifications import send_push_notification
 
-    index = ScheduleIndex(target_date, target_date)
+    index = ScheduleSnapshot(target_date, target_date)
     closure = index.closure(target_date)
     if closure and closure.closure_type == 'CLOSED':
         return 0
@@ -318,8 +851,8 @@ def sync_boarding_daycare_assignments(boarding_request):
       * anything outside Mon–Fri, and CLOSED days.
 
     Called from the deliberate moments — approval, and a date/dog change on an
-    approved stay. The day-load path is :func:`materialize_boarding_for_date`,
-    which only fills gaps so it can never undo a later manual reassignment.
+    approved stay. The day-load path is :func:`materialize_roster`, which only
+    fills gaps so it can never undo a later manual reassignment.
 
     Returns the number of rows created or changed. A no-op when the stay isn't
     APPROVED, or when there is no house account to assign to.
@@ -371,7 +904,19 @@ def sync_boarding_daycare_assignments(boarding_request):
             touched += 1
 
     if to_create:
+        from .conditional import bump_versions, roster_key
+        from .live import publish_assignments
+        from .sync import record_changes
         DailyDogAssignment.objects.bulk_create(to_create, ignore_conflicts=True)
+        refresh_staff_affinity(
+            dog_ids=dog_ids, weekdays={row.date.isoweekday() for row in to_create},
+        )
+        bump_versions(*{roster_key(row.date) for row in to_create})
+        created = list(DailyDogAssignment.objects.filter(
+            dog_id__in=dog_ids, date__in={row.date for row in to_create},
+        ).values_list('id', 'date'))
+        record_changes(DailyDogAssignment, [pk for pk, _ in created])
+        publish_assignments('assignment', created)
     return touched
 
 
@@ -431,48 +976,277 @@ def clear_boarding_daycare_assignments(boarding_request, dates=None):
     return deleted
 
 
-def materialize_boarding_for_date(target_date):
-    """Fill in missing daycare attendance for every dog boarding on
-    ``target_date``.
-
-    The lazy counterpart to :func:`sync_boarding_daycare_assignments`, used
-    when a day is loaded: it catches stays approved before this existed, and
-    dogs added to a stay afterwards. Scoped to the one date and never
-    re-points an existing row, so a staff member's manual reassignment for the
-    day stands.
+# =============================================================================
+# ROSTER MATERIALIZATION
+# =============================================================================
+#
+# A day's DailyDogAssignment rows are filled in from the weekday roster
+# (DogWeekdayPickup) and from boarding stays. That used to run on every load
+# of the day — five or six queries on each roster GET even when nothing had
+# changed. materialize_roster does a whole window in a fixed number of
+# queries (the nightly ``materialize_roster`` command), and stamps a RosterDay
+# marker per date so the read endpoints can skip the work until something
+# invalidates it (see the receivers in api.models).
+
+def invalidate_roster_days(dates=None, weekdays=None):
+    """Clear the materialized marker on today-onward dates, narrowed to
+    ``dates`` and/or ISO ``weekdays``. Past days are never re-materialized,
+    so their markers are left alone."""
+    from django.db.models import F
+    from .models import RosterDay
+
+    qs = RosterDay.objects.filter(date__gte=timezone.localdate())
+    if dates is not None:
+        dates = [day for day in dates if day is not None]
+        if not dates:
+            return 0
+        qs = qs.filter(date__in=dates)
+    if weekdays is not None:
+        if not weekdays:
+            return 0
+        qs = qs.filter(date__iso_week_day__in=weekdays)
+    return qs.update(materialized_at=None, version=F('version') + 1)
+
+
+def roster_is_materialized(target_date):
+    from .models import RosterDay
+    return RosterDay.objects.filter(
+        date=target_date, materialized_at__isnull=False,
+    ).exists()
+
+
+def materialize_roster(start, end):
+    """Create any missing DailyDogAssignment rows for every day in
+    [start, end] from the persistent DogWeekdayPickup roster, plus any dog
+    boarding that day, and mark each day materialized.
+
+    Returns the number of newly created rows. Skips:
+      * past dates — staff scroll back to review what actually happened, so
+        roster history is never fabricated retroactively
+      * CLOSED closure days
+      * ad-hoc dogs (defensive — they should never have roster entries)
+      * dogs whose current ``daycare_days`` no longer include the weekday
+      * dogs whose effective approved change for the date is a cancellation
+      * dogs that already have a DailyDogAssignment for the date
+
+    Dogs whose owner handles BOTH legs of transport are materialized as
+    UNASSIGNED: no staff route touches them, but they still attend, and
+    attendance is what billing reads. Boarding days follow
+    the rules in :func:`sync_boarding_daycare_assignments` (Mon–Fri, house
+    account) but only fill gaps, so a manual reassignment for the day stands.
     """
-    from .models import BoardingRequest, DailyDogAssignment
+    from django.db.models import Exists, OuterRef
+    from .models import (
+        BoardingRequest, ClosureDay, DailyDogAssignment, DogScheduleDay, DogWeekdayPickup,
+        RosterDay,
+    )
 
-    if target_date.isoweekday() not in DAYCARE_WEEKDAYS:
-        return 0
-    if not boarding_daycare_dates(target_date, target_date):
-        return 0  # closure day
-    house = house_staff_account()
-    if house is None:
+    start = max(start, timezone.localdate())
+    if end < start:
         return 0
+    days = list(daterange(start, end))
 
-    dog_ids = set(
-        BoardingRequest.objects
-        .filter(status='APPROVED', start_date__lte=target_date, end_date__gte=target_date)
-        .values_list('dogs__id', flat=True)
+    # Markers go in first and the versions are read before anything else, so
+    # an invalidation that lands while we work wins — the day is left stale
+    # rather than stamped materialized over a change we never saw.
+    RosterDay.objects.bulk_create(
+        [RosterDay(date=day) for day in days], ignore_conflicts=True,
+    )
+    versions = dict(
+        RosterDay.objects.filter(date__range=(start, end)).values_list('date', 'version')
     )
-    dog_ids.discard(None)
-    if not dog_ids:
-        return 0
 
-    already = set(
+    closed = set(
+        ClosureDay.objects
+        .filter(date__range=(start, end), closure_type='CLOSED')
+        .values_list('date', flat=True)
+    )
+    open_days = [day for day in days if day not in closed]
+    existing = set(
         DailyDogAssignment.objects
-        .filter(date=target_date, dog_id__in=dog_ids)
-        .values_list('dog_id', flat=True)
+        .filter(date__range=(start, end))
+        .values_list('dog_id', 'date')
     )
-    to_create = [
-        DailyDogAssignment(
-            dog_id=dog_id, staff_member=house, date=target_date,
-            status='ASSIGNED', from_boarding=True,
+    to_create = []
+
+    boarding_days = [day for day in open_days if day.isoweekday() in DAYCARE_WEEKDAYS]
+    stays = []
+    if boarding_days:
+        stays = list(
+            BoardingRequest.objects
+            .filter(status='APPROVED', start_date__lte=end, end_date__gte=start)
+            .values_list('dogs__id', 'start_date', 'end_date')
         )
-        for dog_id in dog_ids - already
-    ]
-    if not to_create:
-        return 0
-    DailyDogAssignment.objects.bulk_create(to_create, ignore_conflicts=True)
+    house = house_staff_account() if any(dog_id for dog_id, _, _ in stays) else None
+    if house is not None:
+        for dog_id, b_start, b_end in stays:
+            if dog_id is None:
+                continue
+            for day in boarding_days:
+                if b_start <= day <= b_end and (dog_id, day) not in existing:
+                    existing.add((dog_id, day))
+                    to_create.append(DailyDogAssignment(
+                        dog_id=dog_id, staff_member=house, date=day,
+                        status='ASSIGNED', from_boarding=True,
+                    ))
+
+    # Only entries whose weekday is still one of the dog's daycare days.
+    roster_by_weekday = defaultdict(list)
+    scheduled = DogScheduleDay.objects.filter(dog_id=OuterRef('dog_id'), weekday=OuterRef('weekday'))
+    for entry in DogWeekdayPickup.objects.select_related('dog').filter(Exists(scheduled)):
+        roster_by_weekday[entry.weekday].append(entry)
+    if roster_by_weekday and open_days:
+        _, cancels_by_date = effective_change_actions(
+            start, end,
+            dog_ids={e.dog_id for entries in roster_by_weekday.values() for e in entries},
+        )
+        for day in open_days:
+            weekday = day.isoweekday()
+            cancelled = cancels_by_date.get(day, set())
+            for entry in roster_by_weekday.get(weekday, []):
+                dog = entry.dog
+                if dog.schedule_type == 'ad_hoc':
+                    continue
+                if (dog.id, day) in existing or dog.id in cancelled:
+                    continue
+                owner_does_both = dog.owner_brings_default and dog.owner_collects_default
+                to_create.append(DailyDogAssignment(
+                    dog=dog,
+                    staff_member_id=entry.staff_member_id,
+                    date=day,
+                    status='UNASSIGNED' if owner_does_both else 'ASSIGNED',
+                    sort_order=entry.sort_order,
+                ))
+
+    if to_create:
+        from .conditional import bump_versions, roster_key
+        from .live import publish_assignments
+        from .sync import record_changes
+        DailyDogAssignment.objects.bulk_create(to_create, ignore_conflicts=True, batch_size=500)
+        refresh_staff_affinity(
+            dog_ids={row.dog_id for row in to_create},
+            weekdays={row.date.isoweekday() for row in to_create},
+        )
+        bump_versions(*{roster_key(row.date) for row in to_create})
+        wanted = {(row.dog_id, row.date) for row in to_create}
+        created = [
+            (pk, day) for pk, dog_id, day in DailyDogAssignment.objects.filter(
+                dog_id__in={dog_id for dog_id, _ in wanted},
+                date__in={day for _, day in wanted},
+            ).values_list('id', 'dog_id', 'date')
+            if (dog_id, day) in wanted
+        ]
+        record_changes(DailyDogAssignment, [pk for pk, _ in created])
+        publish_assignments('assignment', created)
+
+    now = timezone.now()
+    by_version = defaultdict(list)
+    for day, version in versions.items():
+        by_version[version].append(day)
+    for version, version_days in by_version.items():
+        RosterDay.objects.filter(date__in=version_days, version=version).update(materialized_at=now)
     return len(to_create)
+
+
+# =============================================================================
+# STAFF AFFINITY
+# =============================================================================
+#
+# suggested_assignments and auto_assign pick a driver from each dog's history:
+# whoever last had the dog on the same weekday, else whoever has had it most
+# often. Reading that from DailyDogAssignment meant grouping the whole table
+# on every call. DogStaffAffinity keeps the answer per (dog, weekday, staff
+# member) — kept current by the assignment signals in api.models, and by
+# refresh_staff_affinity calls after the bulk writers that skip them — so a
+# suggestion is one indexed read over the day's unassigned dogs.
+
+# Statuses that mean the staff member actually had the dog that day.
+AFFINITY_STATUSES = ('ASSIGNED', 'PICKED_UP', 'DROPPED_OFF')
+
+
+def refresh_staff_affinity(dog_ids=None, weekdays=None, staff_ids=None):
+    """Recompute the DogStaffAffinity rows in scope from DailyDogAssignment.
+
+    Each argument narrows the scope (``None`` means every value); the rows
+    matching all of them are replaced with a fresh aggregate in one query.
+    Call with no arguments to rebuild the whole table.
+    """
+    from django.db import transaction
+    from django.db.models import Count, Max
+    from django.db.models.functions import ExtractIsoWeekDay
+
+    from .models import DailyDogAssignment, DogStaffAffinity
+
+    history = (
+        DailyDogAssignment.objects
+        .filter(status__in=AFFINITY_STATUSES, staff_member__isnull=False)
+        .annotate(weekday=ExtractIsoWeekDay('date'))
+    )
+    stale = DogStaffAffinity.objects.all()
+    if dog_ids is not None:
+        history = history.filter(dog_id__in=dog_ids)
+        stale = stale.filter(dog_id__in=dog_ids)
+    if weekdays is not None:
+        history = history.filter(weekday__in=weekdays)
+        stale = stale.filter(weekday__in=weekdays)
+    if staff_ids is not None:
+        history = history.filter(staff_member_id__in=staff_ids)
+        stale = stale.filter(staff_member_id__in=staff_ids)
+
+    rows = [
+        DogStaffAffinity(
+            dog_id=entry['dog_id'], weekday=entry['weekday'],
+            staff_member_id=entry['staff_member_id'],
+            times=entry['times'], last_date=entry['last_date'],
+        )
+        for entry in (
+            history
+            .values('dog_id', 'weekday', 'staff_member_id')
+            .annotate(times=Count('id'), last_date=Max('date'))
+            .order_by()
+        )
+    ]
+    with transaction.atomic():
+        stale.delete()
+        DogStaffAffinity.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def suggest_staff(dog_ids, weekday):
+    """Pick a staff member for each dog from its DogStaffAffinity rows.
+
+    Returns ``{dog_id: (user, source)}``. ``source`` is ``'same_weekday'``
+    when the pick is whoever most recently had the dog on ``weekday`` (so
+    weekly rosters repeat by default), or ``'frequency'`` when the dog has
+    no history on that weekday and the pick is whoever has had it most often
+    overall. Users who are no longer staff are never suggested. Dogs with no
+    usable history are left out.
+    """
+    from .models import DogStaffAffinity
+
+    same_weekday = {}
+    totals = defaultdict(lambda: defaultdict(lambda: [0, None]))
+    users = {}
+    for row in (
+        DogStaffAffinity.objects
+        .filter(dog_id__in=dog_ids, staff_member__is_staff=True)
+        .select_related('staff_member')
+    ):
+        users[row.staff_member_id] = row.staff_member
+        if row.weekday == weekday:
+            best = same_weekday.get(row.dog_id)
+            if best is None or (row.last_date, row.times) > (best.last_date, best.times):
+                same_weekday[row.dog_id] = row
+        total = totals[row.dog_id][row.staff_member_id]
+        total[0] += row.times
+        if total[1] is None or row.last_date > total[1]:
+            total[1] = row.last_date
+
+    suggestions = {}
+    for dog_id, by_staff in totals.items():
+        if dog_id in same_weekday:
+            suggestions[dog_id] = (same_weekday[dog_id].staff_member, 'same_weekday')
+            continue
+        staff_id = max(by_staff, key=lambda sid: (by_staff[sid][0], by_staff[sid][1], -sid))
+        suggestions[dog_id] = (users[staff_id], 'frequency')
+    return suggestions
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.db.models import Q
 from djoser.serializers import UserCreateSerializer as DjoserUserCreateSerializer
-from .models import Dog, Photo, UserProfile, DateChangeRequest, GroupMedia, MediaReaction, Comment, BoardingRequest, BoardingRequestHistory, DeviceToken, DailyDogAssignment, DogWeekdayPickup, SupportQuery, SupportMessage, ClosureDay, DogNote, StaffAvailability, DayOffRequest, DogProfileChangeRequest, VaccinationRecord, WaitlistEntry, Vehicle, VehicleMaintenanceRecord, VehicleDefect, VehicleDefectImage, VehicleDefectComment, FacilityDefect, FacilityDefectImage, FacilityDefectComment, IntakeRequest, IntakeDog, Invoice, InvoiceLine, PaymentRecord, Incident, IncidentDog, IncidentMedia, IncidentComment
+from .models import Dog, Photo, UserProfile, DateChangeRequest, GroupMedia, MediaReaction, Comment, BoardingRequest, BoardingRequestHistory, DeviceToken, DailyDogAssignment, DogWeekdayPickup, SupportQuery, SupportMessage, ClosureDay, DogNote, StaffAvailability, DayOffRequest, DogProfileChangeRequest, VaccinationRecord, WaitlistEntry, Vehicle, VehicleMaintenanceRecord, VehicleDefect, VehicleDefectImage, VehicleDefectComment, FacilityDefect, FacilityDefectImage, FacilityDefectComment, IntakeRequest, IntakeDog, Invoice, InvoiceLine, InvoiceSendJob, PaymentRecord, Incident, IncidentDog, IncidentMedia, IncidentComment
 
 
 class RequestPasswordResetSerializer(serializers.Serializer):
@@ -235,15 +235,33 @@ class CommentSerializer(serializers.ModelSerializer):
             return obj.user.first_name
         return obj.user.username
 
+def _media_variants(obj, request):
+    """The responsive renditions of a photo, smallest first, for a client to
+    pick the narrowest one at least as wide as its slot (WebP if it can)."""
+    storage = obj._meta.get_field('file').storage
+    variants = []
+    for v in sorted(obj.variants or [], key=lambda v: (v['width'], v['format'])):
+        url = storage.url(v['name'])
+        variants.append({
+            'width': v['width'],
+            'height': v['height'],
+            'format': v['format'].lower(),
+            'bytes': v['bytes'],
+            'url': request.build_absolute_uri(url) if request else url,
+        })
+    return variants
+
+
 class PhotoSerializer(serializers.ModelSerializer):
     dog_name = serializers.CharField(source='dog.name', read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Photo
-        fields = ['id', 'dog', 'dog_name', 'media_type', 'file', 'thumbnail', 'taken_at', 'created_at', 'comments']
-        read_only_fields = ['created_at']
+        fields = ['id', 'dog', 'dog_name', 'media_type', 'file', 'thumbnail', 'variants', 'processing_state', 'taken_at', 'created_at', 'comments']
+        read_only_fields = ['created_at', 'processing_state']
 
     def validate(self, attrs):
         # `file` is a FileField (it has to accept video), so nothing validates
@@ -257,6 +275,9 @@ class PhotoSerializer(serializers.ModelSerializer):
             validate_media_upload(uploaded, media_type)
         return super().validate(attrs)
 
+    def get_variants(self, obj):
+        return _media_variants(obj, self.context.get('request'))
+
 class DateChangeRequestSerializer(serializers.ModelSerializer):
     dog_name = serializers.CharField(source='dog.name', read_only=True)
     owner_name = serializers.SerializerMethodField()
@@ -303,21 +324,27 @@ class DateChangeRequestSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({'new_date': 'The new date must differ from the original date.'})
         return data
 
+# Comments sent inline with each feed post; the rest are paged from
+# /api/feed/<id>/comments/.
+FEED_COMMENT_PREVIEW = 2
+
+
 class GroupMediaSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.SerializerMethodField()
     uploaded_by_profile_photo = serializers.SerializerMethodField()
     reactions = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     tagged_dogs = serializers.SerializerMethodField()
     tagged_dog_ids = serializers.PrimaryKeyRelatedField(
         queryset=Dog.objects.all(), many=True, required=False, source='tagged_dogs', write_only=True,
     )
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = GroupMedia
-        fields = ['id', 'uploaded_by', 'uploaded_by_name', 'uploaded_by_profile_photo', 'media_type', 'file', 'thumbnail', 'caption', 'tagged_dogs', 'tagged_dog_ids', 'reactions', 'user_reaction', 'comments', 'created_at']
-        read_only_fields = ['uploaded_by', 'created_at']
+        fields = ['id', 'uploaded_by', 'uploaded_by_name', 'uploaded_by_profile_photo', 'media_type', 'file', 'thumbnail', 'variants', 'processing_state', 'caption', 'tagged_dogs', 'tagged_dog_ids', 'reactions', 'user_reaction', 'comments', 'comment_count', 'created_at']
+        read_only_fields = ['uploaded_by', 'created_at', 'processing_state', 'comment_count']
 
     def validate(self, attrs):
         # Same FileField exposure as PhotoSerializer. Staff-only, so lower risk,
@@ -330,6 +357,9 @@ class GroupMediaSerializer(serializers.ModelSerializer):
             validate_media_upload(uploaded, media_type)
         return super().validate(attrs)
 
+    def get_variants(self, obj):
+        return _media_variants(obj, self.context.get('request'))
+
     def get_uploaded_by_name(self, obj):
         if obj.uploaded_by.first_name:
             return obj.uploaded_by.first_name
@@ -347,12 +377,19 @@ class GroupMediaSerializer(serializers.ModelSerializer):
         return None
 
     def get_reactions(self, obj):
-        # Count from the prefetched reactions in Python so a page of items costs
-        # one query for all reactions instead of one COUNT query per item.
-        counts = {}
-        for reaction in obj.reactions.all():
-            counts[reaction.emoji] = counts.get(reaction.emoji, 0) + 1
-        return counts
+        # Maintained on write (see refresh_feed_counters), so no reaction rows
+        # are loaded to render a post however popular it is.
+        return obj.reaction_counts or {}
+
+    def get_comments(self, obj):
+        # The newest few, oldest first. GroupMediaViewSet prefetches them into
+        # `comment_preview`; other callers pay one query.
+        preview = getattr(obj, 'comment_preview', None)
+        if preview is None:
+            preview = list(
+                obj.comments.select_related('user').order_by('-created_at', '-id')[:FEED_COMMENT_PREVIEW]
+            )
+        return CommentSerializer(preview[::-1], many=True, context=self.context).data
 
     def get_user_reaction(self, obj):
         request = self.context.get('request')
@@ -941,8 +978,8 @@ class VehicleMaintenanceRecordSerializer(serializers.ModelSerializer):
 class VehicleDefectImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = VehicleDefectImage
-        fields = ['id', 'image', 'thumbnail', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'image', 'thumbnail', 'processing_state', 'created_at']
+        read_only_fields = ['id', 'created_at', 'processing_state']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -999,8 +1036,8 @@ class VehicleDefectSerializer(serializers.ModelSerializer):
 class FacilityDefectImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = FacilityDefectImage
-        fields = ['id', 'image', 'thumbnail', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'image', 'thumbnail', 'processing_state', 'created_at']
+        read_only_fields = ['id', 'created_at', 'processing_state']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -1222,6 +1259,19 @@ class InvoiceSerializer(serializers.ModelSerializer):
         return data
 
 
+class InvoiceSendJobSerializer(serializers.ModelSerializer):
+    """Progress of a send_all batch, polled by the payments screen."""
+    total = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = InvoiceSendJob
+        fields = [
+            'id', 'period_year', 'period_month', 'status', 'total', 'processed',
+            'sent', 'failed', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
 # =============================================================================
 # INCIDENTS (staff-only)
 # =============================================================================
@@ -1229,7 +1279,7 @@ class InvoiceSerializer(serializers.ModelSerializer):
 class IncidentMediaSerializer(serializers.ModelSerializer):
     class Meta:
         model = IncidentMedia
-        fields = ['id', 'media_type', 'file', 'thumbnail', 'caption', 'created_at']
+        fields = ['id', 'media_type', 'file', 'thumbnail', 'processing_state', 'caption', 'created_at']
         read_only_fields = fields
 
     def to_representation(self, instance):
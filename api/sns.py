@@ -21,7 +21,6 @@ import base64
 import json
 import logging
 import re
-import urllib.request
 from urllib.parse import urlparse
 
 from cryptography.exceptions import InvalidSignature
@@ -29,6 +28,8 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.x509 import load_pem_x509_certificate
 
+from . import http_client
+
 logger = logging.getLogger(__name__)
 
 # Only certificates served from an AWS SNS host are acceptable.
@@ -61,8 +62,7 @@ def _fetch_certificate(url: str, timeout: int = 10) -> bytes:
     if url in _CERT_CACHE:
         return _CERT_CACHE[url]
 
-    with urllib.request.urlopen(url, timeout=timeout) as resp:  # noqa: S310 - host validated above
-        pem = resp.read()
+    pem = http_client.request('GET', url, timeout=timeout).body  # host validated above
     _CERT_CACHE[url] = pem
     return pem
 
@@ -136,8 +136,8 @@ def confirm_subscription(message: dict, timeout: int = 10) -> bool:
         logger.warning('Refusing to confirm subscription via %s', parsed.hostname)
         return False
 
-    with urllib.request.urlopen(url, timeout=timeout) as resp:  # noqa: S310 - host validated above
-        return 200 <= resp.status < 300
+    resp = http_client.request('GET', url, timeout=timeout)  # host validated above
+    return 200 <= resp.status < 300
 
 
 def parse_message_body(raw: bytes) -> dict:
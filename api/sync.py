@@ -0,0 +1,195 @@
+"""Delta sync — "everything that changed since token X" for the mobile app.
+
+The app kept its dogs, assignments, notes, boarding requests and date-change
+requests current by re-downloading each full list, so a phone that had been
+offline for an hour pulled every row again to pick up a handful of edits.
+
+Every committed write to those tables now appends a ChangeLogEntry (model,
+object id, upsert/delete) — from the model signals in api.models, and from
+the few bulk writers that skip them. An entry's id is the sync token:
+``/api/sync/?since=<token>`` reads the entries after it, keeps the last op per
+object, and answers with the current rows for the upserts (through each
+resource's own viewset, so visibility and serialization are exactly the
+list endpoint's) and the ids of the deletes, plus the token to send next.
+
+An upsert the caller can no longer see — a co-owner removed from a dog, an
+assignment on a dog that isn't theirs — comes back as a delete: the phone
+drops it either way.
+
+Entries are written inside the writer's transaction, so they commit (or roll
+back) with the change they describe. Their ids are allocated at insert time,
+not commit time, though: a writer can still be in flight with a lower id
+than one already visible. A client synced past that higher id would never
+see the lower one, so ``changes_since`` stops short of the first missing id
+whose writer may still commit (see ``_open_since``), and picks up from there
+on the next sync.
+
+``manage.py prune_change_log`` trims old entries; a token from before the
+oldest one left gets ``reset: true``, meaning "refetch the lists and carry
+on from this token".
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+# Entries read per request; a longer backlog is paged with ``has_more``.
+BATCH_SIZE = 500
+
+# Slack for the app servers' clocks (which stamp created_at) against the
+# database's (which stamps transaction starts).
+CLOCK_SKEW = timedelta(seconds=5)
+
+
+def _resources():
+    """``{resource: (model label, viewset)}``. Staff-only viewsets are skipped
+    for everyone else by their permission classes."""
+    from .views import (
+        BoardingRequestViewSet, DailyDogAssignmentViewSet, DateChangeRequestViewSet,
+        DogNoteViewSet, DogViewSet,
+    )
+    return {
+        'dogs': ('api.dog', DogViewSet),
+        'assignments': ('api.dailydogassignment', DailyDogAssignmentViewSet),
+        'notes': ('api.dognote', DogNoteViewSet),
+        'boarding_requests': ('api.boardingrequest', BoardingRequestViewSet),
+        'date_change_requests': ('api.datechangerequest', DateChangeRequestViewSet),
+    }
+
+
+def record_changes(model, ids, op='upsert'):
+    """Log ``op`` for the ``model`` rows ``ids`` in the current transaction,
+    so the entries commit or roll back with the write."""
+    from .models import ChangeLogEntry
+
+    ids = sorted({pk for pk in ids if pk is not None})
+    if not ids:
+        return
+    label = model._meta.label_lower
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=label, object_id=pk, op=op) for pk in ids
+    ])
+
+
+def current_token():
+    from .models import ChangeLogEntry
+    return ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _viewset(viewset_class, request):
+    view = viewset_class(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+    view.headers = {}
+    if not all(permission.has_permission(request, view) for permission in view.get_permissions()):
+        return None
+    return view
+
+
+def _open_since():
+    """When the oldest transaction that may still commit change-log entries
+    began, or None when none can be in flight.
+
+    A missing id was allocated by a writer that has either rolled back or not
+    committed yet; either way that writer started before the entry after the
+    gap was created. So once every open writing transaction began after that
+    entry, the gap is a rollback and can be stepped over. Read before the
+    entries themselves: a writer that commits in between is then either
+    visible or still counted here.
+
+    SQLite runs one writer at a time, so an uncommitted id never sits below
+    a visible one there.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(min(xact_start), clock_timestamp()) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_xid IS NOT NULL "
+            "AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def _settled(pk, token, created_at, open_since):
+    """Whether entry ``pk`` can be served after ``token``: either nothing is
+    missing between them, or whatever is missing has rolled back."""
+    return pk == token + 1 or open_since is None or created_at < open_since - CLOCK_SKEW
+
+
+def _safe_token(open_since):
+    """The highest token below which no open writer can still commit: the
+    token a reset hands out, since the lists the app refetches can't include
+    a write that hasn't committed."""
+    from .models import ChangeLogEntry
+
+    latest = current_token()
+    if open_since is None:
+        return latest
+    # Only entries created since the oldest open writer began can sit above
+    # one of its ids; step through them up to the first unsettled gap.
+    recent = list(
+        ChangeLogEntry.objects.filter(created_at__gte=open_since - CLOCK_SKEW)
+        .order_by('id').values_list('id', 'created_at')
+    )
+    if not recent:
+        return latest
+    token = (
+        ChangeLogEntry.objects.filter(id__lt=recent[0][0])
+        .order_by('-id').values_list('id', flat=True).first()
+    )
+    if token is None:
+        token = recent[0][0] - 1
+    for pk, created_at in recent:
+        if not _settled(pk, token, created_at, open_since):
+            break
+        token = pk
+    return token
+
+
+def changes_since(request, since):
+    """The sync response for ``request.user`` from token ``since`` (None for a
+    first sync)."""
+    from .models import ChangeLogEntry
+
+    open_since = _open_since()
+    latest = current_token()
+    oldest = ChangeLogEntry.objects.order_by('id').values_list('id', flat=True).first()
+    if since is None or since > latest or (oldest is not None and since < oldest - 1):
+        return {'token': _safe_token(open_since), 'has_more': False, 'reset': True, 'changes': {}}
+
+    views = {}
+    for resource, (label, viewset_class) in _resources().items():
+        view = _viewset(viewset_class, request)
+        if view is not None:
+            views[label] = (resource, view)
+
+    rows = list(
+        ChangeLogEntry.objects.filter(id__gt=since)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'op', 'created_at')[:BATCH_SIZE + 1]
+    )
+    # Every resource's entries are walked, so the token moves past the ones
+    # this caller can't see too — but never past a gap that may yet fill.
+    token = since
+    last_op = {}
+    for pk, label, object_id, op, created_at in rows[:BATCH_SIZE]:
+        if not _settled(pk, token, created_at, open_since):
+            break
+        token = pk
+        if label in views:
+            last_op[(label, object_id)] = op
+    has_more = len(rows) > BATCH_SIZE and token == rows[BATCH_SIZE - 1][0]
+
+    changes = {}
+    for label, (resource, view) in views.items():
+        upserts = sorted(pk for (lbl, pk), op in last_op.items() if lbl == label and op == 'upsert')
+        deletes = {pk for (lbl, pk), op in last_op.items() if lbl == label and op == 'delete'}
+        rows = []
+        if upserts:
+            rows = list(view.get_queryset().filter(pk__in=upserts))
+            deletes.update(set(upserts) - {row.pk for row in rows})
+        if rows or deletes:
+            changes[resource] = {
+                'upserts': view.get_serializer(rows, many=True).data,
+                'deletes': sorted(deletes),
+            }
+    return {'token': token, 'has_more': has_more, 'reset': False, 'changes': changes}
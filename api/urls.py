@@ -13,7 +13,8 @@ from .views import (
     xero_status, xero_connect, xero_callback, xero_disconnect,
     billing_settings, customer_rates,
     xero_contact_matches, xero_pin_contact, xero_contact_search,
-    roadworks_for_date, street_manager_webhook,
+    roadworks_for_date, street_manager_webhook, staff_dashboard, badges, sync_changes,
+    day_board_events, capacity_heatmap,
 )
 
 router = DefaultRouter()
@@ -60,6 +61,11 @@ urlpatterns = [
     path('password/change/', change_password, name='password-change'),
     path('account/delete/', delete_account, name='account-delete'),
     path('postcode/lookup/', postcode_lookup, name='postcode-lookup'),
+    path('badges/', badges, name='badges'),
+    path('dashboard/', staff_dashboard, name='staff-dashboard'),
+    path('capacity/heatmap/', capacity_heatmap, name='capacity-heatmap'),
+    path('sync/', sync_changes, name='sync'),
+    path('live/day-board/', day_board_events, name='live-day-board'),
     path('roadworks/', roadworks_for_date, name='roadworks'),
     # Public by necessity: AWS SNS posts here. Trust comes from the message
     # signature, not from authentication — see api/sns.py.
@@ -8,9 +8,9 @@ from django.core.mail import send_mail, EmailMessage
 from django.conf import settings
 from django.db.models import Prefetch, Sum
 from decimal import Decimal
-from .pagination import FeedPagination, OptInPagination
+from .pagination import CommentCursorPagination, FeedPagination, GalleryCursorPagination, OptInPagination
 from .models import Dog, Photo, UserProfile, DateChangeRequest, DateChangeRequestHistory, GroupMedia, MediaReaction, Comment, BoardingRequest, BoardingRequestHistory, DeviceToken, DailyDogAssignment, DogWeekdayPickup, PasswordResetOTP, DogProfileChangeRequest, IntakeRequest
-from .serializers import DogSerializer, PhotoSerializer, UserProfileSerializer, DateChangeRequestSerializer, GroupMediaSerializer, OwnerDetailSerializer, CommentSerializer, BoardingRequestSerializer, DeviceTokenSerializer, DailyDogAssignmentSerializer, DogWeekdayPickupSerializer, RequestPasswordResetSerializer, VerifyOTPSerializer, ResetPasswordSerializer, ChangePasswordSerializer, ContactInquirySerializer, PublicContactInquirySerializer, DogProfileChangeRequestSerializer, IntakeRequestSerializer
+from .serializers import DogSerializer, PhotoSerializer, UserProfileSerializer, DateChangeRequestSerializer, GroupMediaSerializer, OwnerDetailSerializer, CommentSerializer, BoardingRequestSerializer, DeviceTokenSerializer, DailyDogAssignmentSerializer, DogWeekdayPickupSerializer, RequestPasswordResetSerializer, VerifyOTPSerializer, ResetPasswordSerializer, ChangePasswordSerializer, ContactInquirySerializer, PublicContactInquirySerializer, DogProfileChangeRequestSerializer, IntakeRequestSerializer, FEED_COMMENT_PREVIEW
 from website.models import ContactInquiry
 
 import logging
@@ -163,13 +163,40 @@ class ImageProcessingError(DRFValidationError):
         super().__init__({'file': ["That file couldn't be read as an image."]})
 
 
-def _decode_upload(image_file):
-    """Open an upload as a Pillow image, oriented per its EXIF data."""
+def _fitted_size(size, box):
+    """``size`` scaled down to fit inside ``box``, keeping the aspect ratio
+    (rounded as Image.thumbnail rounds). Never scales up."""
+    ratio = max(size[0] / box[0], size[1] / box[1])
+    if ratio <= 1:
+        return size
+    return max(1, round(size[0] / ratio)), max(1, round(size[1] / ratio))
+
+
+def _decode_upload(image_file, max_size=None):
+    """Open an upload as a Pillow image, oriented per its EXIF data.
+
+    With ``max_size`` (the largest output wanted), the decode itself is cut
+    down: a JPEG is decoded in draft mode at the smallest DCT scale (1/2,
+    1/4, 1/8) that still covers the fitted output, and anything else is
+    box-reduced by the largest whole factor that does. A 48 MP phone photo
+    headed for 1280px never exists at full size in memory.
+    """
     from PIL import ImageOps
     try:
         image_file.seek(0)
         img = Image.open(image_file)
-        img = ImageOps.exif_transpose(img)
+        if max_size is not None:
+            box = max_size
+            if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                box = box[::-1]  # rotated a quarter turn once transposed
+            if img.format == 'JPEG':
+                img.draft(None, _fitted_size(img.size, box))
+        img = ImageOps.exif_transpose(img, in_place=True) or img
+        if max_size is not None:
+            target = _fitted_size(img.size, max_size)
+            factor = min(img.width // target[0], img.height // target[1])
+            if factor >= 2:
+                img = img.reduce(factor)
         # JPEG can only encode RGB/L/CMYK, so normalise everything else —
         # palette, transparency, 16-bit greyscale — rather than letting save()
         # fail later and fall back to storing the raw upload.
@@ -180,17 +207,27 @@ def _decode_upload(image_file):
         raise ImageProcessingError(str(exc)) from exc
 
 
-def _encode_jpeg(img, size, quality, name):
-    im = img.copy()
-    if im.width > size[0] or im.height > size[1]:
-        im.thumbnail(size, Image.Resampling.LANCZOS)
+def _resized(img, box):
+    """``img`` fitted inside ``box`` — the image itself if it already fits,
+    so no full-size copy is ever made just to be resized."""
+    size = _fitted_size(img.size, box)
+    if size == img.size:
+        return img
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+def _encode_image(img, quality, name, image_format='JPEG'):
     out = io.BytesIO()
     try:
-        im.save(out, format='JPEG', quality=quality, optimize=True)
+        if image_format == 'WEBP':
+            img.save(out, format='WEBP', quality=quality, method=4)
+        else:
+            img.save(out, format='JPEG', quality=quality, optimize=True)
     except Exception as exc:
         raise ImageProcessingError(str(exc)) from exc
-    out.seek(0)
-    return ContentFile(out.read(), name=name)
+    file = ContentFile(out.getvalue(), name=name)
+    file.width, file.height = img.size
+    return file
 
 
 def process_image(image_file, max_size=(1280, 1280), quality=85):
@@ -198,12 +235,12 @@ def process_image(image_file, max_size=(1280, 1280), quality=85):
 
     Raises ImageProcessingError if the upload isn't a decodable image.
     """
-    img = _decode_upload(image_file)
+    img = _decode_upload(image_file, max_size)
     # Random filename so stored media URLs aren't guessable from the original
     # name (partial mitigation for I3 — full auth-gating is a separate
     # coordinated change). Applied on every path, so a file can never reach
     # disk under its uploaded name.
-    return _encode_jpeg(img, max_size, quality, f'{uuid.uuid4().hex}.jpg')
+    return _encode_image(_resized(img, max_size), quality, f'{uuid.uuid4().hex}.jpg')
 
 
 def process_image_pair(image_file, main_size=(1280, 1280), thumb_size=(400, 400), main_quality=85, thumb_quality=70):
@@ -212,84 +249,167 @@ def process_image_pair(image_file, main_size=(1280, 1280), thumb_size=(400, 400)
     Avoids decoding the original a second time just to build the thumbnail (B31).
     Raises ImageProcessingError if the upload isn't a decodable image.
     """
-    img = _decode_upload(image_file)
-    base_name = uuid.uuid4().hex
-    return (
-        _encode_jpeg(img, main_size, main_quality, f'{base_name}.jpg'),
-        _encode_jpeg(img, thumb_size, thumb_quality, f'{base_name}_thumb.jpg'),
+    main, thumbnail, _ = process_image_variants(
+        image_file, main_size, thumb_size, main_quality, thumb_quality, widths=(),
     )
+    return main, thumbnail
+
+
+# Responsive renditions of feed, gallery and incident photos, so a client can
+# fetch the smallest one that fills its slot — a feed card is ~360px wide but
+# used to download the 1280px main image. Each width (capped at the main
+# image's own) comes as WebP, which is much smaller, and JPEG as the fallback;
+# the JPEG at the main image's width is the main image itself.
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_FORMATS = (('WEBP', 'webp', 80), ('JPEG', 'jpg', 82))
+
+
+def process_image_variants(image_file, main_size=(1280, 1280), thumb_size=(400, 400), main_quality=85,
+                           thumb_quality=70, widths=IMAGE_VARIANT_WIDTHS):
+    """Decode an image once and return ``(main, thumbnail, variants)``.
+
+    ``variants`` is a list of ``(image_format, file)`` pairs, one per
+    IMAGE_VARIANT_FORMATS entry for each of ``widths``, with ``file`` None for
+    the one that is ``main``. Every ContentFile carries ``width``/``height``.
+    Raises ImageProcessingError if the upload isn't a decodable image.
+
+    Only the main image is resized from the (draft-decoded) original; the
+    thumbnail and each variant are chained down from the next size up, so
+    every resize after the first works on at most 1280px.
+    """
+    base_name = uuid.uuid4().hex
+    main_img = _resized(_decode_upload(image_file, main_size), main_size)
+    main = _encode_image(main_img, main_quality, f'{base_name}.jpg')
+    thumbnail = _encode_image(_resized(main_img, thumb_size), thumb_quality, f'{base_name}_thumb.jpg')
+
+    variants = []
+    source = main_img
+    for width in sorted({min(w, main.width) for w in widths} | {main.width} if widths else (), reverse=True):
+        source = _resized(source, (width, source.height))
+        for image_format, ext, quality in IMAGE_VARIANT_FORMATS:
+            if image_format == 'JPEG' and width == main.width:
+                variants.append((image_format, None))
+                continue
+            variants.append((image_format, _encode_image(
+                source, quality, f'{base_name}_{width}.{ext}', image_format,
+            )))
+    variants.reverse()
+    return main, thumbnail, variants
+
+
+def _validated_defect_images(request):
+    """The request's ``images`` uploads after the cheap checks for a defect
+    photo, which is stored raw for the media worker — so, unlike when it was
+    resized inline, nothing else would stop a non-image reaching disk. Every
+    file is checked before any is stored, so a bad one fails the request with
+    nothing written."""
+    from django.core.exceptions import ValidationError as DjangoValidationError
+    from .validators import validate_media_upload
+    images = request.FILES.getlist('images')
+    for upload in images:
+        try:
+            validate_media_upload(upload, 'PHOTO')
+        except DjangoValidationError as exc:
+            raise DRFValidationError({'images': exc.messages})
+    return images
+
+
+# Everything ffmpeg needs for the first keyframe: '-ss' before '-i' is an
+# input seek, which lands on a keyframe without decoding from the start, and
+# '-skip_frame nokey' stops it decoding anything else. The scaled JPEG comes
+# back on stdout, so no output file is written either.
+FFMPEG_THUMBNAIL_ARGS = [
+    '-v', 'error',
+    '-ss', '0', '-noaccurate_seek',
+    '-skip_frame', 'nokey',
+]
+FFMPEG_THUMBNAIL_OUTPUT_ARGS = [
+    '-frames:v', '1',
+    # Max 400px wide, keeping the aspect ratio; -2 keeps the height even
+    # (required by many codecs).
+    '-vf', 'scale=400:-2',
+    '-f', 'image2pipe', '-vcodec', 'mjpeg',
+    'pipe:1',
+]
+
+
+def _video_path(file_obj):
+    """A path ffmpeg can read the video from directly, or None.
+
+    Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE (any real phone video) are
+    TemporaryUploadedFiles already on disk, and the media worker passes the
+    stored file's path, so copying the video is only needed for small
+    in-memory uploads.
+    """
+    if isinstance(file_obj, (str, os.PathLike)):
+        return os.fspath(file_obj)
+    if hasattr(file_obj, 'temporary_file_path'):
+        return file_obj.temporary_file_path()
+    name = getattr(getattr(file_obj, 'file', file_obj), 'name', None)
+    if isinstance(name, str) and os.path.isabs(name) and os.path.isfile(name):
+        return name
+    return None
 
 
 def generate_video_thumbnail(file_obj):
-    """Generate a thumbnail image from a video file.
+    """Generate a thumbnail image from a video file (an upload, an open file
+    or a path).
+
+    Grabs the first keyframe with FFmpeg, scaled to max 400px wide, and returns
+    a ContentFile ready to be saved to an ImageField. Returns None on any
+    failure so uploads are never blocked by thumbnail issues.
 
-    Extracts the first frame using FFmpeg, scales it to max 400px wide while
-    keeping the original aspect ratio, and returns a ContentFile ready to be
-    saved to an ImageField.  Returns None on any failure so uploads are never
-    blocked by thumbnail issues.
+    ffmpeg reads the video where it already is on disk. Only a video with no
+    path (a small in-memory upload) is spooled to a temp file, in chunks —
+    not piped to stdin, because a phone MP4 usually has its index at the end
+    and ffmpeg can't seek a pipe to reach it.
 
     IMPORTANT: resets file_obj's read pointer to 0 before returning so that
     Django can still save the original video file afterwards.
     """
+    if not file_obj:
+        return None
+    spooled = None
     try:
-        if not file_obj:
-            return None
-
-        # Determine a proper temp-file suffix from the original filename
-        original_name = getattr(file_obj, 'name', '') or ''
-        ext = os.path.splitext(original_name)[1].lower() or '.mp4'
-
-        # Write the uploaded video to a temp file so FFmpeg can read it
-        if hasattr(file_obj, 'seek'):
-            file_obj.seek(0)
-
-        with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp_video:
-            if hasattr(file_obj, 'read'):
-                tmp_video.write(file_obj.read())
-            else:
-                for chunk in file_obj.chunks():
+        path = _video_path(file_obj)
+        if path is None:
+            ext = os.path.splitext(getattr(file_obj, 'name', '') or '')[1].lower() or '.mp4'
+            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp_video:
+                if hasattr(file_obj, 'seek'):
+                    file_obj.seek(0)
+                chunks = file_obj.chunks() if hasattr(file_obj, 'chunks') else iter(lambda: file_obj.read(64 * 1024), b'')
+                for chunk in chunks:
                     tmp_video.write(chunk)
-            tmp_video_path = tmp_video.name
+                path = spooled = tmp_video.name
 
-        # Reset the file pointer so Django can save the video file later
-        if hasattr(file_obj, 'seek'):
-            file_obj.seek(0)
-
-        thumb_path = tempfile.mktemp(suffix='.jpg')
-        try:
-            # Extract the very first frame (works for any video length)
-            # and scale to max 400px wide, keeping aspect ratio.
-            # -2 ensures the height is divisible by 2 (required by many codecs).
-            result = subprocess.run([
-                'ffmpeg',
-                '-i', tmp_video_path,
-                '-vframes', '1',
-                '-vf', 'scale=400:-2',
-                '-y',
-                thumb_path,
-            ], capture_output=True, timeout=30, text=True)
-
-            if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 0:
-                with open(thumb_path, 'rb') as f:
-                    return ContentFile(f.read(), name='thumbnail.jpg')
-            else:
-                print(f"FFmpeg failed to generate thumbnail (rc={result.returncode})")
-                if result.stderr:
-                    print(f"FFmpeg stderr: {result.stderr[:500]}")
-                return None
-        finally:
-            for p in (tmp_video_path, thumb_path):
-                try:
-                    if os.path.exists(p):
-                        os.unlink(p)
-                except OSError:
-                    pass
+        result = subprocess.run(
+            ['ffmpeg', *FFMPEG_THUMBNAIL_ARGS, '-i', path, *FFMPEG_THUMBNAIL_OUTPUT_ARGS],
+            capture_output=True, timeout=30,
+        )
+        if result.returncode == 0 and result.stdout:
+            return ContentFile(result.stdout, name='thumbnail.jpg')
+        logger.warning(
+            'FFmpeg failed to generate a thumbnail (rc=%s): %s',
+            result.returncode, result.stderr[:500].decode('utf-8', 'replace'),
+        )
+        return None
     except FileNotFoundError:
-        print("FFmpeg not found – install it to enable video thumbnails: sudo apt-get install ffmpeg")
+        logger.warning('FFmpeg not found – install it to enable video thumbnails: sudo apt-get install ffmpeg')
         return None
     except Exception as e:
-        print(f"Error generating video thumbnail: {e}")
+        logger.warning('Error generating video thumbnail: %s', e)
         return None
+    finally:
+        if spooled is not None:
+            try:
+                os.unlink(spooled)
+            except OSError:
+                pass
+        if hasattr(file_obj, 'seek'):
+            try:
+                file_obj.seek(0)
+            except Exception:
+                pass
 
 
 class UserProfileViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet):
@@ -440,6 +560,13 @@ class DogViewSet(viewsets.ModelViewSet):
             Q(owner=self.request.user) | Q(additional_owners=self.request.user)
         ).distinct()
 
+    def list(self, request, *args, **kwargs):
+        # Polled by both apps: a 304 while no dog (or the people on one) changed.
+        from .conditional import conditional_get
+        return conditional_get(
+            request, ['dogs'], lambda: super(DogViewSet, self).list(request, *args, **kwargs),
+        )
+
     @action(detail=False, methods=['get'])
     def calendar(self, request):
         """Owner self-serve calendar.
@@ -451,11 +578,7 @@ class DogViewSet(viewsets.ModelViewSet):
         requests and waitlist entries. Range defaults to today -> today+60
         and is capped at 92 days.
         """
-        from collections import defaultdict
         from datetime import date as date_cls, timedelta
-        from django.db.models import Q
-        from .models import WaitlistEntry
-        from .scheduling import ScheduleIndex, daterange
 
         today = timezone.localdate()
         try:
@@ -474,14 +597,80 @@ class DogViewSet(viewsets.ModelViewSet):
         if (end - start).days > 92:
             return Response({'detail': 'Date range too large (max 92 days).'}, status=400)
 
+        from .conditional import conditional_get, owner_calendar_key, schedule_stamp
+        return conditional_get(
+            request, [owner_calendar_key(request.user.pk)],
+            lambda: self._owner_calendar(request, start, end),
+            schedule_stamp(start, end),
+        )
+
+    def _owner_calendar(self, request, start, end):
+        # The shared part (closures, capacity, who attends) is built once per
+        # schedule version for every owner; the caller's own part once per
+        # change to their dogs, requests or waitlist entries. Both come from
+        # the cache on a repeat open.
+        from .scheduling import calendar_days
+
+        shared = calendar_days(start, end)
+        mine = self._owner_calendar_overlay(request.user, start, end)
+        attendance = shared['attendance']
+        my_dog_ids = sorted(d['id'] for d in mine['dogs'])
+        name_by_id = {d['id']: d['name'] for d in mine['dogs']}
+
+        days = []
+        for day in shared['days']:
+            iso = day['date']
+            days.append({
+                'date': iso,
+                'dogs': [
+                    {'id': dog_id, 'name': name_by_id[dog_id], 'boarding': attendance[dog_id][iso]}
+                    for dog_id in my_dog_ids
+                    if iso in attendance.get(dog_id, ())
+                ],
+                'closure': day['closure'],
+                'is_full': day['is_full'],
+                'spots_left': day['spots_left'],
+                'capacity': day['capacity'],
+                'pending_requests': mine['pending'].get(iso, []),
+                'waitlist': mine['waitlist'].get(iso, []),
+            })
+
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'dogs': mine['dogs'],
+            'days': days,
+        })
+
+    @staticmethod
+    def _owner_calendar_overlay(user, start, end):
+        """``user``'s dogs, and their pending requests and waitlist entries by
+        ISO date, cached under the user's ``calendar:<id>`` version (bumped by
+        the signals in api.models on any change to them)."""
+        from collections import defaultdict
+        from django.core.cache import cache
+        from django.db.models import Q
+        from .conditional import bump_versions, owner_calendar_key
+        from .models import ChangeVersion, WaitlistEntry
+        from .scheduling import CALENDAR_CACHE_TTL
+
+        versions = ChangeVersion.objects.filter(key=owner_calendar_key(user.pk))
+        version = versions.values_list('version', flat=True).first()
+        if version is None:
+            # Give the owner a version of their own before caching anything, so
+            # an entry can't be keyed on "no version yet" and outlive it.
+            bump_versions(owner_calendar_key(user.pk))
+            version = versions.values_list('version', flat=True).first()
+        key = f'calendar-owner:{user.pk}:{start.isoformat()}:{end.isoformat()}:{version}'
+        overlay = cache.get(key)
+        if overlay is not None:
+            return overlay
+
         my_dogs = list(
-            Dog.objects.filter(Q(owner=request.user) | Q(additional_owners=request.user))
+            Dog.objects.filter(Q(owner=user) | Q(additional_owners=user))
             .distinct().values('id', 'name')
         )
         my_dog_ids = {d['id'] for d in my_dogs}
-        name_by_id = {d['id']: d['name'] for d in my_dogs}
-
-        index = ScheduleIndex(start, end)
 
         pending_by_date = defaultdict(list)
         pending_rows = DateChangeRequest.objects.filter(
@@ -492,45 +681,23 @@ class DogViewSet(viewsets.ModelViewSet):
         for row in pending_rows:
             marker = {'id': row['id'], 'dog_id': row['dog_id'], 'request_type': row['request_type']}
             if row['original_date'] and start <= row['original_date'] <= end:
-                pending_by_date[row['original_date']].append(marker)
+                pending_by_date[row['original_date'].isoformat()].append(marker)
             if row['new_date'] and start <= row['new_date'] <= end and row['new_date'] != row['original_date']:
-                pending_by_date[row['new_date']].append(marker)
+                pending_by_date[row['new_date'].isoformat()].append(marker)
 
         waitlist_by_date = defaultdict(list)
         for entry in WaitlistEntry.objects.filter(dog_id__in=my_dog_ids, date__range=(start, end)):
-            waitlist_by_date[entry.date].append(
+            waitlist_by_date[entry.date.isoformat()].append(
                 {'id': entry.id, 'dog_id': entry.dog_id, 'status': entry.status}
             )
 
-        days = []
-        for day in daterange(start, end):
-            attending = index.attending_dog_ids(day)
-            boarding = index.boarding_dog_ids(day)
-            closure = index.closure(day)
-            info = index.capacity_info(day)
-            days.append({
-                'date': day.isoformat(),
-                'dogs': [
-                    {'id': dog_id, 'name': name_by_id[dog_id], 'boarding': dog_id in boarding}
-                    for dog_id in sorted(my_dog_ids & attending)
-                ],
-                'closure': (
-                    {'closure_type': closure.closure_type, 'reason': closure.reason}
-                    if closure else None
-                ),
-                'is_full': info['is_full'],
-                'spots_left': info['spots_left'],
-                'capacity': info['capacity'],
-                'pending_requests': pending_by_date.get(day, []),
-                'waitlist': waitlist_by_date.get(day, []),
-            })
-
-        return Response({
-            'start': start.isoformat(),
-            'end': end.isoformat(),
+        overlay = {
             'dogs': my_dogs,
-            'days': days,
-        })
+            'pending': dict(pending_by_date),
+            'waitlist': dict(waitlist_by_date),
+        }
+        cache.set(key, overlay, CALENDAR_CACHE_TTL)
+        return overlay
 
     @action(detail=True, methods=['get'], url_path='past-attendance')
     def past_attendance(self, request, pk=None):
@@ -798,9 +965,11 @@ class DogViewSet(viewsets.ModelViewSet):
         dog_id = dog.id
 
         # Delete associated media files from storage
+        from .media_processing import delete_variant_files
         if dog.profile_image:
             dog.profile_image.delete(save=False)
         for photo in dog.photos.all():
+            delete_variant_files(photo)
             if photo.file:
                 photo.file.delete(save=False)
             if photo.thumbnail:
@@ -906,6 +1075,10 @@ class DogProfileChangeRequestViewSet(viewsets.ReadOnlyModelViewSet):
         # was never allowed to edit, e.g. owner (B19).
         for field, value in change_request.proposed_changes.items():
             if field in OWNER_EDITABLE_DOG_FIELDS and hasattr(dog, field):
+                if field == 'daycare_days':
+                    # Proposals are stored as sent; normalise the way a direct
+                    # edit would, so DogScheduleDay sees the same weekdays.
+                    value = DogSerializer().validate_daycare_days(value)
                 setattr(dog, field, value)
 
         # Apply image changes
@@ -1017,8 +1190,8 @@ class DogProfileChangeRequestViewSet(viewsets.ReadOnlyModelViewSet):
         """Return the number of pending change requests (staff only)."""
         if not request.user.is_staff:
             return Response({'count': 0})
-        count = DogProfileChangeRequest.objects.filter(status='PENDING').count()
-        return Response({'count': count})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['pending_profile_changes']})
 
 
 class PhotoViewSet(viewsets.ModelViewSet):
@@ -1042,22 +1215,12 @@ class PhotoViewSet(viewsets.ModelViewSet):
             "You can only upload photos for your own dogs",
         )
 
-        # Generate thumbnail and resize for photos
-        media_type = serializer.validated_data.get('media_type', 'PHOTO')
-        if media_type == 'VIDEO':
-            thumb = generate_video_thumbnail(serializer.validated_data.get('file'))
-            if thumb:
-                serializer.validated_data['thumbnail'] = thumb
-        elif media_type == 'PHOTO':
-            image_file = serializer.validated_data.get('file')
-            if image_file:
-                # Decode once, derive both the resized photo and its thumbnail (B31)
-                processed_image, thumbnail = process_image_pair(image_file)
-                serializer.validated_data['file'] = processed_image
-                if thumbnail:
-                    serializer.validated_data['thumbnail'] = thumbnail
-
-        instance = serializer.save()
+        # Stored raw (the serializer has already validated it); the media
+        # worker resizes it and builds the thumbnail — see api.media_processing.
+        from .media_processing import store_raw
+        data = serializer.validated_data
+        data['file'] = store_raw(data['file'], data.get('media_type', 'PHOTO'))
+        instance = serializer.save(processing_state='PENDING')
         self._notify_owners_of_new_photo(instance)
 
     def perform_update(self, serializer):
@@ -1077,6 +1240,8 @@ class PhotoViewSet(viewsets.ModelViewSet):
         # single photo did not, so its image and thumbnail stayed on disk
         # forever — and prune_feed_media --include-orphans only ever scans
         # group_media/, never dog_photos/.
+        from .media_processing import delete_variant_files
+        delete_variant_files(instance)
         if instance.file:
             instance.file.delete(save=False)
         if instance.thumbnail:
@@ -1138,7 +1303,12 @@ class PhotoViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def by_dog(self, request):
-        """Get all photos for a specific dog: /photos/by_dog/?dog_id=<id>"""
+        """Get all photos for a specific dog: /photos/by_dog/?dog_id=<id>
+
+        Add ``&cursor=`` (empty for the first page) to page through the
+        gallery newest-first with keyset pagination instead of fetching all
+        of it; without it the bare list is returned, as older clients expect.
+        """
         dog_id = request.query_params.get('dog_id')
         if not dog_id:
             return Response({'detail': 'dog_id query parameter required'}, status=400)
@@ -1153,7 +1323,11 @@ class PhotoViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("You can only view photos for your own dogs")
         
-        photos = Photo.objects.filter(dog=dog).order_by('-created_at')
+        photos = Photo.objects.filter(dog=dog).prefetch_related('comments__user').order_by('-created_at', '-id')
+        if 'cursor' in request.query_params:
+            paginator = GalleryCursorPagination()
+            page = paginator.paginate_queryset(photos, request, view=self)
+            return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(photos, many=True)
         return Response(serializer.data)
 
@@ -1465,6 +1639,16 @@ class DateChangeRequestViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+
+def _media_today_stats():
+    """Photos and videos posted to the feed today, in one query."""
+    from django.db.models import Count, Q
+    return GroupMedia.objects.filter(created_at__date=timezone.localdate()).aggregate(
+        photos=Count('id', filter=Q(media_type='PHOTO')),
+        videos=Count('id', filter=Q(media_type='VIDEO')),
+    )
+
+
 class GroupMediaViewSet(viewsets.ModelViewSet):
     serializer_class = GroupMediaSerializer
     permission_classes = [IsAuthenticated]
@@ -1473,7 +1657,10 @@ class GroupMediaViewSet(viewsets.ModelViewSet):
     def _feed_queryset(self):
         # Prefetch every relation the serializer touches so rendering a page of
         # feed items stays at a small, constant number of queries instead of
-        # N+1 (uploader profile, comments + their authors, reactions, tags).
+        # N+1 (uploader profile, comment preview + authors, tags). Reaction
+        # and comment totals are columns on the post, so only the newest
+        # FEED_COMMENT_PREVIEW comments per post are loaded (one windowed
+        # query for the page) and no other reactions at all.
         # The current user's own reactions are prefetched into a separate
         # attribute so get_user_reaction() needs no extra per-item query.
         # No request-param filtering here, so it is safe to re-fetch a single
@@ -1483,15 +1670,29 @@ class GroupMediaViewSet(viewsets.ModelViewSet):
             queryset=MediaReaction.objects.filter(user=self.request.user),
             to_attr='my_reactions',
         )
+        comment_preview = Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('user').order_by('-created_at', '-id')[:FEED_COMMENT_PREVIEW],
+            to_attr='comment_preview',
+        )
         return (
             GroupMedia.objects
             .select_related('uploaded_by', 'uploaded_by__profile')
-            .prefetch_related('tagged_dogs', 'comments__user', 'reactions', user_reactions)
+            .prefetch_related('tagged_dogs', comment_preview, user_reactions)
             # Deterministic tie-breaker so paging can't drop or duplicate rows
             # when several items share a created_at second (B30).
             .order_by('-created_at', '-id')
         )
 
+    def list(self, request, *args, **kwargs):
+        # The feed is re-polled constantly; a 304 while no post, comment,
+        # reaction, tag or dog changed (see api.conditional).
+        from .conditional import conditional_get
+        return conditional_get(
+            request, ['feed', 'dogs'],
+            lambda: super(GroupMediaViewSet, self).list(request, *args, **kwargs),
+        )
+
     def get_queryset(self):
         qs = self._feed_queryset()
         dog_id = self.request.query_params.get('dog_id')
@@ -1508,22 +1709,11 @@ class GroupMediaViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         try:
             print(f"Creating GroupMedia for user: {self.request.user}")
-            # Generate thumbnail and resize for photos
-            media_type = serializer.validated_data.get('media_type', 'PHOTO')
-            if media_type == 'VIDEO':
-                thumb = generate_video_thumbnail(serializer.validated_data.get('file'))
-                if thumb:
-                    serializer.validated_data['thumbnail'] = thumb
-            elif media_type == 'PHOTO':
-                image_file = serializer.validated_data.get('file')
-                if image_file:
-                    # Decode once, derive both the resized photo and its thumbnail (B31)
-                    processed_image, thumbnail = process_image_pair(image_file)
-                    serializer.validated_data['file'] = processed_image
-                    if thumbnail:
-                        serializer.validated_data['thumbnail'] = thumbnail
-
-            instance = serializer.save(uploaded_by=self.request.user)
+            # Stored raw; the media worker resizes and thumbnails it.
+            from .media_processing import store_raw
+            data = serializer.validated_data
+            data['file'] = store_raw(data['file'], data.get('media_type', 'PHOTO'))
+            instance = serializer.save(uploaded_by=self.request.user, processing_state='PENDING')
 
         except Exception as e:
             import traceback
@@ -1592,15 +1782,20 @@ class GroupMediaViewSet(viewsets.ModelViewSet):
         media = self._feed_queryset().get(pk=media.pk)
         return Response(self.get_serializer(media).data)
 
+    @action(detail=True, methods=['get'], url_path='comments')
+    def comments(self, request, pk=None):
+        """All of a post's comments, oldest first, cursor-paged — the feed
+        itself only carries the newest few."""
+        media = self.get_object()
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(
+            Comment.objects.filter(group_media=media).select_related('user'), request, view=self,
+        )
+        return paginator.get_paginated_response(CommentSerializer(page, many=True).data)
+
     @action(detail=False, methods=['get'])
     def today_stats(self, request):
-        from django.utils import timezone
-        today = timezone.localdate()
-        qs = GroupMedia.objects.filter(created_at__date=today)
-        return Response({
-            'photos': qs.filter(media_type='PHOTO').count(),
-            'videos': qs.filter(media_type='VIDEO').count(),
-        })
+        return Response(_media_today_stats())
 
 class CommentViewSet(viewsets.GenericViewSet, mixins.DestroyModelMixin):
     queryset = Comment.objects.all()
@@ -1704,7 +1899,7 @@ class BoardingRequestViewSet(viewsets.ModelViewSet):
                 # Dogs taken off the booking are cleared over the whole old
                 # range; the remaining dogs only lose the days that went away.
                 # (A dog dropped from one stay but still covered by another is
-                # re-booked by materialize_boarding_for_date on the next load.)
+                # re-booked by materialize_roster on the next load.)
                 removed_dogs = old_dog_ids - set(instance.dogs.values_list('id', flat=True))
                 if removed_dogs:
                     from .models import DailyDogAssignment
@@ -1920,6 +2115,22 @@ class BoardingRequestViewSet(viewsets.ModelViewSet):
         return Response(self.get_serializer(instance).data)
 
 
+def _staff_member_choices():
+    """Every staff member, for the assignment dropdowns."""
+    staff = User.objects.filter(is_staff=True).values(
+        'id', 'username', 'first_name', 'profile__staff_color'
+    )
+    return [
+        {
+            'id': s['id'],
+            'username': s['username'],
+            'first_name': s['first_name'],
+            'staff_color': s['profile__staff_color'] or '',
+        }
+        for s in staff
+    ]
+
+
 class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
     serializer_class = DailyDogAssignmentSerializer
     permission_classes = [IsAdminUser]
@@ -1967,26 +2178,34 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         raise PermissionDenied(
             'Only staff who can manage payments can change whether a past day is billed.')
 
+    @staticmethod
+    def _boarding_sets(target_date):
+        """The dogs boarding on ``target_date`` and on the days either side,
+        as the serializer context keys, from one query over the three days."""
+        from datetime import timedelta
+
+        prev_day, next_day = target_date - timedelta(days=1), target_date + timedelta(days=1)
+        sets = {'boarding_dog_ids': set(), 'boarding_prev_dog_ids': set(), 'boarding_next_dog_ids': set()}
+        stays = BoardingRequest.objects.filter(
+            status='APPROVED', start_date__lte=next_day, end_date__gte=prev_day,
+        ).values_list('dogs__id', 'start_date', 'end_date')
+        for dog_id, start, end in stays:
+            for key, day in (
+                ('boarding_prev_dog_ids', prev_day),
+                ('boarding_dog_ids', target_date),
+                ('boarding_next_dog_ids', next_day),
+            ):
+                if start <= day <= end:
+                    sets[key].add(dog_id)
+        return sets
+
     def _boarding_context(self, target_date):
         # Compute the sets of dogs boarding on target_date and its neighbours
         # once, so the serializer answers is_boarding / boarding_first_day /
         # boarding_last_day (and the needs_pickup / needs_dropoff legs derived
         # from them) with set lookups instead of queries per row (B7).
-        from datetime import timedelta
-
-        def boarding_ids(d):
-            return set(
-                BoardingRequest.objects.filter(
-                    status='APPROVED',
-                    start_date__lte=d,
-                    end_date__gte=d,
-                ).values_list('dogs__id', flat=True)
-            )
-
         ctx = self.get_serializer_context()
-        ctx['boarding_dog_ids'] = boarding_ids(target_date)
-        ctx['boarding_prev_dog_ids'] = boarding_ids(target_date - timedelta(days=1))
-        ctx['boarding_next_dog_ids'] = boarding_ids(target_date + timedelta(days=1))
+        ctx.update(self._boarding_sets(target_date))
         return ctx
 
     def perform_create(self, serializer):
@@ -2009,50 +2228,43 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         return timezone.localdate(), None
 
     @staticmethod
-    def _cancelled_dog_ids_for_date(target_date, dog_ids=None):
-        """Dog ids that should be REMOVED from the roster for ``target_date``.
-
-        A dog is cancelled for a date if its most recently approved request
-        for that date is a CANCEL whose original_date matches, or a CHANGE
-        moving *away* from that date — a CHANGE is a cancel of the old date
-        plus an add of the new date. A later approved ADD_DAY/CHANGE-to for
-        the same date supersedes the cancellation (the dog was added back).
+    def _unassigned_dog_ids(target_date, assignments=None):
+        """Ids of dogs attending ``target_date`` that still need a staff
+        member: attendance (the ScheduleIndex rules, read from the persisted
+        snapshot) minus every dog with a row for the day other than
+        UNASSIGNED. REMOVED rows count as taken — staff explicitly cancelled
+        the dog for the day — while UNASSIGNED means "attending, no staff
+        member yet", which is exactly what this is for.
+
+        ``assignments`` may be the day's rows when the caller already has
+        them (the dashboard does), saving the query for the taken ids.
         """
-        from .scheduling import effective_change_actions
-        _, cancels_by_date = effective_change_actions(
-            target_date, target_date, dog_ids=dog_ids,
-        )
-        return cancels_by_date.get(target_date, set())
+        from .scheduling import ScheduleSnapshot
+        attending = ScheduleSnapshot(target_date, target_date).attending_dog_ids(target_date)
+        if not attending:
+            return set()
+        if assignments is None:
+            taken = set(
+                DailyDogAssignment.objects
+                .filter(date=target_date)
+                .exclude(status='UNASSIGNED')
+                .values_list('dog_id', flat=True)
+            )
+        else:
+            taken = {a.dog_id for a in assignments if a.status != 'UNASSIGNED'}
+        return attending - taken
 
     @staticmethod
-    def _added_dogs_for_date(target_date):
-        """Dogs that should be ADDED to the roster for ``target_date``.
-
-        Covers APPROVED ADD_DAY requests (new_date matches) and APPROVED
-        CHANGE requests moving *to* that date — unless a later approved
-        CANCEL/CHANGE-away for the same date supersedes the addition.
-        """
-        from .scheduling import effective_change_actions
-        adds_by_date, _ = effective_change_actions(target_date, target_date)
-        return Dog.objects.filter(id__in=adds_by_date.get(target_date, set()))
-
-    def _materialize_roster_for_date(self, target_date):
+    def _materialize_roster_for_date(target_date):
         """Create any missing DailyDogAssignment rows for ``target_date`` from
         the persistent DogWeekdayPickup roster, plus any dog boarding that day.
 
-        Returns the number of newly created rows. Skips:
-          * CLOSED closure days
-          * ad-hoc dogs (defensive — they should never have roster entries)
-          * dogs whose current ``daycare_days`` no longer include this weekday
-          * dogs with an APPROVED CANCEL DateChangeRequest for this date
-          * dogs that already have a DailyDogAssignment for this date
-          * dogs whose owner handles BOTH legs of transport
-            (owner_brings_default AND owner_collects_default) — no staff route
-            ever touches them. Dogs the owner only brings OR only collects are
-            still materialized, because staff run the other leg.
+        Returns the number of newly created rows. A single EXISTS when the
+        day is already materialized and nothing has invalidated it since —
+        the nightly ``materialize_roster`` run usually gets there first. See
+        ``api.scheduling.materialize_roster`` for what is skipped and why.
         """
-        from .models import ClosureDay
-        from datetime import date as date_cls
+        from .scheduling import materialize_roster, roster_is_materialized
 
         # Never fabricate roster history for past dates. Staff can now scroll
         # back on the dashboard to review earlier days, and those should show
@@ -2060,70 +2272,19 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         # retroactively from the current weekday roster.
         if target_date < timezone.localdate():
             return 0
-
-        if ClosureDay.objects.filter(date=target_date, closure_type='CLOSED').exists():
+        if roster_is_materialized(target_date):
             return 0
-
-        # Dogs boarding today are in daycare today, booked under the house
-        # "P4TD" account (see api.scheduling). Done here as well as at approval
-        # time so stays approved before this existed — and dogs added to a stay
-        # afterwards — still turn up on the day's roster.
-        from .scheduling import materialize_boarding_for_date
-        boarding_created = materialize_boarding_for_date(target_date)
-
-        weekday = target_date.isoweekday()
-
-        roster_entries = list(
-            DogWeekdayPickup.objects
-            .filter(weekday=weekday)
-            .select_related('dog', 'staff_member')
+        return materialize_roster(target_date, target_date)
+
+    def _roster_response(self, request, target_date, render):
+        """``render()`` the day's roster view, or 304 if the client's copy is
+        current: nothing changed in the day's rows, the dogs and people on
+        them, boarding, or the day's attendance (see api.conditional)."""
+        from .conditional import ROSTER_KEYS, conditional_get, roster_key, schedule_stamp
+        return conditional_get(
+            request, [*ROSTER_KEYS, roster_key(target_date)], render,
+            schedule_stamp(target_date, target_date),
         )
-        if not roster_entries:
-            return boarding_created
-
-        existing_dog_ids = set(
-            DailyDogAssignment.objects
-            .filter(date=target_date, dog_id__in=[e.dog_id for e in roster_entries])
-            .values_list('dog_id', flat=True)
-        )
-        cancelled_dog_ids = set(
-            self._cancelled_dog_ids_for_date(
-                target_date,
-                dog_ids=[e.dog_id for e in roster_entries],
-            )
-        )
-
-        to_create = []
-        for entry in roster_entries:
-            dog = entry.dog
-            if dog.schedule_type == 'ad_hoc':
-                continue
-            if weekday not in (dog.daycare_days or []):
-                continue
-            if dog.id in existing_dog_ids or dog.id in cancelled_dog_ids:
-                continue
-            # When the owner handles BOTH legs no staff route touches this dog —
-            # but the dog still *attends*, and attendance is what billing reads
-            # (billing.attendance_for_month counts DailyDogAssignment rows).
-            # Skipping the row entirely meant these dogs were invoiced £0 every
-            # month and had to be added to the roster by hand every week.
-            # Materialise them as UNASSIGNED instead: every roster/van view
-            # already excludes REMOVED and UNASSIGNED, so they stay off the
-            # driver's list while billing and capacity can still see them.
-            owner_does_both = dog.owner_brings_default and dog.owner_collects_default
-            to_create.append(DailyDogAssignment(
-                dog=dog,
-                staff_member=entry.staff_member,
-                date=target_date,
-                status='UNASSIGNED' if owner_does_both else 'ASSIGNED',
-                sort_order=entry.sort_order,
-            ))
-
-        if not to_create:
-            return boarding_created
-
-        DailyDogAssignment.objects.bulk_create(to_create, ignore_conflicts=True)
-        return boarding_created + len(to_create)
 
     @action(detail=False, methods=['get'])
     def today(self, request):
@@ -2132,9 +2293,12 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         if error:
             return error
         self._materialize_roster_for_date(target_date)
-        assignments = self.get_queryset().filter(date=target_date).exclude(status__in=['REMOVED', 'UNASSIGNED'])
-        serializer = self.get_serializer(assignments, many=True, context=self._boarding_context(target_date))
-        return Response(serializer.data)
+
+        def render():
+            assignments = self.get_queryset().filter(date=target_date).exclude(status__in=['REMOVED', 'UNASSIGNED'])
+            serializer = self.get_serializer(assignments, many=True, context=self._boarding_context(target_date))
+            return Response(serializer.data)
+        return self._roster_response(request, target_date, render)
 
     @action(detail=False, methods=['get'])
     def my_assignments(self, request):
@@ -2143,35 +2307,22 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         if error:
             return error
         self._materialize_roster_for_date(target_date)
-        assignments = self.get_queryset().filter(
-            staff_member=request.user, date=target_date
-        ).exclude(status__in=['REMOVED', 'UNASSIGNED'])
-        serializer = self.get_serializer(assignments, many=True, context=self._boarding_context(target_date))
-        return Response(serializer.data)
 
-    @action(detail=False, methods=['get'])
-    def compatibility_conflicts(self, request):
-        """List pairs of incompatible dogs assigned to the same staff member
-        on a given date.
+        def render():
+            assignments = self.get_queryset().filter(
+                staff_member=request.user, date=target_date
+            ).exclude(status__in=['REMOVED', 'UNASSIGNED'])
+            serializer = self.get_serializer(assignments, many=True, context=self._boarding_context(target_date))
+            return Response(serializer.data)
+        return self._roster_response(request, target_date, render)
 
-        A conflict is detected when both dogs share the same ``staff_member``
-        for the date and at least one negative COMPATIBILITY DogNote links
-        them. Accepts optional ?date=YYYY-MM-DD (defaults to today).
-        """
+    @staticmethod
+    def _compatibility_conflicts(assignments):
+        """Conflicting pairs among the day's routed ``assignments`` (rows with
+        ``dog`` and ``staff_member`` selected), sorted by staff then dog name."""
         from django.db.models import Q
         from .models import DogNote
 
-        target_date, error = self._parse_date(request)
-        if error:
-            return error
-        self._materialize_roster_for_date(target_date)
-
-        assignments = (
-            self.get_queryset()
-            .filter(date=target_date)
-            .exclude(status__in=['REMOVED', 'UNASSIGNED'])
-        )
-
         dogs_by_staff = {}
         for a in assignments:
             dogs_by_staff.setdefault(a.staff_member_id, []).append(a)
@@ -2208,6 +2359,28 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
                     })
 
         conflicts.sort(key=lambda c: (c['staff_member_name'].lower(), c['dog_a_name'].lower()))
+        return conflicts
+
+    @action(detail=False, methods=['get'])
+    def compatibility_conflicts(self, request):
+        """List pairs of incompatible dogs assigned to the same staff member
+        on a given date.
+
+        A conflict is detected when both dogs share the same ``staff_member``
+        for the date and at least one negative COMPATIBILITY DogNote links
+        them. Accepts optional ?date=YYYY-MM-DD (defaults to today).
+        """
+        target_date, error = self._parse_date(request)
+        if error:
+            return error
+        self._materialize_roster_for_date(target_date)
+
+        assignments = (
+            self.get_queryset()
+            .filter(date=target_date)
+            .exclude(status__in=['REMOVED', 'UNASSIGNED'])
+        )
+        conflicts = self._compatibility_conflicts(assignments)
         return Response({'date': target_date.isoformat(), 'conflicts': conflicts})
 
     @action(detail=True, methods=['post'])
@@ -2295,64 +2468,25 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         if error:
             return error
 
-        # Return empty list if the business is fully closed on this date
-        from .models import ClosureDay
-        if ClosureDay.objects.filter(date=target_date, closure_type='CLOSED').exists():
-            return Response([])
-
         # Lazily materialize the persistent weekday roster so rostered dogs
         # do not show up as "unassigned".
         self._materialize_roster_for_date(target_date)
 
-        day_number = target_date.isoweekday()  # Monday=1, Sunday=7
-
-        # Dogs with this weekday in their daycare_days
-        daycare_dogs = Dog.objects.filter(daycare_days__contains=[day_number])
-
-        # Dogs with approved boarding that spans the target date
-        boarding_dogs = Dog.objects.filter(
-            boarding_requests__status='APPROVED',
-            boarding_requests__start_date__lte=target_date,
-            boarding_requests__end_date__gte=target_date,
-        )
-
-        # Dogs explicitly added for the target date: approved ADD_DAY requests
-        # (covers ad-hoc dogs) and approved CHANGE requests moving to this date.
-        add_day_dogs = self._added_dogs_for_date(target_date)
-
-        # Dogs removed for the target date: approved CANCEL requests and
-        # approved CHANGE requests moving away from this date.
-        cancelled_dog_ids = self._cancelled_dog_ids_for_date(target_date)
-
-        # Combine daycare + boarding + additional days, exclude cancelled
-        scheduled_dogs = (daycare_dogs | boarding_dogs | add_day_dogs).exclude(
-            id__in=cancelled_dog_ids
-        ).distinct()
-
         # This list means "attending but still needs a driver". A dog whose
         # owner handles both legs by default never does — it is materialized
         # UNASSIGNED purely so billing can see the attendance (see
-        # _materialize_roster_for_date), and surfacing it here would leave a
-        # permanent, un-actionable warning on the dashboard.
-        scheduled_dogs = scheduled_dogs.exclude(
-            owner_brings_default=True, owner_collects_default=True)
-
-        # Exclude dogs that already have an assignment for this date,
-        # including REMOVED (staff explicitly cancelled the dog for this
-        # day) — but NOT UNASSIGNED, which means "attending, no staff member
-        # yet" and is exactly what this list is for.
-        assigned_or_removed_dog_ids = DailyDogAssignment.objects.filter(
-            date=target_date
-        ).exclude(status='UNASSIGNED').values_list('dog_id', flat=True)
-
+        # api.scheduling.materialize_roster), and surfacing it here would
+        # leave a permanent, un-actionable warning on the dashboard.
+        #
         # Reuse the shared prefetch set — building a bespoke queryset here is
         # what made cancelled_dates fall back to a query per dog.
-        unassigned = dog_listing_queryset().filter(
-            id__in=scheduled_dogs.exclude(id__in=assigned_or_removed_dog_ids)
-            .values_list('id', flat=True)
-        )
-        serializer = DogSerializer(unassigned, many=True, context={'request': request})
-        return Response(serializer.data)
+        def render():
+            unassigned = dog_listing_queryset().filter(
+                id__in=self._unassigned_dog_ids(target_date),
+            ).exclude(owner_brings_default=True, owner_collects_default=True)
+            serializer = DogSerializer(unassigned, many=True, context={'request': request})
+            return Response(serializer.data)
+        return self._roster_response(request, target_date, render)
 
     @action(detail=False, methods=['post'])
     def assign_to_me(self, request):
@@ -2653,12 +2787,24 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
                     weekday=weekday,
                     defaults={'staff_member': new_staff, 'created_by': request.user},
                 )
-            DailyDogAssignment.objects.filter(
+            following = DailyDogAssignment.objects.filter(
                 dog=dog,
                 date__gt=assignment.date,
                 date__iso_week_day=weekday,
                 status='ASSIGNED',
-            ).update(staff_member=new_staff)
+            )
+            moved_rows = list(following.values_list('id', 'date'))
+            moved_ids = [pk for pk, _ in moved_rows]
+            moved = following.filter(id__in=moved_ids).update(staff_member=new_staff)
+            if moved:
+                from .conditional import bump_versions
+                from .live import publish_assignments
+                from .scheduling import refresh_staff_affinity
+                from .sync import record_changes
+                refresh_staff_affinity(dog_ids=[dog.id], weekdays=[weekday])
+                bump_versions('roster')
+                record_changes(DailyDogAssignment, moved_ids)
+                publish_assignments('assignment', moved_rows)
 
         return Response(self.get_serializer(assignment).data)
 
@@ -2733,50 +2879,18 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         if error:
             return error
 
-        from django.db.models import Count
-        from django.db.models.functions import ExtractIsoWeekDay
-
-        day_number = target_date.isoweekday()  # Monday=1 … Sunday=7
-
-        # 1) Most recent same-weekday assignment per dog
-        same_weekday_history = (
-            DailyDogAssignment.objects
-            .annotate(weekday=ExtractIsoWeekDay('date'))
-            .filter(weekday=day_number)
-            .exclude(date=target_date)
-            .order_by('dog_id', '-date')
-            .values('dog_id', 'staff_member_id', 'staff_member__username', 'staff_member__first_name')
-        )
+        from .scheduling import suggest_staff
 
+        self._materialize_roster_for_date(target_date)
+        dog_ids = self._unassigned_dog_ids(target_date)
         suggestions = {}
-        for entry in same_weekday_history:
-            dog_id = entry['dog_id']
-            if dog_id not in suggestions:
-                name = entry['staff_member__first_name'] or entry['staff_member__username']
+        if dog_ids:
+            for dog_id, (staff, source) in suggest_staff(dog_ids, target_date.isoweekday()).items():
                 suggestions[dog_id] = {
-                    'staff_member_id': entry['staff_member_id'],
-                    'staff_member_name': name,
-                    'source': 'same_weekday',
+                    'staff_member_id': staff.id,
+                    'staff_member_name': staff.first_name or staff.username,
+                    'source': source,
                 }
-
-        # 2) Fallback: overall most-frequent staff member for remaining dogs
-        fallback_history = (
-            DailyDogAssignment.objects
-            .values('dog_id', 'staff_member_id', 'staff_member__username', 'staff_member__first_name')
-            .annotate(times=Count('id'))
-            .order_by('dog_id', '-times')
-        )
-
-        for entry in fallback_history:
-            dog_id = entry['dog_id']
-            if dog_id not in suggestions:
-                name = entry['staff_member__first_name'] or entry['staff_member__username']
-                suggestions[dog_id] = {
-                    'staff_member_id': entry['staff_member_id'],
-                    'staff_member_name': name,
-                    'source': 'frequency',
-                }
-
         return Response(suggestions)
 
     @action(detail=False, methods=['post'])
@@ -2794,8 +2908,6 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Permission check failed.'}, status=403)
 
         from datetime import date
-        from django.db.models import Count
-        from django.db.models.functions import ExtractIsoWeekDay
 
         date_str = request.data.get('date')
         if date_str:
@@ -2810,84 +2922,79 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
         # needs to fill in dogs that don't already have a default staff member.
         self._materialize_roster_for_date(target_date)
 
-        day_number = target_date.isoweekday()
-
-        # Get unassigned dogs for this date (same logic as unassigned_dogs)
-        daycare_dogs = Dog.objects.filter(daycare_days__contains=[day_number])
-        boarding_dogs = Dog.objects.filter(
-            boarding_requests__status='APPROVED',
-            boarding_requests__start_date__lte=target_date,
-            boarding_requests__end_date__gte=target_date,
-        )
-        add_day_dogs = self._added_dogs_for_date(target_date)
-        cancelled_dog_ids = self._cancelled_dog_ids_for_date(target_date)
-
-        scheduled_dogs = (daycare_dogs | boarding_dogs | add_day_dogs).exclude(
-            id__in=cancelled_dog_ids
-        ).distinct()
-
-        assigned_dog_ids = DailyDogAssignment.objects.filter(
-            date=target_date
-        ).exclude(status='UNASSIGNED').values_list('dog_id', flat=True)
-
-        unassigned = scheduled_dogs.exclude(id__in=assigned_dog_ids)
-
-        # 1) Most recent same-weekday assignment per dog
-        same_weekday_history = (
-            DailyDogAssignment.objects
-            .annotate(weekday=ExtractIsoWeekDay('date'))
-            .filter(weekday=day_number)
-            .exclude(date=target_date)
-            .order_by('dog_id', '-date')
-            .values('dog_id', 'staff_member_id')
-        )
-        best_staff = {}
-        for entry in same_weekday_history:
-            dog_id = entry['dog_id']
-            if dog_id not in best_staff:
-                best_staff[dog_id] = entry['staff_member_id']
-
-        # 2) Fallback: overall most-frequent staff member for remaining dogs
-        fallback_history = (
-            DailyDogAssignment.objects
-            .values('dog_id', 'staff_member_id')
-            .annotate(times=Count('id'))
-            .order_by('dog_id', '-times')
-        )
-        for entry in fallback_history:
-            dog_id = entry['dog_id']
-            if dog_id not in best_staff:
-                best_staff[dog_id] = entry['staff_member_id']
+        # Same set as unassigned_dogs (minus its owner-transport filter).
+        dog_ids = self._unassigned_dog_ids(target_date)
+        if not dog_ids:
+            return Response({'assigned': [], 'skipped_dog_ids': []}, status=201)
+
+        from .scheduling import refresh_staff_affinity, suggest_staff
+        suggestions = suggest_staff(dog_ids, target_date.isoweekday())
+
+        # Any row these dogs already have for the day is UNASSIGNED (the rest
+        # were excluded above) — revive it rather than creating a duplicate.
+        unassigned_rows = {
+            row.dog_id: row
+            for row in DailyDogAssignment.objects
+            .filter(date=target_date, dog_id__in=dog_ids, status='UNASSIGNED')
+            .select_related('dog', 'dog__owner')
+            .prefetch_related('dog__additional_owners')
+        }
 
-        created = []
+        to_create = []
+        revived = []
         skipped = []
-        for dog in unassigned:
-            staff_id = best_staff.get(dog.id)
-            if staff_id:
-                from django.contrib.auth.models import User
-                try:
-                    staff = User.objects.get(id=staff_id, is_staff=True)
-                except User.DoesNotExist:
-                    skipped.append(dog.id)
-                    continue
-                assignment, was_created = DailyDogAssignment.objects.get_or_create(
-                    dog=dog,
-                    date=target_date,
-                    defaults={'staff_member': staff},
-                )
-                if was_created:
-                    created.append(assignment)
-                elif assignment.status == 'UNASSIGNED':
-                    # Dog was unassigned for the day — revive the row rather
-                    # than silently leaving it unassigned.
-                    assignment.status = 'ASSIGNED'
-                    assignment.staff_member = staff
-                    assignment.save(update_fields=['status', 'staff_member', 'updated_at'])
-                    created.append(assignment)
-            else:
-                skipped.append(dog.id)
+        now = timezone.now()
+        for dog_id in sorted(dog_ids):
+            if dog_id not in suggestions:
+                skipped.append(dog_id)
+                continue
+            staff, _ = suggestions[dog_id]
+            row = unassigned_rows.get(dog_id)
+            if row is None:
+                to_create.append(DailyDogAssignment(
+                    dog_id=dog_id, date=target_date, staff_member=staff,
+                ))
+                continue
+            row.status = 'ASSIGNED'
+            row.staff_member = staff
+            row.updated_at = now  # bulk_update skips auto_now
+            revived.append(row)
+
+        if to_create:
+            DailyDogAssignment.objects.bulk_create(to_create, ignore_conflicts=True)
+        if revived:
+            DailyDogAssignment.objects.bulk_update(
+                revived, ['status', 'staff_member', 'updated_at'])
+            # bulk_update skips post_save, which is what tells owners their
+            # dog's status moved. Send it the same way a save() would.
+            from .models import notify_owner_dog_status_change
+            for row in revived:
+                row._old_status = 'UNASSIGNED'
+                notify_owner_dog_status_change(
+                    sender=DailyDogAssignment, instance=row, created=False)
+        if to_create or revived:
+            from .conditional import bump_versions, roster_key
+            from .live import publish_assignments
+            from .sync import record_changes
+            refresh_staff_affinity(
+                dog_ids=[a.dog_id for a in to_create] + [a.dog_id for a in revived],
+                weekdays=[target_date.isoweekday()],
+            )
+            bump_versions(roster_key(target_date))
+            changed_ids = [a.id for a in revived] + list(
+                DailyDogAssignment.objects.filter(
+                    date=target_date, dog_id__in=[a.dog_id for a in to_create],
+                ).values_list('id', flat=True)
+            )
+            record_changes(DailyDogAssignment, changed_ids)
+            publish_assignments('assignment', [(pk, target_date) for pk in changed_ids])
 
-        serializer = self.get_serializer(created, many=True)
+        assigned = self.get_queryset().filter(
+            date=target_date,
+            dog_id__in=[a.dog_id for a in to_create] + [a.dog_id for a in revived],
+        )
+        serializer = self.get_serializer(
+            assigned, many=True, context=self._boarding_context(target_date))
         return Response({
             'assigned': serializer.data,
             'skipped_dog_ids': skipped,
@@ -2969,32 +3076,46 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
             # hand those dogs to another driver. Their status carries over.
             swappable = ('ASSIGNED', 'PICKED_UP')
             if scope == 'just_this_day':
-                assignments_updated = DailyDogAssignment.objects.filter(
+                moving = DailyDogAssignment.objects.filter(
                     staff_member=from_staff,
                     date=target_date,
                     status__in=swappable,
-                ).update(staff_member=to_staff)
+                )
             elif scope == 'this_weekday_forever':
                 weekday = target_date.isoweekday()
                 roster_updated = DogWeekdayPickup.objects.filter(
                     staff_member=from_staff,
                     weekday=weekday,
                 ).update(staff_member=to_staff)
-                assignments_updated = DailyDogAssignment.objects.filter(
+                moving = DailyDogAssignment.objects.filter(
                     staff_member=from_staff,
                     date__gte=target_date,
                     date__iso_week_day=weekday,
                     status__in=swappable,
-                ).update(staff_member=to_staff)
+                )
             else:  # all_weekdays_forever
                 roster_updated = DogWeekdayPickup.objects.filter(
                     staff_member=from_staff,
                 ).update(staff_member=to_staff)
-                assignments_updated = DailyDogAssignment.objects.filter(
+                moving = DailyDogAssignment.objects.filter(
                     staff_member=from_staff,
                     date__gte=timezone.localdate(),
                     status__in=swappable,
-                ).update(staff_member=to_staff)
+                )
+            moved_rows = list(moving.values_list('id', 'date'))
+            moved_ids = [pk for pk, _ in moved_rows]
+            assignments_updated = DailyDogAssignment.objects.filter(
+                id__in=moved_ids,
+            ).update(staff_member=to_staff)
+            if assignments_updated:
+                from .conditional import bump_versions, roster_key
+                from .live import publish_assignments
+                from .scheduling import refresh_staff_affinity
+                from .sync import record_changes
+                refresh_staff_affinity(staff_ids=[from_staff.id, to_staff.id])
+                bump_versions(roster_key(target_date) if scope == 'just_this_day' else 'roster')
+                record_changes(DailyDogAssignment, moved_ids)
+                publish_assignments('assignment', moved_rows)
 
         return Response({
             'roster_rows_updated': roster_updated,
@@ -3027,19 +3148,7 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def staff_members(self, request):
         """Get list of staff members for assignment dropdown."""
-        from django.contrib.auth.models import User
-        staff = User.objects.filter(is_staff=True).values(
-            'id', 'username', 'first_name', 'profile__staff_color'
-        )
-        return Response([
-            {
-                'id': s['id'],
-                'username': s['username'],
-                'first_name': s['first_name'],
-                'staff_color': s['profile__staff_color'] or '',
-            }
-            for s in staff
-        ])
+        return Response(_staff_member_choices())
 
     @action(detail=False, methods=['post'])
     def reorder(self, request):
@@ -3075,6 +3184,12 @@ class DailyDogAssignmentViewSet(viewsets.ModelViewSet):
                     weekday=a.date.isoweekday(),
                     staff_member_id=a.staff_member_id,
                 ).update(sort_order=position)
+            from .conditional import bump_versions, roster_key
+            from .live import publish_assignments
+            from .sync import record_changes
+            bump_versions(*{roster_key(a.date) for a in ordered})
+            record_changes(DailyDogAssignment, [a.id for a in ordered])
+            publish_assignments('reorder', [(a.id, a.date) for a in ordered])
 
         return Response({'detail': 'Order saved.'})
 
@@ -3230,12 +3345,8 @@ class SupportQueryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unresolved_count(self, request):
         """Get count of queries with unread replies for badge display."""
-        from .models import SupportQuery
-        if request.user.is_staff:
-            count = SupportQuery.objects.filter(status='OPEN', staff_has_unread=True).count()
-        else:
-            count = SupportQuery.objects.filter(owner=request.user, has_unread_reply=True).count()
-        return Response({'count': count})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['unresolved_queries']})
 
 
 class ClosureDayViewSet(viewsets.ModelViewSet):
@@ -3348,7 +3459,7 @@ class WaitlistEntryViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     def create(self, request, *args, **kwargs):
         from datetime import date as date_cls
         from .models import WaitlistEntry
-        from .scheduling import ScheduleIndex
+        from .scheduling import ScheduleSnapshot
 
         dog_id = request.data.get('dog')
         date_str = request.data.get('date')
@@ -3373,7 +3484,7 @@ class WaitlistEntryViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You can only join the waitlist for your own dogs.')
 
-        index = ScheduleIndex(target_date, target_date)
+        index = ScheduleSnapshot(target_date, target_date)
         closure = index.closure(target_date)
         if closure and closure.closure_type == 'CLOSED':
             return Response({'detail': 'The daycare is closed on that day.'}, status=400)
@@ -3436,7 +3547,7 @@ class StaffAvailabilityViewSet(viewsets.ModelViewSet):
         if self.request.method in ('GET', 'HEAD', 'OPTIONS'):
             return queryset
         # A row saying a staff member is unavailable suppresses all their push
-        # notifications (notifications._is_staff_working_today), so letting any
+        # notifications (notifications._staff_off_today), so letting any
         # staff account PATCH a colleague's row is a real insider vector.
         if not self._can_manage_others():
             queryset = queryset.filter(staff_member=self.request.user)
@@ -4241,7 +4352,8 @@ class ContactInquiryViewSet(viewsets.ModelViewSet):
         # Permission is handled by InquiryViewerPermission; this used to
         # dereference user.profile unguarded, which is an AttributeError 500 for
         # any user without one.
-        return Response({'count': ContactInquiry.objects.filter(is_read=False).count()})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['unread_inquiries']})
 
 
 class ContactInquiryCreateThrottle(AnonRateThrottle):
@@ -4405,18 +4517,20 @@ class VehicleDefectViewSet(viewsets.ModelViewSet):
             qs = qs.filter(status=status_param)
         return qs
 
-    def _attach_images(self, defect):
+    def _attach_images(self, defect, images):
+        from .media_processing import store_raw
         from .models import VehicleDefectImage
-        for image_file in self.request.FILES.getlist('images'):
+        for image_file in images:
             VehicleDefectImage.objects.create(
                 defect=defect,
-                image=process_image(image_file, max_size=(1280, 1280)),
-                thumbnail=process_image(image_file, max_size=(400, 400), quality=70),
+                image=store_raw(image_file),
+                processing_state='PENDING',
             )
 
     def perform_create(self, serializer):
+        images = _validated_defect_images(self.request)
         defect = serializer.save(reported_by=self.request.user)
-        self._attach_images(defect)
+        self._attach_images(defect, images)
 
         try:
             from .notifications import send_staff_notification
@@ -4434,7 +4548,7 @@ class VehicleDefectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def add_images(self, request, pk=None):
         defect = self.get_object()
-        self._attach_images(defect)
+        self._attach_images(defect, _validated_defect_images(request))
         defect = self.get_queryset().get(pk=defect.pk)
         return Response(self.get_serializer(defect).data)
 
@@ -4497,9 +4611,8 @@ class VehicleDefectViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def unresolved_count(self, request):
-        from .models import VehicleDefect
-        count = VehicleDefect.objects.exclude(status='RESOLVED').count()
-        return Response({'count': count})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['unresolved_vehicle_defects']})
 
 
 class FacilityDefectViewSet(viewsets.ModelViewSet):
@@ -4519,18 +4632,20 @@ class FacilityDefectViewSet(viewsets.ModelViewSet):
             qs = qs.filter(status=status_param)
         return qs
 
-    def _attach_images(self, defect):
+    def _attach_images(self, defect, images):
+        from .media_processing import store_raw
         from .models import FacilityDefectImage
-        for image_file in self.request.FILES.getlist('images'):
+        for image_file in images:
             FacilityDefectImage.objects.create(
                 defect=defect,
-                image=process_image(image_file, max_size=(1280, 1280)),
-                thumbnail=process_image(image_file, max_size=(400, 400), quality=70),
+                image=store_raw(image_file),
+                processing_state='PENDING',
             )
 
     def perform_create(self, serializer):
+        images = _validated_defect_images(self.request)
         defect = serializer.save(reported_by=self.request.user)
-        self._attach_images(defect)
+        self._attach_images(defect, images)
 
         try:
             from .notifications import send_staff_notification
@@ -4547,7 +4662,7 @@ class FacilityDefectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def add_images(self, request, pk=None):
         defect = self.get_object()
-        self._attach_images(defect)
+        self._attach_images(defect, _validated_defect_images(request))
         defect = self.get_queryset().get(pk=defect.pk)
         return Response(self.get_serializer(defect).data)
 
@@ -4606,9 +4721,8 @@ class FacilityDefectViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def unresolved_count(self, request):
-        from .models import FacilityDefect
-        count = FacilityDefect.objects.exclude(status='RESOLVED').count()
-        return Response({'count': count})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['unresolved_facility_defects']})
 
 
 class IncidentViewSet(viewsets.ModelViewSet):
@@ -4675,13 +4789,14 @@ class IncidentViewSet(viewsets.ModelViewSet):
     def _attach_media(self, incident):
         """Store every uploaded file against the incident.
 
-        Photos are resized and thumbnailed like the rest of the app; videos are
-        stored as-is with a first-frame thumbnail (best-effort — a missing
-        thumbnail must never lose the evidence). Uploads are validated first,
-        so a rejected file 400s instead of landing on disk.
+        Files are stored raw and the media worker resizes photos and gives
+        videos a first-frame thumbnail (best-effort — a missing thumbnail must
+        never lose the evidence). Uploads are validated first, so a rejected
+        file 400s instead of landing on disk.
         """
         from django.core.exceptions import ValidationError as DjangoValidationError
         from rest_framework.exceptions import ValidationError as DRFValidationError
+        from .media_processing import store_raw
         from .models import IncidentMedia
         from .validators import validate_media_upload
 
@@ -4695,17 +4810,11 @@ class IncidentViewSet(viewsets.ModelViewSet):
             except DjangoValidationError as exc:
                 raise DRFValidationError({'media': exc.messages})
 
-            if media_type == 'VIDEO':
-                thumbnail = generate_video_thumbnail(upload)
-                stored = upload
-            else:
-                stored, thumbnail = process_image_pair(upload, main_size=(1600, 1600))
-
             created.append(IncidentMedia.objects.create(
                 incident=incident,
                 media_type=media_type,
-                file=stored,
-                thumbnail=thumbnail,
+                file=store_raw(upload, media_type),
+                processing_state='PENDING',
                 uploaded_by=self.request.user,
             ))
         return created
@@ -4840,8 +4949,8 @@ class IncidentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def open_count(self, request):
-        from .models import Incident
-        return Response({'count': Incident.objects.exclude(status='RESOLVED').count()})
+        from .badges import badge_counts
+        return Response({'count': badge_counts(request.user)['open_incidents']})
 
 
 class IntakeRequestViewSet(viewsets.ModelViewSet):
@@ -5105,32 +5214,36 @@ class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['post'])
     def send_all(self, request):
-        """Send every draft invoice for a period.
+        """Queue every draft invoice for a period to be sent.
 
-        Reports per-invoice outcomes. One customer's Xero failure must not abort
-        the batch and leave the rest unsent with no record of how far it got.
+        Pushing a month of invoices to Xero takes minutes, far longer than a
+        request may run, so this only queues a job (202) and
+        ``manage.py run_invoice_send_jobs`` does the sending. Poll
+        ``send_jobs/<id>/`` for progress and per-invoice failures; one
+        customer's Xero failure never aborts the rest of the batch.
         """
         from . import billing
-        from .models import Invoice
+        from .serializers import InvoiceSendJobSerializer
 
         self._require_manager()
         year, month = self._parse_period(request)
         if year is None:
             return Response({'detail': 'Provide a valid year and month.'}, status=400)
-        drafts = Invoice.objects.filter(status='DRAFT', period_year=year, period_month=month)
-        sent = 0
-        failed = []
-        for invoice in drafts:
-            try:
-                billing.send_invoice(invoice, user=request.user)
-                sent += 1
-            except (billing.XeroSendFailed, ValueError) as exc:
-                failed.append({
-                    'invoice': invoice.id,
-                    'customer': invoice.billed_name,
-                    'detail': str(exc),
-                })
-        return Response({'sent': sent, 'failed': failed})
+        job, _ = billing.queue_send_job(year, month, user=request.user)
+        return Response(InvoiceSendJobSerializer(job).data, status=202)
+
+    @action(detail=False, methods=['get'], url_path=r'send_jobs/(?P<job_id>[0-9]+)')
+    def send_job(self, request, job_id=None):
+        """Progress of a send_all job."""
+        from .models import InvoiceSendJob
+        from .serializers import InvoiceSendJobSerializer
+
+        self._require_manager()
+        try:
+            job = InvoiceSendJob.objects.get(pk=job_id)
+        except InvoiceSendJob.DoesNotExist:
+            return Response({'detail': 'Send job not found.'}, status=404)
+        return Response(InvoiceSendJobSerializer(job).data)
 
     @action(detail=True, methods=['post'])
     def regenerate(self, request, pk=None):
@@ -5685,6 +5798,37 @@ def xero_contact_search(request):
 
 # ─── Roadworks ──────────────────────────────────────────────────────────────
 
+def _roadworks_results(on_date, assignments=None):
+    """The day's disruptive roadworks, worst first, with the staff and dogs
+    each one affects. ``assignments`` as for ``match_issues_to_routes``."""
+    from .roadworks import match_issues_to_routes
+
+    matches = match_issues_to_routes(on_date, assignments=assignments)
+
+    # Worst first, so a client taking the top item shows the most severe.
+    severity_rank = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
+    items = sorted(
+        matches.values(),
+        key=lambda m: (severity_rank.get(m['issue'].severity, 3), m['issue'].street),
+    )
+
+    return [{
+        'id': m['issue'].id,
+        'description': m['issue'].description,
+        'street': m['issue'].street,
+        'town': m['issue'].town,
+        'latitude': m['issue'].latitude,
+        'longitude': m['issue'].longitude,
+        'start_date': m['issue'].start_date,
+        'end_date': m['issue'].end_date,
+        'severity': m['issue'].severity,
+        'severity_label': m['issue'].get_severity_display(),
+        'traffic_management': m['issue'].traffic_management,
+        'affected_staff_ids': sorted(m['staff_ids']),
+        'affected_dog_ids': sorted(m['dog_ids']),
+    } for m in items]
+
+
 @api_view(['GET'])
 @perm_classes([IsAuthenticated])
 def roadworks_for_date(request):
@@ -5701,7 +5845,6 @@ def roadworks_for_date(request):
     """
     from datetime import date as date_cls
     from django.utils import timezone
-    from .roadworks import match_issues_to_routes
 
     if not request.user.is_staff:
         return Response({'detail': 'Staff only.'}, status=drf_status.HTTP_403_FORBIDDEN)
@@ -5716,32 +5859,205 @@ def roadworks_for_date(request):
     else:
         on_date = timezone.localdate()
 
-    matches = match_issues_to_routes(on_date)
+    return Response({'date': on_date, 'results': _roadworks_results(on_date)})
 
-    # Worst first, so a client taking the top item shows the most severe.
-    severity_rank = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
-    items = sorted(
-        matches.values(),
-        key=lambda m: (severity_rank.get(m['issue'].severity, 3), m['issue'].street),
+
+# Longest range one heatmap request may cover.
+HEATMAP_MAX_DAYS = 366
+
+
+@api_view(['GET'])
+@perm_classes([IsAdminUser])
+def capacity_heatmap(request):
+    """How booked each day is, for a range up to a year ahead.
+
+    GET /api/capacity/heatmap/?start=YYYY-MM-DD&end=YYYY-MM-DD
+
+    Defaults to today and the 364 days after it. Each entry carries the day's
+    ``booked`` and ``boarding`` counts, ``capacity``, ``spots_left``,
+    ``is_full`` and ``closure_type``. Counted by an AttendanceBitmap (see
+    api.scheduling) — the same rules as the calendar and the roster, without
+    building a set of dog ids per day.
+    """
+    from datetime import date as date_cls, timedelta
+    from .scheduling import AttendanceBitmap
+
+    try:
+        start = date_cls.fromisoformat(request.query_params.get('start') or timezone.localdate().isoformat())
+        end = request.query_params.get('end')
+        end = date_cls.fromisoformat(end) if end else start + timedelta(days=364)
+    except ValueError:
+        return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    if end < start:
+        return Response({'detail': 'end must not be before start.'}, status=400)
+    if (end - start).days >= HEATMAP_MAX_DAYS:
+        return Response({'detail': f'The range may cover at most {HEATMAP_MAX_DAYS} days.'}, status=400)
+
+    return Response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': AttendanceBitmap(start, end).heatmap(),
+    })
+
+
+# ─── Staff dashboard and badges ─────────────────────────────────────────────
+
+@api_view(['GET'])
+@perm_classes([IsAdminUser])
+def staff_dashboard(request):
+    """Everything the staff dashboard opens with, in one response.
+
+    Opening the dashboard used to fan out into ten requests — the roster,
+    unassigned dogs, conflicts, roadworks, media stats, every action-item
+    count and the staff list — each re-checking materialization and
+    re-reading the day's rows, boarding and closures. Here the day is
+    materialized once, its assignment rows loaded once (the roster, the
+    unassigned list, the conflicts and the roadworks matching all read that
+    one list), attendance comes from one ScheduleSnapshot and the boarding
+    flags from one query over the day and its neighbours.
+
+    The individual endpoints stay for the screens that need just one piece
+    and for refreshing a single section after an edit; each key here holds
+    exactly what its endpoint returns.
+
+    Query param: ``date`` (YYYY-MM-DD, defaults to today).
+    """
+    from datetime import date as date_cls
+    from .badges import badge_counts
+
+    raw_date = request.query_params.get('date')
+    if raw_date:
+        try:
+            target_date = date_cls.fromisoformat(raw_date)
+        except ValueError:
+            return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+    else:
+        target_date = timezone.localdate()
+
+    roster = DailyDogAssignmentViewSet
+    roster._materialize_roster_for_date(target_date)
+    rows = list(
+        DailyDogAssignment.objects.filter(date=target_date)
+        .select_related('dog', 'dog__owner', 'dog__owner__profile', 'staff_member')
+        .prefetch_related('dog__additional_owners', 'dog__additional_owners__profile')
     )
+    routed = [a for a in rows if a.status not in ('REMOVED', 'UNASSIGNED')]
 
-    results = [{
-        'id': m['issue'].id,
-        'description': m['issue'].description,
-        'street': m['issue'].street,
-        'town': m['issue'].town,
-        'latitude': m['issue'].latitude,
-        'longitude': m['issue'].longitude,
-        'start_date': m['issue'].start_date,
-        'end_date': m['issue'].end_date,
-        'severity': m['issue'].severity,
-        'severity_label': m['issue'].get_severity_display(),
-        'traffic_management': m['issue'].traffic_management,
-        'affected_staff_ids': sorted(m['staff_ids']),
-        'affected_dog_ids': sorted(m['dog_ids']),
-    } for m in items]
+    # Same exclusion as unassigned_dogs: owner-does-both dogs never need a driver.
+    unassigned = dog_listing_queryset().filter(
+        id__in=roster._unassigned_dog_ids(target_date, assignments=rows),
+    ).exclude(owner_brings_default=True, owner_collects_default=True)
+
+    return Response({
+        'date': target_date.isoformat(),
+        'assignments': DailyDogAssignmentSerializer(
+            routed, many=True,
+            context={'request': request, **roster._boarding_sets(target_date)},
+        ).data,
+        'unassigned_dogs': DogSerializer(unassigned, many=True, context={'request': request}).data,
+        'conflicts': roster._compatibility_conflicts(routed),
+        'roadworks': _roadworks_results(
+            target_date,
+            assignments=[a for a in rows if a.status != 'REMOVED' and a.staff_member_id],
+        ),
+        'media_stats': _media_today_stats(),
+        'counts': badge_counts(request.user),
+        'staff_members': _staff_member_choices(),
+    })
+
+
+@api_view(['GET'])
+@perm_classes([IsAuthenticated])
+def badges(request):
+    """Every action-item badge the caller may see, as ``{badge: count}``.
+
+    One indexed read of the stored counts (see api.badges) in place of a
+    count endpoint per badge. Staff get the staff badges — plus
+    ``unread_inquiries`` with can_view_inquiries — and an owner gets
+    ``unresolved_queries``, their queries with an unread reply.
+    """
+    from .badges import badge_counts
+    return Response(badge_counts(request.user))
+
+
+@api_view(['GET'])
+@perm_classes([IsAuthenticated])
+def sync_changes(request):
+    """What changed since the caller's last sync, per resource.
+
+    GET /api/sync/?since=<token>
+
+    Returns ``{token, has_more, reset, changes}``; ``changes`` maps each
+    resource (dogs, assignments, notes, boarding_requests,
+    date_change_requests — the staff-only ones for staff only) to
+    ``{upserts: [rows as the list endpoint renders them], deletes: [ids]}``,
+    with only the resources that changed present. Send ``token`` as the next
+    ``since``; with ``has_more`` there is more to fetch straight away. Without
+    ``since``, or with one older than the pruned log, the answer is just
+    ``reset: true`` and the current token: refetch the lists, then sync from
+    it. See api.sync.
+    """
+    from .sync import changes_since
+
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({'detail': 'since must be a sync token.'}, status=400)
+    return Response(changes_since(request, since))
+
+
+# ─── Live day board ─────────────────────────────────────────────────────────
+
+def _stream_user(request):
+    """The caller of a plain Django view, by DRF token or session."""
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.exceptions import AuthenticationFailed
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if result:
+        return result[0]
+    return request.user if request.user.is_authenticated else None
+
+
+async def day_board_events(request):
+    """Server-Sent Events for one day's board: staff only.
+
+    GET /api/live/day-board/?date=YYYY-MM-DD (defaults to today)
+
+    Sends ``ready`` on connect, then a ``status``, ``assignment``,
+    ``reorder`` or ``removed`` event — data ``{"event", "date", "ids"}``,
+    ``ids`` null for "the whole day" — whenever that day's assignments
+    change, with a keep-alive comment every 25s. Clients reload the day on an
+    event (and on reconnecting, since events sent while disconnected are not
+    replayed) in place of polling ``daily-assignments/today``. An async view:
+    it is served from the ASGI entry point. See api.live.
+    """
+    from datetime import date as date_cls
+    from asgiref.sync import sync_to_async
+    from django.http import JsonResponse, StreamingHttpResponse
+    from .live import event_stream
+
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    if not user.is_staff:
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+    raw_date = request.GET.get('date')
+    try:
+        day = date_cls.fromisoformat(raw_date) if raw_date else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
 
-    return Response({'date': on_date, 'results': results})
+    response = StreamingHttpResponse(event_stream(day.isoformat()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class SnsWebhookThrottle(AnonRateThrottle):
@@ -11,23 +11,25 @@ the one-time superuser consent flow live in the :class:`api.models.XeroConnectio
 pk=1 singleton. Everything degrades gracefully — callers treat
 :class:`XeroNotConnected` as "feature off".
 
-Uses the Python standard library only (``urllib``) so no extra pip dependency
-is introduced — adding one to a single requirements file breaks the prod
-Docker build. All network I/O goes through :func:`_token_request` and
-:func:`_api_request`, which tests patch directly.
+HTTP goes through the shared :mod:`api.http_client` (pooled keep-alive
+connections, retries on 429/5xx). All network I/O goes through
+:func:`_token_request` and :func:`_api_request`, which tests patch directly.
 """
 import base64
 import json as _json
 import logging
 import secrets as _secrets
-import urllib.error
+import threading
+import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
+from . import http_client
+
 logger = logging.getLogger(__name__)
 
 AUTH_URL = 'https://login.xero.com/identity/connect/authorize'
@@ -39,6 +41,16 @@ SCOPES = 'offline_access accounting.transactions accounting.contacts'
 # How long an in-flight authorize state stays valid.
 STATE_MAX_AGE_SECONDS = 600
 
+# Xero's per-tenant limits: 60 calls in any rolling minute, 5 in flight at
+# once. The bucket refills a little under the limit so that a full burst plus
+# a minute of refill still fits inside one rolling minute.
+RATE_LIMIT_PER_MINUTE = 55
+RATE_LIMIT_BURST = 5
+MAX_CONCURRENT_CALLS = 5
+
+# Invoices per POST to the Invoices endpoint when sending a batch.
+INVOICE_BATCH_SIZE = 50
+
 
 class XeroError(Exception):
     """A Xero API error the caller should surface or store."""
@@ -53,6 +65,55 @@ class XeroAuthError(XeroError):
     a superuser must reconnect."""
 
 
+class TokenBucket:
+    """Thread-safe token bucket bounding both call rate and concurrency.
+
+    ``with bucket:`` blocks until a call may start — a concurrency slot is free
+    and a token is available — and frees the slot on exit. Limits are per
+    process; the send worker is the only caller that makes hundreds of calls
+    in a row, and it honours them on its own.
+    """
+
+    def __init__(self, rate_per_minute, burst, max_concurrent, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def take(self):
+        """Block until a token is available, then spend it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def __enter__(self):
+        self._slots.acquire()
+        try:
+            self.take()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
+        return False
+
+
+_limiter = TokenBucket(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, MAX_CONCURRENT_CALLS)
+
+
 def is_configured():
     """Whether the env-var app credentials are present."""
     return bool(getattr(settings, 'XERO_CLIENT_ID', '') and getattr(settings, 'XERO_CLIENT_SECRET', ''))
@@ -73,28 +134,16 @@ def _token_request(form):
     basic = base64.b64encode(
         f"{settings.XERO_CLIENT_ID}:{settings.XERO_CLIENT_SECRET}".encode()
     ).decode()
-    req = urllib.request.Request(
-        TOKEN_URL,
-        data=urllib.parse.urlencode(form).encode(),
-        headers={
-            'Authorization': f'Basic {basic}',
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'User-Agent': 'p4td-backend',
-        },
-        method='POST',
-    )
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            return _json.loads(resp.read().decode('utf-8'))
-    except urllib.error.HTTPError as exc:
-        try:
-            detail = exc.read().decode('utf-8')
-        except Exception:
-            detail = ''
-        if 'invalid_grant' in detail:
+        return http_client.request(
+            'POST', TOKEN_URL, form=form, timeout=15,
+            headers={'Authorization': f'Basic {basic}'},
+        ).json()
+    except http_client.HTTPError as exc:
+        if 'invalid_grant' in exc.text():
             raise XeroAuthError('Xero refused the stored credentials (invalid_grant) — reconnect Xero.')
-        raise XeroError(f'Xero token endpoint error (HTTP {exc.code}).')
-    except (urllib.error.URLError, TimeoutError, ValueError):
+        raise XeroError(f'Xero token endpoint error (HTTP {exc.status}).')
+    except (http_client.TransportError, ValueError):
         raise XeroError('Could not reach the Xero token endpoint.')
 
 
@@ -105,33 +154,22 @@ def _api_request(method, path, access_token, tenant_id=None, payload=None, param
     Raises :class:`XeroError` with the response detail on failure.
     """
     url = path if path.startswith('http') else f'{API_BASE}/{path.lstrip("/")}'
-    if params:
-        url = f'{url}?{urllib.parse.urlencode(params)}'
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Accept': 'application/json',
-        'User-Agent': 'p4td-backend',
     }
     if tenant_id:
         headers['xero-tenant-id'] = tenant_id
-    data = None
-    if payload is not None:
-        data = _json.dumps(payload).encode('utf-8')
-        headers['Content-Type'] = 'application/json'
-    req = urllib.request.Request(url, data=data, headers=headers, method=method)
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            body = resp.read().decode('utf-8')
-            return _json.loads(body) if body else {}
-    except urllib.error.HTTPError as exc:
-        try:
-            detail = exc.read().decode('utf-8')[:500]
-        except Exception:
-            detail = ''
-        if exc.code == 401:
+        return http_client.request(
+            method, url, params=params, json=payload, headers=headers, timeout=30,
+        ).json()
+    except http_client.HTTPError as exc:
+        detail = exc.text()[:500]
+        if exc.status == 401:
             raise XeroAuthError(f'Xero rejected the access token (HTTP 401). {detail}')
-        raise XeroError(f'Xero API error (HTTP {exc.code}): {detail}')
-    except (urllib.error.URLError, TimeoutError, ValueError):
+        raise XeroError(f'Xero API error (HTTP {exc.status}): {detail}')
+    except (http_client.TransportError, ValueError):
         raise XeroError('Could not reach the Xero API.')
 
 
@@ -280,7 +318,35 @@ def _tenant_call(method, path, payload=None, params=None):
 
     token = get_access_token()
     tenant_id = XeroConnection.load().tenant_id
-    return _api_request(method, path, token, tenant_id, payload=payload, params=params)
+    with _limiter:
+        return _api_request(method, path, token, tenant_id, payload=payload, params=params)
+
+
+def _fan_out(calls):
+    """Run ``[(method, path, payload), ...]`` against the tenant concurrently,
+    within the rate and concurrency limits. Returns one result per call, in
+    order; a failed call's slot holds its :class:`XeroError`.
+
+    Credentials are resolved once up front so the pool threads only do HTTP
+    and never touch the database.
+    """
+    from .models import XeroConnection
+
+    if not calls:
+        return []
+    token = get_access_token()
+    tenant_id = XeroConnection.load().tenant_id
+
+    def call(spec):
+        method, path, payload = spec
+        try:
+            with _limiter:
+                return _api_request(method, path, token, tenant_id, payload=payload)
+        except XeroError as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS) as pool:
+        return list(pool.map(call, calls))
 
 
 # ---------------------------------------------------------------------------
@@ -330,12 +396,11 @@ def find_or_create_contact_by_name(name, email=''):
     return result['Contacts'][0]['ContactID']
 
 
-def create_invoice(invoice, contact_id):
-    """Create an authorised ACCREC invoice in Xero from a local Invoice.
+def _invoice_payload(invoice, contact_id):
+    """The Xero representation of a local Invoice.
 
     ``LineAmountTypes: Inclusive`` keeps the app's gross total equal to the
-    Xero total regardless of the org's default tax rate. Returns
-    ``(InvoiceID, InvoiceNumber)``.
+    Xero total regardless of the org's default tax rate.
     """
     lines = [
         {
@@ -345,23 +410,57 @@ def create_invoice(invoice, contact_id):
         }
         for line in invoice.lines.all()
     ]
-    payload = {
-        'Invoices': [{
-            'Type': 'ACCREC',
-            'Contact': {'ContactID': contact_id},
-            'Status': 'AUTHORISED',
-            'LineAmountTypes': 'Inclusive',
-            'Date': timezone.now().date().isoformat(),
-            'DueDate': invoice.due_date.isoformat() if invoice.due_date else timezone.now().date().isoformat(),
-            'Reference': f'Daycare {invoice.period_label}',
-            'LineItems': lines,
-        }],
+    return {
+        'Type': 'ACCREC',
+        'Contact': {'ContactID': contact_id},
+        'Status': 'AUTHORISED',
+        'LineAmountTypes': 'Inclusive',
+        'Date': timezone.now().date().isoformat(),
+        'DueDate': invoice.due_date.isoformat() if invoice.due_date else timezone.now().date().isoformat(),
+        'Reference': f'Daycare {invoice.period_label}',
+        'LineItems': lines,
     }
-    result = _tenant_call('POST', 'Invoices', payload=payload)
+
+
+def create_invoice(invoice, contact_id):
+    """Create an authorised ACCREC invoice in Xero from a local Invoice.
+    Returns ``(InvoiceID, InvoiceNumber)``."""
+    result = _tenant_call('POST', 'Invoices', payload={'Invoices': [_invoice_payload(invoice, contact_id)]})
     created = result['Invoices'][0]
     return created['InvoiceID'], created.get('InvoiceNumber', '')
 
 
+def create_invoices(pairs):
+    """Create up to :data:`INVOICE_BATCH_SIZE` invoices in a single POST.
+
+    ``pairs`` is ``[(invoice, contact_id), ...]``. With ``summarizeErrors=false``
+    Xero validates each invoice on its own and reports errors per element, so
+    one bad invoice doesn't sink the batch. Returns a list aligned with
+    ``pairs`` of ``(InvoiceID, InvoiceNumber, error)``; ``error`` is '' for
+    invoices that were created.
+    """
+    if len(pairs) > INVOICE_BATCH_SIZE:
+        raise ValueError(f'At most {INVOICE_BATCH_SIZE} invoices per batch.')
+    if not pairs:
+        return []
+    result = _tenant_call(
+        'POST', 'Invoices',
+        payload={'Invoices': [_invoice_payload(invoice, contact_id) for invoice, contact_id in pairs]},
+        params={'summarizeErrors': 'false'},
+    )
+    created = result.get('Invoices') or []
+    outcomes = []
+    for i in range(len(pairs)):
+        entry = created[i] if i < len(created) else {}
+        errors = [e.get('Message', '') for e in entry.get('ValidationErrors') or []]
+        if errors or entry.get('StatusAttributeString') == 'ERROR' or not entry.get('InvoiceID'):
+            detail = '; '.join(m for m in errors if m) or 'Xero did not create the invoice.'
+            outcomes.append(('', '', detail))
+        else:
+            outcomes.append((entry['InvoiceID'], entry.get('InvoiceNumber', ''), ''))
+    return outcomes
+
+
 def email_invoice(xero_invoice_id):
     """Ask Xero to email the invoice to its contact, using the org's branding
     theme — the same email customers received when invoices were raised by
@@ -370,6 +469,17 @@ def email_invoice(xero_invoice_id):
     _tenant_call('POST', f'Invoices/{xero_invoice_id}/Email', payload={})
 
 
+def email_invoices(xero_invoice_ids):
+    """:func:`email_invoice` for many invoices, concurrently. Returns
+    ``{InvoiceID: error message}`` for the ones Xero refused."""
+    results = _fan_out([('POST', f'Invoices/{xero_id}/Email', {}) for xero_id in xero_invoice_ids])
+    return {
+        xero_id: str(result)
+        for xero_id, result in zip(xero_invoice_ids, results)
+        if isinstance(result, XeroError)
+    }
+
+
 def fetch_all_contacts():
     """Every contact in the connected org (summary fields only), paged.
 
@@ -413,6 +523,20 @@ def get_online_invoice_url(xero_invoice_id):
     return ''
 
 
+def get_online_invoice_urls(xero_invoice_ids):
+    """:func:`get_online_invoice_url` for many invoices, concurrently. Returns
+    ``{InvoiceID: url}``; lookups that failed are logged and left out."""
+    results = _fan_out([('GET', f'Invoices/{xero_id}/OnlineInvoice', None) for xero_id in xero_invoice_ids])
+    urls = {}
+    for xero_id, result in zip(xero_invoice_ids, results):
+        if isinstance(result, XeroError):
+            logger.warning('Could not fetch Xero online invoice URL for %s: %s', xero_id, result)
+            continue
+        entries = result.get('OnlineInvoices') or []
+        urls[xero_id] = entries[0].get('OnlineInvoiceUrl', '') if entries else ''
+    return urls
+
+
 def fetch_invoices(xero_invoice_ids):
     """Fetch invoices (with their Payments) by Xero id. Returns a list of
     invoice dicts. Callers chunk the ids; Xero caps the IDs filter length."""
@@ -1,4 +1,5 @@
 import 'comment.dart';
+import 'media_variant.dart';
 
 enum MediaType { photo, video }
 
@@ -26,11 +27,14 @@ class GroupMedia {
   final MediaType mediaType;
   final String fileUrl;
   final String? thumbnailUrl;
+  final List<MediaVariant> variants;
   final String? caption;
   final List<TaggedDog> taggedDogs;
   final Map<String, int> reactions;
   final String? userReaction;
+  /// The newest few comments; [commentCount] is the post's total.
   final List<Comment> comments;
+  final int commentCount;
   final DateTime createdAt;
 
   GroupMedia({
@@ -41,13 +45,15 @@ class GroupMedia {
     required this.mediaType,
     required this.fileUrl,
     this.thumbnailUrl,
+    this.variants = const [],
     this.caption,
     this.taggedDogs = const [],
     required this.reactions,
     this.userReaction,
     required this.comments,
+    int? commentCount,
     required this.createdAt,
-  });
+  }) : commentCount = commentCount ?? comments.length;
 
   factory GroupMedia.fromJson(Map<String, dynamic> json) {
     Map<String, int> reactionsMap = {};
@@ -57,6 +63,9 @@ class GroupMedia {
       });
     }
 
+    final comments = (json['comments'] as List? ?? [])
+        .map((c) => Comment.fromJson(c))
+        .toList();
     return GroupMedia(
       id: json['id'].toString(),
       uploadedBy: json['uploaded_by'].toString(),
@@ -65,19 +74,24 @@ class GroupMedia {
       mediaType: json['media_type'] == 'VIDEO' ? MediaType.video : MediaType.photo,
       fileUrl: json['file'],
       thumbnailUrl: json['thumbnail'],
+      variants: MediaVariant.listFromJson(json['variants']),
       caption: json['caption'],
       taggedDogs: (json['tagged_dogs'] as List? ?? [])
           .map((d) => TaggedDog.fromJson(d))
           .toList(),
       reactions: reactionsMap,
       userReaction: json['user_reaction'],
-      comments: (json['comments'] as List? ?? [])
-          .map((c) => Comment.fromJson(c))
-          .toList(),
+      comments: comments,
+      commentCount: json['comment_count'] ?? comments.length,
       createdAt: DateTime.parse(json['created_at']),
     );
   }
 
   bool get isVideo => mediaType == MediaType.video;
   bool get isPhoto => mediaType == MediaType.photo;
+
+  /// The best image URL for a slot [pixelWidth] physical pixels wide; the
+  /// full file until variants exist.
+  String imageUrlFor(int pixelWidth) =>
+      MediaVariant.pick(variants, pixelWidth)?.url ?? fileUrl;
 }
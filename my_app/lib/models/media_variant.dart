@@ -0,0 +1,44 @@
+/// One responsive rendition of a photo (see `variants` on the feed and
+/// gallery endpoints): the same image at a given width, as WebP or JPEG.
+class MediaVariant {
+  final int width;
+  final int height;
+  final String format;
+  final int bytes;
+  final String url;
+
+  MediaVariant({
+    required this.width,
+    required this.height,
+    required this.format,
+    required this.bytes,
+    required this.url,
+  });
+
+  factory MediaVariant.fromJson(Map<String, dynamic> json) {
+    return MediaVariant(
+      width: json['width'] as int,
+      height: json['height'] as int,
+      format: json['format'] ?? 'jpeg',
+      bytes: json['bytes'] as int? ?? 0,
+      url: json['url'],
+    );
+  }
+
+  static List<MediaVariant> listFromJson(dynamic json) {
+    return (json as List? ?? [])
+        .map((v) => MediaVariant.fromJson(v as Map<String, dynamic>))
+        .toList();
+  }
+
+  /// The smallest variant at least [pixelWidth] wide (the widest if none
+  /// is), preferring WebP. Null when there are no variants yet — the upload
+  /// is still being processed, or predates variants.
+  static MediaVariant? pick(List<MediaVariant> variants, int pixelWidth) {
+    if (variants.isEmpty) return null;
+    final webp = variants.where((v) => v.format == 'webp').toList();
+    final pool = webp.isNotEmpty ? webp : variants;
+    final sorted = [...pool]..sort((a, b) => a.width.compareTo(b.width));
+    return sorted.firstWhere((v) => v.width >= pixelWidth, orElse: () => sorted.last);
+  }
+}
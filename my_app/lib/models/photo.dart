@@ -1,4 +1,5 @@
 import 'comment.dart';
+import 'media_variant.dart';
 
 enum MediaType { photo, video }
 
@@ -7,6 +8,7 @@ class Photo {
   final String dogId;
   final String url;
   final String? thumbnailUrl;
+  final List<MediaVariant> variants;
   final MediaType mediaType;
   final DateTime takenAt;
   final List<Comment> comments;
@@ -16,6 +18,7 @@ class Photo {
     required this.dogId,
     required this.url,
     this.thumbnailUrl,
+    this.variants = const [],
     this.mediaType = MediaType.photo,
     required this.takenAt,
     required this.comments,
@@ -27,6 +30,7 @@ class Photo {
       dogId: json['dog'].toString(),
       url: json['file'],
       thumbnailUrl: json['thumbnail'],
+      variants: MediaVariant.listFromJson(json['variants']),
       mediaType: json['media_type'] == 'VIDEO' ? MediaType.video : MediaType.photo,
       takenAt: DateTime.parse(json['taken_at']),
       comments: (json['comments'] as List? ?? [])
@@ -36,4 +40,9 @@ class Photo {
   }
 
   bool get isVideo => mediaType == MediaType.video;
+
+  /// The best image URL for a slot [pixelWidth] physical pixels wide; the
+  /// full file until variants exist.
+  String imageUrlFor(int pixelWidth) =>
+      MediaVariant.pick(variants, pixelWidth)?.url ?? url;
 }
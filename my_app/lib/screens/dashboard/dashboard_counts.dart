@@ -1,7 +1,6 @@
 import 'package:flutter/foundation.dart';
 
 import '../../models/boarding_request.dart';
-import '../../models/date_change_request.dart';
 import '../../services/data_service.dart';
 
 /// Owns the dashboard's action-item counts and the "boarding tonight" list.
@@ -13,9 +12,9 @@ import '../../services/data_service.dart';
 /// individual `reloadX` methods back the per-screen refreshes the screen runs
 /// after returning from a detail screen.
 ///
-/// Endpoints and semantics are unchanged: each loader hits the same
-/// [DataService] method and swallows errors silently (leaving the previous
-/// value in place) exactly as before.
+/// The action-item counts all come from one `/api/badges/` request (or the
+/// dashboard payload); loaders swallow errors silently, leaving the previous
+/// value in place.
 class DashboardCounts extends ChangeNotifier {
   DashboardCounts({
     required DataService dataService,
@@ -27,12 +26,11 @@ class DashboardCounts extends ChangeNotifier {
   final DataService _dataService;
 
   /// Whether this user can see the website inquiry queue. Gates
-  /// [reloadUnreadInquiryCount] in [refresh] exactly as the screen did.
+  /// [unreadInquiryCount].
   final bool canViewInquiries;
 
   /// Whether this user can manage requests (and therefore see the dog
-  /// profile-change queue). Gates [reloadPendingProfileChangeCount] in
-  /// [refresh].
+  /// profile-change queue). Gates [pendingProfileChangeCount].
   final bool canManageRequests;
 
   /// Whether this user can manage boarding requests. Gates the pending
@@ -79,19 +77,22 @@ class DashboardCounts extends ChangeNotifier {
     if (!_disposed) notifyListeners();
   }
 
-  /// Loads every count in parallel, mirroring the screen's old
-  /// `_loadDashboardData`: the same calls fired without awaiting each other,
-  /// with the inquiry and profile-change loads gated behind their permissions.
+  /// Loads every count in parallel: one `/api/badges/` request for the
+  /// action-item counts, plus the boarding list and unspayed males.
   Future<void> refresh() async {
     await Future.wait([
-      reloadPendingRequestCount(),
-      reloadUnresolvedQueryCount(),
-      if (canViewInquiries) reloadUnreadInquiryCount(),
+      reloadBadges(),
+      reloadBoarding(),
+      reloadUnspayedMales(),
+    ]);
+  }
+
+  /// The loads `/api/dashboard/` doesn't cover. The screen runs these on open
+  /// and takes the badges from [applyBadgeCounts]; [refresh] still reloads
+  /// everything, for when the dashboard call fails.
+  Future<void> refreshNotInDashboard() async {
+    await Future.wait([
       reloadBoarding(),
-      if (canManageRequests) reloadPendingProfileChangeCount(),
-      reloadUnresolvedDefectCount(),
-      reloadUnresolvedVehicleDefectCount(),
-      reloadOpenIncidentCount(),
       reloadUnspayedMales(),
     ]);
   }
@@ -105,72 +106,40 @@ class DashboardCounts extends ChangeNotifier {
     } catch (_) {}
   }
 
-  Future<void> reloadPendingProfileChangeCount() async {
-    try {
-      final count = await _dataService.getPendingDogProfileChangeCount();
-      pendingProfileChangeCount = count;
-      _safeNotify();
-    } catch (_) {}
-  }
-
-  Future<void> reloadPendingRequestCount() async {
-    try {
-      final dateRequests = await _dataService.getDateChangeRequests();
-      final pendingDateCount =
-          dateRequests.where((r) => r.status == RequestStatus.pending).length;
-      // Pending boardings only alert staff who can act on them.
-      var pendingBoarding = 0;
-      if (canManageBoarding) {
-        final boardingRequests = await _dataService.getBoardingRequests();
-        pendingBoarding = boardingRequests
-            .where((r) => r.status == BoardingRequestStatus.pending)
-            .length;
-      }
-      pendingRequestCount = pendingDateCount + pendingBoarding;
-      pendingBoardingCount = pendingBoarding;
-      _safeNotify();
-    } catch (_) {}
-  }
-
-  Future<void> reloadUnresolvedQueryCount() async {
-    try {
-      final count = await _dataService.getUnresolvedQueryCount();
-      unresolvedQueryCount = count;
-      _safeNotify();
-    } catch (_) {}
-  }
-
-  Future<void> reloadUnresolvedDefectCount() async {
+  /// Every badge at once. The server only returns the badges this user may
+  /// see; the permission gates below keep the rest at zero regardless.
+  Future<void> reloadBadges() async {
     try {
-      final count = await _dataService.getUnresolvedFacilityDefectCount();
-      unresolvedDefectCount = count;
-      _safeNotify();
+      applyBadgeCounts(await _dataService.getBadgeCounts());
     } catch (_) {}
   }
 
-  Future<void> reloadUnresolvedVehicleDefectCount() async {
-    try {
-      final count = await _dataService.getUnresolvedVehicleDefectCount();
-      unresolvedVehicleDefectCount = count;
-      _safeNotify();
-    } catch (_) {}
+  /// Takes the counts from a `/api/badges/` response or the `counts` of a
+  /// [StaffDashboard] — the two use the same keys.
+  void applyBadgeCounts(Map<String, int> counts) {
+    pendingBoardingCount = canManageBoarding ? counts['pending_boarding_requests'] ?? 0 : 0;
+    pendingRequestCount = (counts['pending_date_requests'] ?? 0) + pendingBoardingCount;
+    unresolvedQueryCount = counts['unresolved_queries'] ?? 0;
+    if (canViewInquiries) unreadInquiryCount = counts['unread_inquiries'] ?? 0;
+    if (canManageRequests) {
+      pendingProfileChangeCount = counts['pending_profile_changes'] ?? 0;
+    }
+    unresolvedDefectCount = counts['unresolved_facility_defects'] ?? 0;
+    unresolvedVehicleDefectCount = counts['unresolved_vehicle_defects'] ?? 0;
+    openIncidentCount = counts['open_incidents'] ?? 0;
+    _safeNotify();
   }
 
-  Future<void> reloadOpenIncidentCount() async {
-    try {
-      final count = await _dataService.getOpenIncidentCount();
-      openIncidentCount = count;
-      _safeNotify();
-    } catch (_) {}
-  }
-
-  Future<void> reloadUnreadInquiryCount() async {
-    try {
-      final count = await _dataService.getUnreadInquiryCount();
-      unreadInquiryCount = count;
-      _safeNotify();
-    } catch (_) {}
-  }
+  // The per-screen refreshes the screen runs after returning from a detail
+  // screen. Each badge comes with all the others now, so they all reload the
+  // lot — still one request.
+  Future<void> reloadPendingProfileChangeCount() => reloadBadges();
+  Future<void> reloadPendingRequestCount() => reloadBadges();
+  Future<void> reloadUnresolvedQueryCount() => reloadBadges();
+  Future<void> reloadUnresolvedDefectCount() => reloadBadges();
+  Future<void> reloadUnresolvedVehicleDefectCount() => reloadBadges();
+  Future<void> reloadOpenIncidentCount() => reloadBadges();
+  Future<void> reloadUnreadInquiryCount() => reloadBadges();
 
   Future<void> reloadBoarding() async {
     try {
@@ -33,7 +33,7 @@ class _FeedScreenState extends State<FeedScreen> with RouteAware, WidgetsBinding
   bool _loading = true;
   bool _loadingMore = false;
   bool _hasMore = true;
-  int _page = 1;
+  String? _nextCursor;
   bool _hasScrolledToPost = false;
   bool _showFilters = false;
   DateTimeRange? _dateRange;
@@ -142,11 +142,11 @@ class _FeedScreenState extends State<FeedScreen> with RouteAware, WidgetsBinding
     }
 
     try {
-      final result = await _dataService.getFeedPage(dogId: _selectedDogId, page: 1);
+      final result = await _dataService.getFeedPage(dogId: _selectedDogId, cursor: '');
       if (mounted) {
         setState(() {
           _feed = result.items;
-          _page = 1;
+          _nextCursor = result.nextCursor;
           _hasMore = result.hasMore;
           _loading = false;
           _recomputeFilteredFeed();
@@ -173,17 +173,17 @@ class _FeedScreenState extends State<FeedScreen> with RouteAware, WidgetsBinding
 
   /// Append the next page of the feed for infinite scrolling.
   Future<void> _loadMore() async {
-    if (_loadingMore || !_hasMore || _loading) return;
+    if (_loadingMore || !_hasMore || _loading || _nextCursor == null) return;
     setState(() => _loadingMore = true);
     try {
       final result =
-          await _dataService.getFeedPage(dogId: _selectedDogId, page: _page + 1);
+          await _dataService.getFeedPage(dogId: _selectedDogId, cursor: _nextCursor);
       if (mounted) {
         setState(() {
           // Guard against duplicates if pages shift between requests.
           final existingIds = _feed.map((m) => m.id).toSet();
           _feed.addAll(result.items.where((m) => !existingIds.contains(m.id)));
-          _page += 1;
+          _nextCursor = result.nextCursor;
           _hasMore = result.hasMore;
           _loadingMore = false;
           _recomputeFilteredFeed();
@@ -459,7 +459,11 @@ class _FullScreenImageViewerState extends State<FullScreenImageViewer> {
                         maxScale: 4.0,
                         child: Center(
                           child: CachedNetworkImage(
-                            imageUrl: photo.url,
+                            imageUrl: photo.imageUrlFor(
+                              (MediaQuery.of(context).size.width *
+                                      MediaQuery.of(context).devicePixelRatio)
+                                  .round(),
+                            ),
                             placeholder: (context, url) => const Center(child: CircularProgressIndicator()),
                             errorWidget: (context, url, error) => Picon(PiconsDuotone.warningCircle),
                           ),
@@ -5,8 +5,6 @@ import 'package:package_info_plus/package_info_plus.dart';
 import 'package:upgrader/upgrader.dart';
 import '../constants/app_colors.dart';
 import '../models/dog.dart';
-import '../models/date_change_request.dart';
-import '../models/boarding_request.dart';
 import '../models/intake_request.dart';
 import '../services/data_service.dart';
 import '../services/service_locator.dart';
@@ -241,15 +239,11 @@ class _HomeScreenState extends State<HomeScreen> with WidgetsBindingObserver {
           // Warm the offline caches (route + dog photos) while on WiFi, so
           // the app keeps working through signal dead zones mid-route.
           getIt<OfflinePrefetchService>().prefetchForToday();
-          await _loadPendingRequestCount();
           await _notificationService.subscribeToTopic('staff_notifications');
         } else {
           await _notificationService.unsubscribeFromTopic('staff_notifications');
         }
-        await _loadUnresolvedQueryCount();
-        if (profile.isStaff && profile.canViewInquiries) {
-          await _loadUnreadInquiryCount();
-        }
+        await _loadBadges();
         // Handle deep-link navigation after permissions are known
         _handleInitialRoute();
       }
@@ -268,50 +262,28 @@ class _HomeScreenState extends State<HomeScreen> with WidgetsBindingObserver {
     }
   }
 
-  Future<void> _loadPendingRequestCount() async {
-    if (!_isStaff) return;
-    try {
-      final dateRequests = await _dataService.getDateChangeRequests();
-      final pendingDateCount = dateRequests.where((r) => r.status == RequestStatus.pending).length;
-
-      // Pending boardings only alert staff who can act on them.
-      var pendingBoardingCount = 0;
-      if (_canManageBoarding) {
-        final boardingRequests = await _dataService.getBoardingRequests();
-        pendingBoardingCount = boardingRequests.where((r) => r.status == BoardingRequestStatus.pending).length;
-      }
-
-      if (mounted) {
-        setState(() => _pendingRequestCount = pendingDateCount + pendingBoardingCount);
-      }
-    } catch (e) {
-      // Ignore errors
-    }
-  }
-
-  Future<void> _loadUnresolvedQueryCount() async {
+  /// The home screen's badges — pending requests, support replies and unread
+  /// inquiries — from one `/api/badges/` request. The server only sends the
+  /// badges this user may see.
+  Future<void> _loadBadges() async {
     try {
-      final count = await _dataService.getUnresolvedQueryCount();
-      if (mounted) {
-        setState(() => _unresolvedQueryCount = count);
-      }
-    } catch (_) {}
-  }
-
-  Future<void> _loadUnreadInquiryCount() async {
-    try {
-      final count = await _dataService.getUnreadInquiryCount();
-      if (mounted) {
-        setState(() => _unreadInquiryCount = count);
-      }
+      final counts = await _dataService.getBadgeCounts();
+      if (!mounted) return;
+      setState(() {
+        _unresolvedQueryCount = counts['unresolved_queries'] ?? 0;
+        if (_isStaff) {
+          // Pending boardings only alert staff who can act on them.
+          _pendingRequestCount = (counts['pending_date_requests'] ?? 0) +
+              (_canManageBoarding ? counts['pending_boarding_requests'] ?? 0 : 0);
+        }
+        if (_canViewInquiries) _unreadInquiryCount = counts['unread_inquiries'] ?? 0;
+      });
     } catch (_) {}
   }
 
   void _refresh() {
     _loadDogs();
-    _loadPendingRequestCount();
-    _loadUnresolvedQueryCount();
-    if (_canViewInquiries) _loadUnreadInquiryCount();
+    _loadBadges();
   }
 
   /// Navigate to the deep-link target screen after profile/permissions are loaded.
@@ -480,7 +452,7 @@ class _HomeScreenState extends State<HomeScreen> with WidgetsBindingObserver {
                       context,
                       MaterialPageRoute(builder: (_) => StaffNotificationsScreen(canManageRequests: _canManageRequests, canManageBoarding: _canManageBoarding)),
                     );
-                    _loadPendingRequestCount();
+                    _loadBadges();
                   },
                 ),
                 if (_pendingRequestCount > 0)
@@ -660,7 +632,7 @@ class _HomeScreenState extends State<HomeScreen> with WidgetsBindingObserver {
                       ),
                     ),
                   );
-                  _loadUnresolvedQueryCount();
+                  _loadBadges();
                 },
               ),
               ListTile(
@@ -696,7 +668,7 @@ class _HomeScreenState extends State<HomeScreen> with WidgetsBindingObserver {
                         builder: (_) => const InquiryListScreen(),
                       ),
                     );
-                    _loadUnreadInquiryCount();
+                    _loadBadges();
                   },
                 ),
               if (_isStaff)
@@ -125,6 +125,14 @@ class _PickupMapScreenState extends State<PickupMapScreen> with SingleTickerProv
   Timer? _refreshTimer;
   static const Duration _autoRefreshInterval = Duration(seconds: 30);
 
+  // While the day-board stream is open the route is re-pulled when it reports
+  // a change instead, and the timer's ticks are skipped. A burst of events
+  // (a whole round marked picked up) is coalesced into one reload.
+  StreamSubscription<DayBoardEvent>? _liveSub;
+  bool _live = false;
+  Timer? _liveRetry;
+  Timer? _liveDebounce;
+
   @override
   void initState() {
     super.initState();
@@ -144,6 +152,7 @@ class _PickupMapScreenState extends State<PickupMapScreen> with SingleTickerProv
   void dispose() {
     _saveFilters();
     _refreshTimer?.cancel();
+    _stopLive();
     WidgetsBinding.instance.removeObserver(this);
     _routeAnim.dispose();
     super.dispose();
@@ -159,12 +168,45 @@ class _PickupMapScreenState extends State<PickupMapScreen> with SingleTickerProv
     } else {
       _routeAnim.stop();
       _refreshTimer?.cancel();
+      _stopLive();
     }
   }
 
   void _startAutoRefresh() {
     _refreshTimer?.cancel();
-    _refreshTimer = Timer.periodic(_autoRefreshInterval, (_) => _autoRefresh());
+    _refreshTimer = Timer.periodic(_autoRefreshInterval, (_) {
+      if (!_live) _autoRefresh();
+    });
+    _startLive();
+  }
+
+  void _startLive() {
+    _stopLive();
+    _liveSub = _dataService.watchDayBoard(date: widget.date).listen(
+      (event) {
+        // `ready` also follows a reconnect: catch up on what was missed.
+        if (event.event == 'ready') _live = true;
+        _liveDebounce?.cancel();
+        _liveDebounce = Timer(const Duration(milliseconds: 500), _autoRefresh);
+      },
+      onError: (_) => _liveDropped(),
+      onDone: _liveDropped,
+      cancelOnError: true,
+    );
+  }
+
+  void _liveDropped() {
+    _live = false;
+    _liveRetry?.cancel();
+    if (mounted) _liveRetry = Timer(const Duration(seconds: 15), _startLive);
+  }
+
+  void _stopLive() {
+    _live = false;
+    _liveSub?.cancel();
+    _liveSub = null;
+    _liveRetry?.cancel();
+    _liveDebounce?.cancel();
   }
 
   /// Silent background refresh for the live view — no spinner, no error
@@ -121,6 +121,10 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
   // used to live here; the screen listens and rebuilds (see [_onCountsChanged]).
   late final DashboardCounts _counts;
 
+  // Whether a dashboard payload has filled [_counts]; until one has, a failed
+  // dashboard call loads the counts one endpoint at a time.
+  bool _countsFromDashboard = false;
+
   @override
   void initState() {
     super.initState();
@@ -136,10 +140,13 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
     // only. Falls through to the next day in the strip when today is pruned as
     // a closure.
     _selectedDate = _defaultDate(_dateOptions, anchor);
-    _loadStaffMembers();
+    // The opening day's dashboard call also brings the staff list and most
+    // counts; _loadDay falls back to the individual loaders if it fails.
+    _loadAvailableStaff(_selectedDate);
+    _loadStaffCoverage();
     _loadDay(_selectedDate);
     _loadClosureDays();
-    _counts.refresh();
+    _counts.refreshNotInDashboard();
     // Refresh automatically when signal returns mid-route, so stale
     // cache-served data clears without a manual pull.
     ConnectivityStatus().isOnline.addListener(_onConnectivityChanged);
@@ -291,13 +298,15 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
   }
 
   /// Loads everything the dashboard shows for [date] — assignments, unassigned
-  /// dogs and compatibility conflicts — into a single [DayData] entry, together
-  /// with its loading/error state. This is the one place that populates the
-  /// per-day cache.
+  /// dogs, compatibility conflicts and roadworks — into a single [DayData]
+  /// entry, together with its loading/error state. This is the one place that
+  /// populates the per-day cache.
   ///
-  /// Skips work if the day is already loaded unless [force] is set. The
-  /// unassigned-dog and conflict fetches run alongside the assignment fetch and
-  /// fold their results into the same [DayData].
+  /// Skips work if the day is already loaded unless [force] is set. One
+  /// `/api/dashboard/` request normally brings the whole day (plus the staff
+  /// list and action-item counts); if it fails — offline, or a server without
+  /// it — the per-section fetches below run instead, and the assignment fetch
+  /// serves the offline copy.
   Future<void> _loadDay(DateTime date, {bool force = false, bool prefetchAdjacent = true}) async {
     if (!mounted) return;
     final key = _dayKey(date);
@@ -333,6 +342,32 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
           loading: true, clearError: true, closure: closure, clearClosure: closure == null);
     });
 
+    try {
+      final dashboard = await _dataService.getStaffDashboard(date: date);
+      if (mounted) {
+        setState(() {
+          _dayCache[key] = _dayData(date).copyWith(
+              assignments: dashboard.assignments,
+              unassignedDogs: dashboard.unassignedDogs,
+              unassignedFailed: false,
+              conflicts: dashboard.conflicts,
+              conflictsFailed: false,
+              roadworks: dashboard.roadworks,
+              loading: false,
+              loaded: true,
+              clearError: true,
+              clearCachedAt: true);
+        });
+        _applyDashboardExtras(dashboard);
+      }
+      if (prefetchAdjacent) _prefetchAdjacentDates(date);
+      return;
+    } catch (e) {
+      debugPrint('Dashboard call failed, loading sections separately: $e');
+    }
+    if (_staffMembers.isEmpty) _loadStaffMembers();
+    if (!_countsFromDashboard) _counts.refresh();
+
     // Assignments — drives the loading/error state shown by the day view.
     try {
       final assignments = await _dataService.getTodayAssignments(date: date);
@@ -387,6 +422,16 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
     if (prefetchAdjacent) _prefetchAdjacentDates(date);
   }
 
+  /// The parts of a dashboard payload that aren't per-day: the staff list
+  /// (once) and the action-item counts.
+  void _applyDashboardExtras(StaffDashboard dashboard) {
+    if (_staffMembers.isEmpty && dashboard.staffMembers.isNotEmpty) {
+      setState(() => _staffMembers = dashboard.staffMembers);
+    }
+    _countsFromDashboard = true;
+    _counts.applyBadgeCounts(dashboard.counts);
+  }
+
   /// Silently loads the dates either side of [date] so the next swipe
   /// already has data and avoids the skeleton-loader artifact.
   void _prefetchAdjacentDates(DateTime date) {
@@ -1055,8 +1100,9 @@ class UnifiedDashboardScreenState extends State<UnifiedDashboardScreen> {
           Expanded(
             child: RefreshIndicator.adaptive(
               onRefresh: () async {
+                // The forced day load re-reads the counts it covers.
                 await _loadDay(_selectedDate, force: true);
-                await _counts.refresh();
+                await _counts.refreshNotInDashboard();
               },
               child: ListView(
                 physics: const AlwaysScrollableScrollPhysics(),
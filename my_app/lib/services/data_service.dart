@@ -6,6 +6,7 @@ import 'http_client.dart' as http;
 import 'package:http_parser/http_parser.dart' as http_parser;
 import '../models/dog.dart';
 import '../models/photo.dart';
+import '../models/comment.dart';
 import '../models/user_profile.dart';
 import '../models/date_change_request.dart';
 import '../models/owner_profile.dart';
@@ -49,7 +50,8 @@ class _ParsedFeedPage {
   final List<gm.GroupMedia> items;
   final List<Map<String, dynamic>> rawItems;
   final bool hasMore;
-  const _ParsedFeedPage(this.items, this.rawItems, this.hasMore);
+  final String? nextCursor;
+  const _ParsedFeedPage(this.items, this.rawItems, this.hasMore, this.nextCursor);
 }
 
 /// Decodes a feed-endpoint response body and parses it into models.
@@ -62,9 +64,11 @@ _ParsedFeedPage _parseFeedResponseBody(String body) {
   final decoded = json.decode(body);
   List<dynamic> results;
   bool hasMore;
+  String? nextCursor;
   if (decoded is Map<String, dynamic> && decoded.containsKey('results')) {
     results = decoded['results'] as List<dynamic>;
     hasMore = decoded['next'] != null;
+    if (hasMore) nextCursor = Uri.parse(decoded['next']).queryParameters['cursor'];
   } else {
     // Unpaginated fallback: a plain array is the whole feed.
     results = decoded as List<dynamic>;
@@ -72,7 +76,7 @@ _ParsedFeedPage _parseFeedResponseBody(String body) {
   }
   final rawItems = results.cast<Map<String, dynamic>>();
   final items = rawItems.map((j) => gm.GroupMedia.fromJson(j)).toList();
-  return _ParsedFeedPage(items, rawItems, hasMore);
+  return _ParsedFeedPage(items, rawItems, hasMore, nextCursor);
 }
 
 /// Whether a picked file should be treated as a video, by extension.
@@ -1102,11 +1106,16 @@ class ApiDataService implements DataService {
   /// The backend paginates the feed endpoint (`{count, next, previous,
   /// results}`), but this also tolerates a plain JSON array in case the API is
   /// unpaginated. Only the first page is cached, for offline warm-start.
-  Future<FeedPage> getFeedPage({String? dogId, int page = 1}) async {
+  ///
+  /// With [cursor] (`''` for the first page, then [FeedPage.nextCursor]) the
+  /// feed is paged by cursor instead of page number, which stays fast however
+  /// far down the user scrolls.
+  Future<FeedPage> getFeedPage({String? dogId, int page = 1, String? cursor}) async {
     final cache = CacheService();
+    final firstPage = cursor == null ? page == 1 : cursor.isEmpty;
     try {
       final headers = await _getHeaders();
-      final params = <String, String>{'page': '$page'};
+      final params = cursor == null ? <String, String>{'page': '$page'} : <String, String>{'cursor': cursor};
       if (dogId != null) params['dog_id'] = dogId;
       final url = Uri.parse('${AuthService.baseUrl}/api/feed/')
           .replace(queryParameters: params);
@@ -1115,14 +1124,14 @@ class ApiDataService implements DataService {
       if (response.statusCode == 200) {
         // Decode + parse off the UI isolate to keep feed loads/refreshes smooth.
         final parsed = await compute(_parseFeedResponseBody, response.body);
-        if (page == 1) cache.cacheFeed(parsed.rawItems);
-        return FeedPage(items: parsed.items, hasMore: parsed.hasMore);
+        if (firstPage) cache.cacheFeed(parsed.rawItems);
+        return FeedPage(items: parsed.items, hasMore: parsed.hasMore, nextCursor: parsed.nextCursor);
       } else {
         throw Exception('Failed to load feed');
       }
     } catch (e) {
       // Offline: fall back to the cached first page only.
-      if (page == 1) {
+      if (firstPage) {
         final cached = cache.getCachedFeed();
         if (cached != null && cached.isNotEmpty) {
           return FeedPage(
@@ -1334,6 +1343,26 @@ class ApiDataService implements DataService {
     }
   }
 
+  /// One page of a feed post's comments, oldest first. The feed carries
+  /// only the newest few; pass [CommentPage.nextCursor] back for the rest.
+  @override
+  Future<CommentPage> getFeedComments(String mediaId, {String? cursor}) async {
+    final headers = await _getHeaders();
+    final url = Uri.parse('${AuthService.baseUrl}/api/feed/$mediaId/comments/')
+        .replace(queryParameters: cursor == null ? null : {'cursor': cursor});
+    final response = await http.get(url, headers: headers, timeout: _readTimeout);
+
+    if (response.statusCode != 200) {
+      throw Exception('Failed to load comments');
+    }
+    final decoded = json.decode(response.body) as Map<String, dynamic>;
+    final next = decoded['next'] as String?;
+    return CommentPage(
+      items: (decoded['results'] as List).map((c) => Comment.fromJson(c)).toList(),
+      nextCursor: next == null ? null : Uri.parse(next).queryParameters['cursor'],
+    );
+  }
+
   @override
   Future<void> deleteComment(String commentId) async {
     final headers = await _getHeaders();
@@ -1598,6 +1627,34 @@ class ApiDataService implements DataService {
     }
   }
 
+  @override
+  Future<StaffDashboard> getStaffDashboard({DateTime? date}) async {
+    final response = await _get(Uri.parse('${AuthService.baseUrl}/api/dashboard/${_dateParam(date)}'));
+    if (response.statusCode != 200) {
+      throw Exception('Failed to load dashboard: ${response.statusCode}');
+    }
+    final data = json.decode(response.body) as Map<String, dynamic>;
+    final assignments = (data['assignments'] as List<dynamic>).cast<Map<String, dynamic>>();
+    // Same offline copy getTodayAssignments keeps, so the route still opens
+    // without signal.
+    await CacheService().cacheAssignments(date ?? DateTime.now(), assignments);
+    Map<String, int> ints(dynamic m) =>
+        (m as Map<String, dynamic>? ?? {}).map((k, v) => MapEntry(k, (v as num?)?.toInt() ?? 0));
+    return StaffDashboard(
+      assignments: assignments.map((j) => DailyDogAssignment.fromJson(j)).toList(),
+      unassignedDogs: _parseDogsList(data['unassigned_dogs'] as List<dynamic>),
+      conflicts: (data['conflicts'] as List<dynamic>)
+          .map((c) => CompatibilityConflict.fromJson(c as Map<String, dynamic>))
+          .toList(),
+      roadworks: (data['roadworks'] as List<dynamic>)
+          .map((e) => RoadworkIssue.fromJson(Map<String, dynamic>.from(e as Map)))
+          .toList(),
+      staffMembers: (data['staff_members'] as List<dynamic>).cast<Map<String, dynamic>>(),
+      counts: ints(data['counts']),
+      mediaStats: ints(data['media_stats']),
+    );
+  }
+
   @override
   Future<List<CompatibilityConflict>> getCompatibilityConflicts({DateTime? date}) async {
     final response = await _get(Uri.parse('${AuthService.baseUrl}/api/daily-assignments/compatibility_conflicts/${_dateParam(date)}'));
@@ -2140,6 +2197,74 @@ class ApiDataService implements DataService {
     }
   }
 
+  @override
+  Future<Map<String, int>> getBadgeCounts() async {
+    final response = await _get(Uri.parse('${AuthService.baseUrl}/api/badges/'));
+    if (response.statusCode == 200) {
+      final data = json.decode(response.body) as Map<String, dynamic>;
+      return data.map((k, v) => MapEntry(k, (v as num?)?.toInt() ?? 0));
+    }
+    throw Exception('Failed to load badge counts: ${response.statusCode}');
+  }
+
+  @override
+  Stream<DayBoardEvent> watchDayBoard({DateTime? date}) async* {
+    final request = http.Request(
+      'GET', Uri.parse('${AuthService.baseUrl}/api/live/day-board/${_dateParam(date)}'),
+    )
+      ..headers.addAll(await _getHeaders())
+      ..headers['Accept'] = 'text/event-stream';
+    final client = http.Client();
+    try {
+      final response = await client.send(request);
+      if (response.statusCode != 200) {
+        throw Exception('Failed to open the live day board: ${response.statusCode}');
+      }
+      // Server-Sent Events: `event:` and `data:` lines, a blank line ending
+      // each event; `:` lines are keep-alives.
+      String? event;
+      final data = StringBuffer();
+      final lines = response.stream.transform(utf8.decoder).transform(const LineSplitter());
+      await for (final line in lines) {
+        if (line.isEmpty) {
+          if (event != null && data.isNotEmpty) {
+            yield DayBoardEvent.fromJson(event, json.decode(data.toString()) as Map<String, dynamic>);
+          }
+          event = null;
+          data.clear();
+        } else if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          data.write(line.substring(5).trim());
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
+  @override
+  Future<SyncDelta> getChanges({int? since}) async {
+    final query = since == null ? '' : '?since=$since';
+    final response = await _get(Uri.parse('${AuthService.baseUrl}/api/sync/$query'));
+    if (response.statusCode != 200) {
+      throw Exception('Failed to sync changes: ${response.statusCode}');
+    }
+    final data = json.decode(response.body) as Map<String, dynamic>;
+    return SyncDelta(
+      token: (data['token'] as num).toInt(),
+      hasMore: data['has_more'] == true,
+      reset: data['reset'] == true,
+      changes: (data['changes'] as Map<String, dynamic>).map((resource, c) {
+        final m = c as Map<String, dynamic>;
+        return MapEntry(resource, SyncChanges(
+          upserts: (m['upserts'] as List<dynamic>).cast<Map<String, dynamic>>(),
+          deletes: (m['deletes'] as List<dynamic>).map((id) => (id as num).toInt()).toList(),
+        ));
+      }),
+    );
+  }
+
   @override
   Future<Map<String, int>> getFeedTodayStats() async {
     final response = await _get(Uri.parse('${AuthService.baseUrl}/api/group-media/today_stats/'));
@@ -3410,10 +3535,28 @@ class ApiDataService implements DataService {
       headers: headers,
       body: json.encode({'year': year, 'month': month}),
     );
-    if (response.statusCode == 200) {
-      return json.decode(response.body)['sent'] as int;
+    if (response.statusCode != 202) {
+      throw Exception(_invoiceError(response, 'Failed to send invoices'));
+    }
+    // The server queues a send job and a worker pushes the invoices to Xero;
+    // poll the job until it finishes.
+    var job = json.decode(response.body) as Map<String, dynamic>;
+    final deadline = DateTime.now().add(const Duration(minutes: 10));
+    while (job['status'] != 'DONE') {
+      if (DateTime.now().isAfter(deadline)) {
+        throw Exception('Invoices are still sending in the background — check back shortly.');
+      }
+      await Future.delayed(const Duration(seconds: 2));
+      final poll = await http.get(
+        Uri.parse('${AuthService.baseUrl}/api/invoices/send_jobs/${job['id']}/'),
+        headers: headers,
+      );
+      if (poll.statusCode != 200) {
+        throw Exception(_invoiceError(poll, 'Failed to check sending progress'));
+      }
+      job = json.decode(poll.body) as Map<String, dynamic>;
     }
-    throw Exception(_invoiceError(response, 'Failed to send invoices'));
+    return job['sent'] as int;
   }
 
   @override
@@ -20,7 +20,17 @@ class UnspayedMaleSummary {
 class FeedPage {
   final List<gm.GroupMedia> items;
   final bool hasMore;
-  const FeedPage({required this.items, required this.hasMore});
+
+  /// Pass back as `cursor` to fetch the next page (cursor mode only).
+  final String? nextCursor;
+  const FeedPage({required this.items, required this.hasMore, this.nextCursor});
+}
+
+/// One page of a feed post's comments; [nextCursor] is null on the last.
+class CommentPage {
+  final List<Comment> items;
+  final String? nextCursor;
+  const CommentPage({required this.items, this.nextCursor});
 }
 
 class UnspayedMalesResult {
@@ -64,3 +74,81 @@ class CompatibilityConflict {
     );
   }
 }
+
+/// Everything the staff dashboard opens with for one date, from
+/// `/api/dashboard/` — the roster, unassigned dogs, conflicts, roadworks,
+/// action-item counts and staff list that used to take ten requests.
+class StaffDashboard {
+  final List<DailyDogAssignment> assignments;
+  final List<Dog> unassignedDogs;
+  final List<CompatibilityConflict> conflicts;
+  final List<RoadworkIssue> roadworks;
+  final List<Map<String, dynamic>> staffMembers;
+
+  /// Action-item counts keyed as the server sends them, e.g.
+  /// `pending_date_requests`, `open_incidents`.
+  final Map<String, int> counts;
+  final Map<String, int> mediaStats;
+
+  const StaffDashboard({
+    required this.assignments,
+    required this.unassignedDogs,
+    required this.conflicts,
+    required this.roadworks,
+    required this.staffMembers,
+    required this.counts,
+    required this.mediaStats,
+  });
+}
+
+/// A change to one day's board, pushed by `/api/live/day-board/`.
+class DayBoardEvent {
+  /// `ready` (the stream is open), `status`, `assignment`, `reorder` or
+  /// `removed`.
+  final String event;
+  final String date;
+
+  /// The assignments affected; null when the whole day should be reloaded.
+  final List<int>? ids;
+
+  const DayBoardEvent({required this.event, required this.date, this.ids});
+
+  factory DayBoardEvent.fromJson(String event, Map<String, dynamic> json) => DayBoardEvent(
+        event: event,
+        date: json['date'] as String? ?? '',
+        ids: (json['ids'] as List<dynamic>?)?.map((id) => (id as num).toInt()).toList(),
+      );
+}
+
+/// One resource's share of a [SyncDelta]: the rows to insert or replace
+/// (as the resource's list endpoint renders them) and the ids to drop.
+class SyncChanges {
+  final List<Map<String, dynamic>> upserts;
+  final List<int> deletes;
+
+  const SyncChanges({required this.upserts, required this.deletes});
+}
+
+/// What changed since a sync token, from `/api/sync/`.
+class SyncDelta {
+  /// Pass as `since` on the next call.
+  final int token;
+
+  /// More changes are waiting — sync again straight away.
+  final bool hasMore;
+
+  /// The token was missing or too old: refetch the full lists, then carry on
+  /// from [token].
+  final bool reset;
+
+  /// Keyed by resource: `dogs`, `assignments`, `notes`, `boarding_requests`,
+  /// `date_change_requests`. Only resources that changed are present.
+  final Map<String, SyncChanges> changes;
+
+  const SyncDelta({
+    required this.token,
+    required this.hasMore,
+    required this.reset,
+    required this.changes,
+  });
+}
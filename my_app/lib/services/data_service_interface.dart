@@ -53,7 +53,7 @@ abstract class DataService {
   /// calendar's past booked days so payment managers can edit history.
   Future<List<DateTime>> getDogPastAttendance(String dogId, {DateTime? from});
   Future<List<gm.GroupMedia>> getFeed({String? dogId});
-  Future<FeedPage> getFeedPage({String? dogId, int page = 1});
+  Future<FeedPage> getFeedPage({String? dogId, int page = 1, String? cursor});
   Future<void> uploadGroupMedia({
     required Uint8List fileBytes,
     required String fileName,
@@ -75,6 +75,7 @@ abstract class DataService {
   Future<gm.GroupMedia> updateGroupMedia(String mediaId, {String? caption, List<String>? taggedDogIds});
   Future<gm.GroupMedia> toggleReaction(String mediaId, String emoji);
   Future<void> addComment(String mediaId, String text, {bool isProfilePhoto = false});
+  Future<CommentPage> getFeedComments(String mediaId, {String? cursor});
   Future<void> deleteComment(String commentId);
   Future<List<BoardingRequest>> getBoardingRequests();
   Future<void> updateBoardingRequestStatus(int requestId, String status, {int? assignedStaffId});
@@ -133,6 +134,11 @@ abstract class DataService {
   Future<void> reorderAssignments(List<int> assignmentIds);
   Future<List<CompatibilityConflict>> getCompatibilityConflicts({DateTime? date});
 
+  /// The dashboard's whole opening payload for [date] in one request. Staff
+  /// only. Unlike [getTodayAssignments] it never falls back to the offline
+  /// copy — callers fall back to the per-section methods instead.
+  Future<StaffDashboard> getStaffDashboard({DateTime? date});
+
   // Support Queries
   Future<List<SupportQuery>> getSupportQueries();
   Future<SupportQuery> getSupportQuery(int queryId);
@@ -152,6 +158,22 @@ abstract class DataService {
   Future<void> deleteInquiry(int inquiryId);
   Future<int> getUnreadInquiryCount();
 
+  // Badges
+  /// Every action-item badge this user may see, keyed as the server sends
+  /// them (`unresolved_queries`, `open_incidents`, …), in one request.
+  Future<Map<String, int>> getBadgeCounts();
+
+  // Live day board
+  /// Changes to [date]'s assignments as they happen. Staff only. Ends (or
+  /// errors) when the connection drops; events sent while disconnected are
+  /// not replayed, so reload the day on reconnecting.
+  Stream<DayBoardEvent> watchDayBoard({DateTime? date});
+
+  // Sync
+  /// Rows changed since [since] (a token from an earlier call), per resource.
+  /// Without [since] the result is a reset carrying the current token.
+  Future<SyncDelta> getChanges({int? since});
+
   // Feed Stats
   Future<Map<String, int>> getFeedTodayStats();
 
@@ -247,11 +247,21 @@ class MockDataService implements DataService {
   @override
   Future<List<gm.GroupMedia>> getFeed({String? dogId}) async => [];
   @override
-  Future<FeedPage> getFeedPage({String? dogId, int page = 1}) async =>
+  Future<FeedPage> getFeedPage({String? dogId, int page = 1, String? cursor}) async =>
       const FeedPage(items: [], hasMore: false);
   @override
   Future<Map<String, int>> getFeedTodayStats() async => {};
 
+  @override
+  Future<Map<String, int>> getBadgeCounts() async => {};
+
+  @override
+  Stream<DayBoardEvent> watchDayBoard({DateTime? date}) => const Stream.empty();
+
+  @override
+  Future<SyncDelta> getChanges({int? since}) async =>
+      SyncDelta(token: since ?? 0, hasMore: false, reset: since == null, changes: const {});
+
   @override
   Future<void> uploadGroupMedia({
     required Uint8List fileBytes,
@@ -333,6 +343,10 @@ class MockDataService implements DataService {
   @override
   Future<void> addComment(String mediaId, String text, {bool isProfilePhoto = false}) async {}
 
+  @override
+  Future<CommentPage> getFeedComments(String mediaId, {String? cursor}) async =>
+      const CommentPage(items: []);
+
   @override
   Future<void> deleteComment(String commentId) async {}
 
@@ -351,6 +365,17 @@ class MockDataService implements DataService {
   @override
   Future<List<CompatibilityConflict>> getCompatibilityConflicts({DateTime? date}) async => [];
 
+  @override
+  Future<StaffDashboard> getStaffDashboard({DateTime? date}) async => const StaffDashboard(
+        assignments: [],
+        unassignedDogs: [],
+        conflicts: [],
+        roadworks: [],
+        staffMembers: [],
+        counts: {},
+        mediaStats: {},
+      );
+
   @override
   Future<List<Dog>> getUnassignedDogs({DateTime? date}) async => [];
 
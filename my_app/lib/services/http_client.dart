@@ -67,11 +67,36 @@ Future<http.Response> _log(
   }
 }
 
+/// The last ETag-tagged 200 for each (auth header, URL), most recently used
+/// last. The polled endpoints (roster, feed, dogs, calendar) tag responses;
+/// [get] sends the tag back as If-None-Match and answers the server's 304
+/// with the stored response, so callers only ever see the 200 it stands for.
+final Map<String, http.Response> _etagResponses = {};
+const int _etagResponsesMax = 64;
+
 /// [timeout] lets read paths that have a cache fallback give up early instead
 /// of holding the UI on the full default timeout.
 Future<http.Response> get(Uri url,
-        {Map<String, String>? headers, Duration timeout = _defaultTimeout}) =>
-    _log('GET', url, () => http.get(url, headers: headers), timeout: timeout);
+    {Map<String, String>? headers, Duration timeout = _defaultTimeout}) async {
+  final key = '${headers?['Authorization'] ?? ''} $url';
+  final cached = _etagResponses.remove(key);
+  final etag = cached?.headers['etag'];
+  final sendHeaders =
+      etag == null ? headers : {...?headers, 'If-None-Match': etag};
+  final response = await _log('GET', url, () => http.get(url, headers: sendHeaders),
+      timeout: timeout);
+  if (response.statusCode == 304 && cached != null) {
+    _etagResponses[key] = cached;
+    return cached;
+  }
+  if (response.statusCode == 200 && response.headers['etag'] != null) {
+    _etagResponses[key] = response;
+    if (_etagResponses.length > _etagResponsesMax) {
+      _etagResponses.remove(_etagResponses.keys.first);
+    }
+  }
+  return response;
+}
 
 Future<http.Response> post(Uri url,
         {Map<String, String>? headers, Object? body, Encoding? encoding}) =>
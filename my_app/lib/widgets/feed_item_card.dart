@@ -4,6 +4,7 @@ import 'package:picons/picons.dart';
 import 'package:cached_network_image/cached_network_image.dart';
 import 'package:video_player/video_player.dart';
 import '../constants/app_colors.dart';
+import '../models/comment.dart';
 import '../models/group_media.dart';
 import '../services/cache_service.dart';
 import '../services/data_service.dart';
@@ -37,7 +38,11 @@ class FeedItemCard extends StatefulWidget {
 }
 
 class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMixin {
-  bool _showAllComments = false;
+  /// Every comment, once "View all" has paged them in; null shows the
+  /// preview the feed sent.
+  List<Comment>? _allComments;
+  String? _commentsCursor;
+  bool _loadingComments = false;
   final TextEditingController _commentController = TextEditingController();
   final DataService _dataService = getIt<DataService>();
 
@@ -92,6 +97,35 @@ class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMix
         widget.media.userReaction != null) {
       _popController.forward(from: 0);
     }
+    // A new or deleted comment arrives as a fresh preview; drop the paged list.
+    if (widget.media.commentCount != oldWidget.media.commentCount) {
+      _allComments = null;
+      _commentsCursor = null;
+    }
+  }
+
+  Future<void> _loadComments() async {
+    if (_loadingComments) return;
+    setState(() => _loadingComments = true);
+    try {
+      final page = await _dataService.getFeedComments(
+        widget.media.id,
+        cursor: _allComments == null ? null : _commentsCursor,
+      );
+      if (!mounted) return;
+      setState(() {
+        _allComments = [...?_allComments, ...page.items];
+        _commentsCursor = page.nextCursor;
+      });
+    } catch (e) {
+      if (mounted) {
+        ScaffoldMessenger.of(context).showSnackBar(
+          const SnackBar(content: Text('Could not load comments')),
+        );
+      }
+    } finally {
+      if (mounted) setState(() => _loadingComments = false);
+    }
   }
 
   @override
@@ -221,7 +255,16 @@ class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMix
           // Media content
           if (widget.media.isPhoto)
             GestureDetector(
-              onTap: () => _openFullScreenImage(context, widget.media.fileUrl),
+              // Full screen gets the smallest rendition that fills the screen —
+              // WebP where available — rather than always the full JPEG.
+              onTap: () => _openFullScreenImage(
+                context,
+                widget.media.imageUrlFor(
+                  (MediaQuery.of(context).size.width *
+                          MediaQuery.of(context).devicePixelRatio)
+                      .round(),
+                ),
+              ),
               onDoubleTap: _onDoubleTapPhoto,
               child: Stack(
                 alignment: Alignment.center,
@@ -334,22 +377,25 @@ class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMix
   }
 
   Widget _buildCommentsSection() {
-    final comments = widget.media.comments;
-    final displayedComments = _showAllComments ? comments : comments.take(2).toList();
-    
+    // The feed sends the newest few; the rest are paged in on request.
+    final total = widget.media.commentCount;
+    final displayedComments = _allComments ?? widget.media.comments;
+    final canLoadMore = _allComments == null
+        ? total > displayedComments.length
+        : _commentsCursor != null;
+
     return Column(
       crossAxisAlignment: CrossAxisAlignment.start,
       children: [
-        if (comments.isNotEmpty) const Divider(),
-        
-        // Comments specific to this version
-        if (comments.isNotEmpty && !_showAllComments && comments.length > 2)
+        if (displayedComments.isNotEmpty) const Divider(),
+
+        if (canLoadMore && _allComments == null)
           Padding(
             padding: const EdgeInsets.symmetric(horizontal: 16, vertical: 4),
             child: GestureDetector(
-              onTap: () => setState(() => _showAllComments = true),
+              onTap: _loadComments,
               child: Text(
-                'View all ${comments.length} comments',
+                'View all $total comments',
                 style: TextStyle(color: Colors.grey[600], fontSize: 13),
               ),
             ),
@@ -380,6 +426,18 @@ class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMix
             ],
           ),
         )),
+
+        if (canLoadMore && _allComments != null)
+          Padding(
+            padding: const EdgeInsets.symmetric(horizontal: 16, vertical: 4),
+            child: GestureDetector(
+              onTap: _loadComments,
+              child: Text(
+                _loadingComments ? 'Loading…' : 'Load more comments',
+                style: TextStyle(color: Colors.grey[600], fontSize: 13),
+              ),
+            ),
+          ),
         
         Padding(
           padding: const EdgeInsets.fromLTRB(12, 8, 12, 8),
@@ -406,7 +464,6 @@ class _FeedItemCardState extends State<FeedItemCard> with TickerProviderStateMix
                   if (_commentController.text.trim().isNotEmpty) {
                     widget.onComment(widget.media.id, _commentController.text.trim());
                     _commentController.clear();
-                    setState(() => _showAllComments = true); // Auto expand on new comment
                   }
                 },
                 icon: Picon(PiconsDuotone.paperPlaneTilt, color: AppColors.primary),
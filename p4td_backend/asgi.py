@@ -3,6 +3,11 @@ ASGI config for p4td_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production serves the REST API from the WSGI entry point; this one backs the
+``live`` service (docker-compose.prod.yml), which Caddy routes ``/api/live/*``
+to — the day-board event stream, an async view whose open responses would
+each hold a sync worker thread (see api/live.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -340,6 +340,12 @@ if _cors_allow_all_env or (DEBUG and not CORS_ALLOWED_ORIGINS):
 else:
     CORS_ALLOW_ALL_ORIGINS = False
 
+# Conditional GET (api.conditional): a web client must be able to read the
+# ETag and send it back.
+from corsheaders.defaults import default_headers as _cors_default_headers
+CORS_ALLOW_HEADERS = (*_cors_default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
+
 # Make an open CORS policy loud — it must never silently resolve True in
 # production (e.g. if DEBUG is flipped on during an incident with no origins
 # configured). The warning surfaces in logs at startup (B45).
@@ -432,6 +438,12 @@ ROADWORK_MATCH_RADIUS_M = float(os.environ.get('ROADWORK_MATCH_RADIUS_M', '400')
 
 POSTCODE_LOOKUP_PROVIDER = os.environ.get('POSTCODE_LOOKUP_PROVIDER', 'getaddress')
 
+# Defaults for the shared outbound HTTP client (api.http_client) used for Xero,
+# postcode lookups, SNS certificates and cron heartbeats. Callers with a
+# latency budget (e.g. geocoding on the dog-save path) pass their own.
+OUTBOUND_HTTP_TIMEOUT = float(os.environ.get('OUTBOUND_HTTP_TIMEOUT', '10'))
+OUTBOUND_HTTP_RETRIES = int(os.environ.get('OUTBOUND_HTTP_RETRIES', '2'))
+
 # =============================================================================
 # XERO ACCOUNTING INTEGRATION (optional)
 # =============================================================================
@@ -150,6 +150,10 @@ class ContactInquiryAdmin(admin.ModelAdmin):
 
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
+        if updated:
+            # update() skips the signal that keeps the inquiry badge current.
+            from api.badges import refresh_badges
+            refresh_badges('unread_inquiries')
         self.message_user(request, f'{updated} inquiry(ies) marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
 